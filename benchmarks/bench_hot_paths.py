@@ -0,0 +1,322 @@
+"""Benchmark horkých cest senzorů nad syntetickými proudy výkonu.
+
+Skutečné třídy ze `sensor.py` běží v `harness.FakeHass` se simulovaným
+časem. Dvě části:
+
+* stream – N profilů, každý s 1–3 fázemi výkonu (W) o frekvenci 1–10 Hz;
+  měří se celá cesta změny stavu (hub → `_on_source_change` → okna →
+  slučovač zápisů), uzavírání intervalů a špičková paměť oken vzorků,
+* micro – jednotlivé metody jednoho profilu s plným oknem
+  (`_on_source_change` s událostí i bez, `_recompute`, `_trim`, výpočty nákladových
+  uzlů, průchod grafu přepočtů, uzavření intervalu).
+
+Výsledky lze uložit (`--json`) a porovnat s dřívějším během (`--compare`);
+při zhoršení nad práh skončí skript s kódem 1.
+
+    python benchmarks/bench_hot_paths.py --quick --json base.json
+    python benchmarks/bench_hot_paths.py --quick --compare base.json --threshold 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from harness import FakeEntry, FakeEvent, FakeHass, SimClock, installed, setup_entry, unload_entry
+
+from custom_components.porovnani_cen_fix_a_spot.coordinator import IntervalSettlement
+from custom_components.porovnani_cen_fix_a_spot.sensor import (
+    FixHourlyCostSensor, HourlyConsumptionSensor, SpotHourlyCostSensor,
+)
+
+HDO = "switch.hdo"
+SPOT = "sensor.spot_price"
+
+# metriky, u kterých je vyšší hodnota lepší (ostatní: nižší je lepší)
+_HIGHER_IS_BETTER = {"events_per_s"}
+# metriky, které se porovnávají s baseline
+_COMPARED = ("events_per_s", "p50_us", "p99_us", "tick_p99_us", "peak_window_bytes")
+
+
+def _percentiles(ns: array) -> dict[str, float]:
+    if not ns:
+        return {"p50_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+    values = sorted(ns)
+    n = len(values)
+    return {
+        "p50_us": values[(n - 1) // 2] / 1e3,
+        "p99_us": values[int((n - 1) * 0.99)] / 1e3,
+        "max_us": values[-1] / 1e3,
+    }
+
+
+def _spot_attributes(day: datetime, step_min: int) -> dict:
+    start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        (start + timedelta(minutes=i * step_min)).isoformat(): round(2.0 + (i % 17) * 0.1, 3)
+        for i in range(2 * 24 * 60 // step_min)
+    }
+
+
+def _phase_id(entry: int, phase: int) -> str:
+    return f"sensor.e{entry:03d}_l{phase + 1}_power"
+
+
+def _entry_data(i: int, phases: int, interval: int, integration: str) -> dict:
+    data = {
+        "source_entity_id": HDO, "spot_price_sensor": SPOT,
+        "settlement_interval": interval, "power_integration": integration,
+    }
+    for p in range(phases):
+        data[f"cons_phase{p + 1}_entity_id"] = _phase_id(i, p)
+    return data
+
+
+def _window_bytes(sensors: list[HourlyConsumptionSensor]) -> tuple[int, int]:
+    size = samples = 0
+    for cons in sensors:
+        for rep in cons.memory_report().values():
+            size += rep["bytes"]
+            samples += rep["samples"]
+    return size, samples
+
+
+async def _setup(hass: FakeHass, clock: SimClock, entries: int, phases: int, interval: int, integration: str):
+    hass.set_state(HDO, "off")
+    hass.set_state(SPOT, "2.5", _spot_attributes(clock.now, interval))
+    for i in range(entries):
+        for p in range(phases):
+            hass.set_state(_phase_id(i, p), "0", {"unit_of_measurement": "W"})
+    profiles = []
+    for i in range(entries):
+        entry = FakeEntry(f"entry{i:03d}", _entry_data(i, phases, interval, integration))
+        profiles.append((entry, await setup_entry(hass, entry)))
+    return profiles
+
+
+# ---------------------------
+# Proudy událostí
+# ---------------------------
+
+async def run_stream(entries: int, phases: int, hz: int, duration: float, interval: int, integration: str) -> dict:
+    hass = FakeHass()
+    # start těsně před hranicí intervalu, aby běh obsahoval uzavření
+    start = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    start -= timedelta(minutes=start.minute % interval)
+    clock = SimClock(start)
+    lat = array("q")
+    tick_lat = array("q")
+    peak_bytes = peak_samples = 0
+
+    with installed(hass, clock):
+        profiles = await _setup(hass, clock, entries, phases, interval, integration)
+        cons_sensors = [e for _, ents in profiles for e in ents if isinstance(e, HourlyConsumptionSensor)]
+        ids = [_phase_id(i, p) for i in range(entries) for p in range(phases)]
+        set_state = hass.set_state
+        perf = time.perf_counter_ns
+        dt = 1.0 / hz
+        steps = int(duration * hz)
+        next_mem = 0.0
+        next_tick = clock.now.replace(second=5) + timedelta(minutes=interval)
+
+        gc.collect()
+        t_start = time.perf_counter()
+        for k in range(steps):
+            now = clock.advance(dt)
+            # pila 0–3 kW s fázovým posunem, ať se hodnoty mění
+            base = 500.0 + (k % 100) * 25.0
+            for j, entity_id in enumerate(ids):
+                value = str(base + j)
+                t0 = perf()
+                set_state(entity_id, value)
+                lat.append(perf() - t0)
+            if now >= next_tick:
+                t0 = perf()
+                hass.fire_time(next_tick)
+                tick_lat.append(perf() - t0)
+                next_tick += timedelta(minutes=interval)
+            if k * dt >= next_mem:
+                size, samples = _window_bytes(cons_sensors)
+                if size > peak_bytes:
+                    peak_bytes, peak_samples = size, samples
+                next_mem += 60.0
+        elapsed = time.perf_counter() - t_start
+
+        for entry, ents in profiles:
+            await unload_entry(hass, entry, ents)
+
+    ticks = _percentiles(tick_lat)
+    return {
+        "events": len(lat),
+        "elapsed_s": elapsed,
+        "events_per_s": len(lat) / sum(lat) * 1e9 if lat else 0.0,
+        **_percentiles(lat),
+        "ticks": len(tick_lat),
+        "tick_p50_us": ticks["p50_us"],
+        "tick_p99_us": ticks["p99_us"],
+        "peak_window_bytes": peak_bytes,
+        "peak_window_samples": peak_samples,
+        "state_writes": hass.writes,
+    }
+
+
+# ---------------------------
+# Jednotlivé metody
+# ---------------------------
+
+def _measure(func: Callable[[], object], repeat: int) -> dict:
+    lat = array("q")
+    perf = time.perf_counter_ns
+    for _ in range(repeat):
+        t0 = perf()
+        func()
+        lat.append(perf() - t0)
+    return {"calls": repeat, "events_per_s": repeat / sum(lat) * 1e9, **_percentiles(lat)}
+
+
+async def run_micro(phases: int, hz: int, interval: int, repeat: int, integration: str) -> dict[str, dict]:
+    hass = FakeHass()
+    clock = SimClock()
+    results: dict[str, dict] = {}
+    with installed(hass, clock):
+        profiles = await _setup(hass, clock, 1, phases, interval, integration)
+        entities = profiles[0][1]
+        cons = next(e for e in entities if isinstance(e, HourlyConsumptionSensor))
+        spot = next(e for e in entities if isinstance(e, SpotHourlyCostSensor))
+        fix = next(e for e in entities if isinstance(e, FixHourlyCostSensor))
+        settlement: IntervalSettlement = hass.data["porovnani_cen_fix_a_spot"]["entry000"]["settlement"]
+
+        # naplň okna na ustálený stav (plné okno intervalu)
+        ids = [_phase_id(0, p) for p in range(phases)]
+        for k in range(int(interval * 60 * hz)):
+            clock.advance(1.0 / hz)
+            for j, entity_id in enumerate(ids):
+                hass.set_state(entity_id, str(500.0 + (k % 100) * 25.0 + j))
+
+        def _step_and(func: Callable[[], object]) -> Callable[[], object]:
+            def run() -> object:
+                clock.advance(1.0 / hz)
+                return func()
+            return run
+
+        gc.collect()
+        results["on_source_change"] = _measure(_step_and(lambda: cons._on_source_change(None)), repeat)
+        # jedna změna stavu z události (stav v payloadu, jen okno dané fáze)
+        event = FakeEvent({"entity_id": ids[0], "new_state": hass.states.get(ids[0])})
+        results["on_source_event"] = _measure(_step_and(lambda: cons._on_source_change(event)), repeat)
+        results["cons_recompute"] = _measure(_step_and(cons._recompute), repeat)
+        results["cons_trim"] = _measure(_step_and(cons._trim), repeat)
+        results["spot_cost_compute"] = _measure(spot._compute, repeat)
+        results["fix_cost_compute"] = _measure(fix._compute, repeat)
+        # průchod grafu po změně spotřeby (spotřeba → náklady → zápisy)
+        graph = hass.data["porovnani_cen_fix_a_spot"]["entry000"]["graph"]
+        results["graph_pass"] = _measure(_step_and(lambda: graph.invalidate("consumption")), repeat)
+        results["settle_chain"] = _measure(
+            lambda: settlement.async_settle(clock.now), max(1, repeat // 10)
+        )
+
+        for entry, ents in profiles:
+            await unload_entry(hass, entry, ents)
+    return results
+
+
+# ---------------------------
+# Porovnání s baseline
+# ---------------------------
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Seznam regresí (relativní zhoršení nad `threshold`)."""
+    regressions: list[str] = []
+    for name, metrics in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for key in _COMPARED:
+            if key not in metrics or not base.get(key):
+                continue
+            cur, ref = float(metrics[key]), float(base[key])
+            change = (cur - ref) / ref
+            worse = -change if key in _HIGHER_IS_BETTER else change
+            mark = "REGRESE" if worse > threshold else ""
+            print(f"  {name:34s} {key:18s} {ref:14.2f} -> {cur:14.2f} ({change:+7.1%}) {mark}")
+            if mark:
+                regressions.append(f"{name}:{key}")
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--entries", type=int, nargs="+", default=[1, 10, 100])
+    ap.add_argument("--phases", type=int, nargs="+", default=[1, 3], choices=(1, 2, 3))
+    ap.add_argument("--hz", type=int, nargs="+", default=[1, 10])
+    ap.add_argument("--interval", type=int, choices=(60, 15), default=15)
+    ap.add_argument("--integration", choices=("trapezoid", "hold"), default="trapezoid",
+                    help="režim integrace výkonu (hold = držení poslední hodnoty)")
+    ap.add_argument("--duration", type=float, default=None,
+                    help="simulovaná délka proudu [s] (default: interval + 2 min)")
+    ap.add_argument("--repeat", type=int, default=20000, help="počet volání v micro části")
+    ap.add_argument("--quick", action="store_true", help="malá matice pro rychlou kontrolu")
+    ap.add_argument("--json", metavar="PATH", help="ulož výsledky")
+    ap.add_argument("--compare", metavar="PATH", help="porovnej s uloženými výsledky")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="povolené relativní zhoršení (mikro měření mají šum ~10–20 %%)")
+    args = ap.parse_args()
+
+    if args.quick:
+        args.entries, args.phases, args.hz, args.repeat = [1, 10], [1, 3], [1, 10], 5000
+    duration = args.duration or (args.interval * 60 + 120)
+
+    results: dict[str, dict] = {}
+    for entries in args.entries:
+        for phases in args.phases:
+            for hz in args.hz:
+                name = f"stream/e{entries}-p{phases}-{hz}hz"
+                results[name] = res = asyncio.run(run_stream(entries, phases, hz, duration, args.interval, args.integration))
+                print(f"{name:28s} {res['events_per_s']:10.0f} ev/s  p50 {res['p50_us']:7.1f} µs  "
+                      f"p99 {res['p99_us']:7.1f} µs  tick p99 {res['tick_p99_us']:9.1f} µs  "
+                      f"okna {res['peak_window_bytes'] / 1024:8.1f} KiB ({res['peak_window_samples']} vzorků)")
+
+    phases, hz = max(args.phases), max(args.hz)
+    for name, res in asyncio.run(run_micro(phases, hz, args.interval, args.repeat, args.integration)).items():
+        name = f"micro/{name}-p{phases}-{hz}hz"
+        results[name] = res
+        print(f"{name:28s} {res['events_per_s']:10.0f} /s    p50 {res['p50_us']:7.1f} µs  "
+              f"p99 {res['p99_us']:7.1f} µs")
+
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "interval_min": args.interval,
+            "integration": args.integration,
+            "duration_s": duration,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        print(f"\nporovnání s {args.compare} (práh {args.threshold:.0%}):")
+        for key in ("python", "interval_min", "integration", "duration_s"):
+            if baseline.get("meta", {}).get(key) != report["meta"][key]:
+                print(f"  pozor: {key} se liší ({baseline.get('meta', {}).get(key)} vs {report['meta'][key]})")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regresí: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark sdíleného hubu: N profilů nad stejnými zdroji.
+
+Ověřuje, že počet přihlášení v HA a časovačů nezávisí na počtu profilů a že
+změna cenového senzoru se parsuje jednou, ne N×. Měří dobu rozeslání změny
+výkonu, HDO, ceny a uzavření intervalu přes všechny profily.
+
+    python benchmarks/bench_hub.py --entries 100
+    python benchmarks/bench_hub.py --entries 100 --interval 15 --json out.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from harness import FakeEntry, FakeHass, installed, setup_entry, unload_entry
+
+from custom_components.porovnani_cen_fix_a_spot import price_cache
+
+HDO = "switch.hdo"
+SPOT = "sensor.spot_price"
+PHASES = ("sensor.l1_power", "sensor.l2_power", "sensor.l3_power")
+
+
+def _spot_attributes(day: datetime, step_min: int, shift: float = 0.0) -> dict:
+    start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    n = 2 * 24 * 60 // step_min
+    return {
+        (start + timedelta(minutes=i * step_min)).isoformat(): round(2.0 + shift + (i % 17) * 0.1, 3)
+        for i in range(n)
+    }
+
+
+def _timed(func, repeat: int) -> float:
+    """Průměrná doba jednoho volání [µs]."""
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+async def run(entries: int, interval: int, repeat: int) -> dict:
+    hass = FakeHass()
+    now = datetime.now(timezone.utc)
+    hass.set_state(HDO, "off")
+    hass.set_state(SPOT, "2.5", _spot_attributes(now, interval))
+    for p in PHASES:
+        hass.set_state(p, "500", {"unit_of_measurement": "W"})
+
+    rebuilds = 0
+    orig_rebuild = price_cache.PriceCurve._rebuild
+
+    def counting_rebuild(self, attributes):
+        nonlocal rebuilds
+        rebuilds += 1
+        return orig_rebuild(self, attributes)
+
+    result: dict = {"entries": entries, "interval_min": interval}
+    with installed(hass):
+        price_cache.PriceCurve._rebuild = counting_rebuild
+        try:
+            t0 = time.perf_counter()
+            profiles = []
+            for i in range(entries):
+                entry = FakeEntry(f"entry{i:03d}", {
+                    "source_entity_id": HDO,
+                    "spot_price_sensor": SPOT,
+                    "cons_phase1_entity_id": PHASES[0],
+                    "cons_phase2_entity_id": PHASES[1],
+                    "cons_phase3_entity_id": PHASES[2],
+                    "settlement_interval": interval,
+                })
+                profiles.append((entry, await setup_entry(hass, entry)))
+            result["setup_ms"] = (time.perf_counter() - t0) * 1e3
+
+            hub = hass.data["porovnani_cen_fix_a_spot"]["hub"]
+            result["ha_state_subscriptions"] = hass.n_state_subs
+            result["ha_timers"] = hass.n_timers
+            result["hub"] = hub.stats()
+
+            result["phase_event_us"] = _timed(
+                lambda i: hass.set_state(PHASES[i % 3], str(400 + i % 200)), repeat
+            )
+            result["hdo_flip_us"] = _timed(
+                lambda i: hass.set_state(HDO, "on" if i % 2 else "off"), max(1, repeat // 10)
+            )
+
+            rebuilds = 0
+            n_price = max(1, repeat // 100)
+            result["price_update_us"] = _timed(
+                lambda i: hass.set_state(SPOT, "2.5", _spot_attributes(now, interval, shift=i + 1)), n_price
+            )
+            result["price_parses_per_update"] = rebuilds / n_price
+
+            boundary = now.replace(minute=0, second=5, microsecond=0)
+            writes = hass.writes
+            result["boundary_tick_us"] = _timed(lambda i: hass.fire_time(boundary), 10)
+            result["writes_per_tick"] = (hass.writes - writes) / 10
+
+            for entry, entities in profiles:
+                await unload_entry(hass, entry, entities)
+            result["ha_state_subscriptions_after_unload"] = hass.n_state_subs
+            result["ha_timers_after_unload"] = hass.n_timers
+        finally:
+            price_cache.PriceCurve._rebuild = orig_rebuild
+    return result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--entries", type=int, default=100)
+    ap.add_argument("--interval", type=int, choices=(60, 15), default=60)
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--json", metavar="PATH")
+    args = ap.parse_args()
+
+    result = asyncio.run(run(args.entries, args.interval, args.repeat))
+    for key, value in result.items():
+        print(f"{key:38s} {value:.1f}" if isinstance(value, float) else f"{key:38s} {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
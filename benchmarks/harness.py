@@ -0,0 +1,265 @@
+"""Lehká náhrada HomeAssistant pro benchmarky integrace.
+
+Skutečné třídy ze `sensor.py`, `coordinator.py` a `hub.py` běží proti
+minimálnímu stavovému automatu bez event loopu, recorderu a registru entit.
+Pomocné funkce HA (sledování stavů, časovače, úložiště, dispatcher, zápis
+stavu) se po dobu `installed()` přesměrují do `FakeHass`, který počítá
+přihlášení a zápisy.
+
+Vyžaduje nainstalovaný balík `homeassistant` (stejná verze jako v HA).
+"""
+from __future__ import annotations
+
+import sys
+from collections import defaultdict
+from contextlib import contextmanager, ExitStack
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from homeassistant.components.sensor import SensorEntity                                            # type: ignore
+from homeassistant.core import State                                                                # type: ignore
+from homeassistant.helpers.restore_state import RestoreEntity                                       # type: ignore
+
+import custom_components.porovnani_cen_fix_a_spot as integration                                    # noqa: E402
+from custom_components.porovnani_cen_fix_a_spot import coalescer, coordinator, hub, sensor          # noqa: E402
+
+
+class SimClock:
+    """Simulovaný čas (UTC) – posouvá ho benchmark, ne hodiny stroje."""
+
+    __slots__ = ("now",)
+
+    def __init__(self, start: datetime | None = None) -> None:
+        self.now = start or datetime.now(timezone.utc)
+
+    def advance(self, seconds: float) -> datetime:
+        self.now += timedelta(seconds=seconds)
+        return self.now
+
+
+class FakeEvent:
+    __slots__ = ("data",)
+
+    def __init__(self, data: dict) -> None:
+        self.data = data
+
+
+class FakeStates:
+    def __init__(self) -> None:
+        self._states: dict[str, State] = {}
+
+    def get(self, entity_id: str) -> State | None:
+        return self._states.get(entity_id)
+
+    def async_all(self) -> list[State]:
+        return list(self._states.values())
+
+
+class FakeBus:
+    def async_listen_once(self, event_type: str, listener: Callable) -> Callable[[], None]:
+        return lambda: None
+
+    def async_listen(self, event_type: str, listener: Callable) -> Callable[[], None]:
+        return lambda: None
+
+
+class FakeConfigEntries:
+    async def async_forward_entry_setups(self, entry, platforms) -> None:
+        return None
+
+    async def async_unload_platforms(self, entry, platforms) -> bool:
+        return True
+
+    async def async_reload(self, entry_id: str) -> None:
+        return None
+
+
+class FakeConfig:
+    time_zone = "Europe/Prague"
+    components: set[str] = set()
+
+
+class FakeEntry:
+    def __init__(self, entry_id: str, data: dict, options: dict | None = None) -> None:
+        self.entry_id = entry_id
+        self.data = data
+        self.options = options or {}
+        self.title = entry_id
+        self._on_unload: list[Callable[[], None]] = []
+
+    def async_on_unload(self, func: Callable[[], None]) -> None:
+        self._on_unload.append(func)
+
+    def add_update_listener(self, listener) -> Callable[[], None]:
+        return lambda: None
+
+    def unload(self) -> None:
+        while self._on_unload:
+            self._on_unload.pop()()
+
+
+class MemoryStore:
+    def __init__(self, hass, version, key, **kwargs) -> None:
+        self.data: Any = None
+
+    async def async_load(self) -> Any:
+        return self.data
+
+    async def async_save(self, data: Any) -> None:
+        self.data = data
+
+    def async_delay_save(self, func: Callable[[], Any], delay: float = 0) -> None:
+        self.data = func()
+
+    async def async_remove(self) -> None:
+        self.data = None
+
+
+class FakeHass:
+    """Stavový automat + počítadla přihlášení, časovačů a zápisů stavu."""
+
+    def __init__(self) -> None:
+        self.data: dict = {}
+        self.states = FakeStates()
+        self.bus = FakeBus()
+        self.config_entries = FakeConfigEntries()
+        self.config = FakeConfig()
+        self.state_subs: dict[str, list[Callable]] = defaultdict(list)
+        self.time_subs: list[tuple[Callable, Any, Any]] = []
+        self.interval_subs: list[Callable] = []
+        self.signals: dict[str, list[Callable]] = defaultdict(list)
+        self.writes = 0
+
+    # --- počítadla ---
+    @property
+    def n_state_subs(self) -> int:
+        return sum(len(v) for v in self.state_subs.values())
+
+    @property
+    def n_timers(self) -> int:
+        return len(self.time_subs) + len(self.interval_subs)
+
+    # --- řízení ---
+    def set_state(self, entity_id: str, value: Any, attributes: dict | None = None) -> None:
+        old = self.states._states.get(entity_id)
+        if attributes is None and old is not None:
+            attributes = old.attributes
+        new = State(entity_id, str(value), attributes or {})
+        self.states._states[entity_id] = new
+        subs = self.state_subs.get(entity_id)
+        if subs:
+            event = FakeEvent({"entity_id": entity_id, "old_state": old, "new_state": new})
+            for cb in tuple(subs):
+                cb(event)
+
+    def fire_time(self, now) -> None:
+        for cb, minute, second in tuple(self.time_subs):
+            if (minute is None or now.minute in minute) and (second is None or now.second == second):
+                cb(now)
+
+    # --- náhrady pomocných funkcí HA ---
+    def _track_state(self, hass, entity_ids, cb) -> Callable[[], None]:
+        ids = [entity_ids] if isinstance(entity_ids, str) else list(entity_ids)
+        for e in ids:
+            self.state_subs[e].append(cb)
+
+        def _remove() -> None:
+            for e in ids:
+                self.state_subs[e].remove(cb)
+
+        return _remove
+
+    def _track_time(self, hass, cb, hour=None, minute=None, second=None) -> Callable[[], None]:
+        if minute is not None and not isinstance(minute, (tuple, list)):
+            minute = (minute,)
+        rec = (cb, minute, second)
+        self.time_subs.append(rec)
+        return lambda: self.time_subs.remove(rec)
+
+    def _track_interval(self, hass, cb, interval) -> Callable[[], None]:
+        self.interval_subs.append(cb)
+        return lambda: self.interval_subs.remove(cb)
+
+    def _call_later(self, hass, delay, cb) -> Callable[[], None]:
+        # zpožděný zápis se v benchmarku neprovede – počítá se jen naplánování
+        return lambda: None
+
+    def _dispatcher_connect(self, hass, signal, cb) -> Callable[[], None]:
+        self.signals[signal].append(cb)
+        return lambda: self.signals[signal].remove(cb)
+
+    def _dispatcher_send(self, hass, signal, *args) -> None:
+        for cb in tuple(self.signals.get(signal, ())):
+            cb(*args)
+
+
+def _sim_datetime(clock: SimClock) -> type[datetime]:
+    class SimDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now if tz is None else clock.now.astimezone(tz)
+
+    return SimDatetime
+
+
+def _count_write(entity) -> None:
+    entity.hass.writes += 1
+
+
+async def _no_last_state(entity) -> None:
+    return None
+
+
+@contextmanager
+def installed(hass: FakeHass, clock: SimClock | None = None):
+    """Přesměruj pomocné funkce HA v modulech integrace do `hass`.
+
+    S `clock` čte integrace simulovaný čas místo systémového.
+    """
+    with ExitStack() as stack:
+        patches = [
+            (hub, "async_track_state_change_event", hass._track_state),
+            (hub, "async_track_time_change", hass._track_time),
+            (hub, "async_track_time_interval", hass._track_interval),
+            (coalescer, "async_call_later", hass._call_later),
+            (sensor, "Store", MemoryStore),
+            (sensor, "async_dispatcher_connect", hass._dispatcher_connect),
+            (coordinator, "async_dispatcher_connect", hass._dispatcher_connect),
+            (integration, "Store", MemoryStore),
+            (integration, "async_dispatcher_send", hass._dispatcher_send),
+            (SensorEntity, "async_write_ha_state", _count_write),
+            (RestoreEntity, "async_get_last_state", _no_last_state),
+        ]
+        if clock is not None:
+            # všechny „teď“ v integraci (okna, HDO, cena, akumulátory) čtou simulovaný čas
+            sim_datetime = _sim_datetime(clock)
+            patches += [
+                (sensor, "datetime", sim_datetime),
+                (coordinator, "datetime", sim_datetime),
+            ]
+        for target, name, value in patches:
+            stack.enter_context(mock.patch.object(target, name, value))
+        yield hass
+
+
+async def setup_entry(hass: FakeHass, entry: FakeEntry) -> list[SensorEntity]:
+    """Nastav jeden profil (jako HA) a vrať jeho entity."""
+    await integration.async_setup_entry(hass, entry)
+    entities: list[SensorEntity] = []
+    await sensor.async_setup_entry(hass, entry, lambda new, update=False: entities.extend(new))
+    for ent in entities:
+        await ent.async_added_to_hass()
+    return entities
+
+
+async def unload_entry(hass: FakeHass, entry: FakeEntry, entities: list[SensorEntity]) -> None:
+    for ent in entities:
+        await ent.async_will_remove_from_hass()
+    entry.unload()
+    await integration.async_unload_entry(hass, entry)
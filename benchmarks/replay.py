@@ -0,0 +1,259 @@
+"""Přehrání zaznamenaného průběhu stavů přes skutečné senzory integrace.
+
+Trace (CSV nebo JSONL) obsahuje změny stavů HDO přepínače, fází spotřeby a
+spotového senzoru: `entity_id, timestamp, state, unit` (JSONL může navíc
+nést `attributes`). Čas je simulovaný – události i hranice intervalů
+(:mm:05) se přehrají bez čekání, měsíc dat během pár sekund.
+
+Výstupem jsou uzavřené intervaly tak, jak by je integrace vyúčtovala
+(spotřeba, VT/NT, spot/fix náklady), souhrn a propustnost (událostí/s).
+
+    python benchmarks/replay.py trace.csv --hdo switch.hdo --spot sensor.spot \\
+        --phase sensor.l1_power --phase sensor.l2_power --interval 15 --out intervals.csv
+    python benchmarks/replay.py trace.jsonl --entry entry.json --json summary.json
+
+Spotový senzor bez atributů s křivkou dostane v replay křivku poskládanou
+ze svých dosavadních hodnot (cena platí od začátku intervalu, ve kterém se
+změnila) – uzavření intervalu pak bere cenu intervalu, ne hodnotu v :mm:05.
+Režim statistik recorderu se v replay nepoužije (recorder tu není).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, NamedTuple
+
+from harness import FakeEntry, FakeHass, SimClock, installed, setup_entry, unload_entry
+
+from custom_components.porovnani_cen_fix_a_spot.const import (
+    ATTR_SOURCE_ENTITY_ID, CONF_CONS_PHASE1, CONF_CONS_PHASE2, CONF_CONS_PHASE3, CONF_CONS_TOTAL_ENERGY,
+    CONF_CONSUMPTION_SOURCE, CONF_POWER_INTEGRATION, CONF_SETTLEMENT_INTERVAL, CONF_SPOT_PRICE_SENSOR,
+    CONSUMPTION_SOURCE_EVENTS, DOMAIN,
+)
+from custom_components.porovnani_cen_fix_a_spot.coordinator import IntervalRecord
+
+_CONSUMPTION = (CONF_CONS_TOTAL_ENERGY, CONF_CONS_PHASE1, CONF_CONS_PHASE2, CONF_CONS_PHASE3)
+_FIELDS = ("start", "end", "kwh", "kwh_vt", "kwh_nt", "spot_price", "spot_unit", "fix_unit",
+           "fix_fee", "spot_cost", "fix_cost", "spot_missing")
+
+
+class Change(NamedTuple):
+    ts: float
+    entity_id: str
+    state: str
+    attributes: dict | None
+
+
+def _parse_time(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _attributes(row: dict) -> dict | None:
+    attrs = row.get("attributes")
+    attrs = dict(attrs) if isinstance(attrs, dict) else None
+    unit = row.get("unit") or row.get("unit_of_measurement")
+    if unit:
+        attrs = {**(attrs or {}), "unit_of_measurement": unit}
+    return attrs
+
+
+def read_trace(path: str) -> list[Change]:
+    """Načti trace (CSV s hlavičkou nebo JSONL), seřazený podle času (stabilně)."""
+    with open(path, encoding="utf-8", newline="") as fh:
+        if path.endswith((".jsonl", ".ndjson", ".json")):
+            rows: Iterator[dict] = (json.loads(line) for line in fh if line.strip())
+        else:
+            rows = csv.DictReader(fh)
+        changes = [
+            Change(_parse_time(r.get("timestamp") or r.get("last_updated")), r["entity_id"],
+                   str(r["state"]), _attributes(r))
+            for r in rows
+        ]
+    changes.sort(key=lambda c: c.ts)
+    return changes
+
+
+def _entry_data(args: argparse.Namespace) -> dict:
+    data: dict = {}
+    if args.entry:
+        with open(args.entry, encoding="utf-8") as fh:
+            raw = json.load(fh)
+        # export config entry ({"data": ..., "options": ...}) i plochý slovník
+        data = {**raw.get("data", {}), **raw.get("options", {})} if "data" in raw else dict(raw)
+    if args.hdo:
+        data[ATTR_SOURCE_ENTITY_ID] = args.hdo
+    if args.spot:
+        data[CONF_SPOT_PRICE_SENSOR] = args.spot
+    if args.total:
+        data[CONF_CONS_TOTAL_ENERGY] = args.total
+    for key, ent in zip(_CONSUMPTION[1:], args.phase or ()):
+        data[key] = ent
+    if args.interval:
+        data[CONF_SETTLEMENT_INTERVAL] = args.interval
+    if args.integration:
+        data[CONF_POWER_INTEGRATION] = args.integration
+    data[CONF_CONSUMPTION_SOURCE] = CONSUMPTION_SOURCE_EVENTS
+    return data
+
+
+class _SpotCurve:
+    """Křivka spotového senzoru poskládaná z hodnot v trace (pro senzory bez atributů)."""
+
+    def __init__(self, minutes: int) -> None:
+        self._step = minutes * 60
+        self._points: dict[str, float] = {}
+
+    def attributes(self, ts: float, state: str) -> dict:
+        try:
+            price = float(state)
+        except ValueError:
+            return dict(self._points)
+        start = ts - ts % self._step
+        self._points[datetime.fromtimestamp(start, timezone.utc).isoformat()] = price
+        # nový slovník = nová identita → křivka se přestaví
+        return dict(self._points)
+
+
+async def replay(changes: list[Change], data: dict) -> dict:
+    if not changes:
+        raise SystemExit("prázdný trace")
+    hass = FakeHass()
+    clock = SimClock(datetime.fromtimestamp(changes[0].ts, timezone.utc))
+    records: list[IntervalRecord] = []
+    spot_id = data.get(CONF_SPOT_PRICE_SENSOR)
+
+    with installed(hass, clock):
+        entry = FakeEntry("replay", data)
+        entities = await setup_entry(hass, entry)
+        cfg = hass.data[DOMAIN][entry.entry_id]
+        settlement = cfg["settlement"]
+        first = changes[0].ts
+
+        def _on_record(record: IntervalRecord) -> None:
+            # interval uzavřený hned v první minutě je celý před začátkem trace
+            if record.end.timestamp() > first:
+                records.append(record)
+
+        settlement.async_add_listener(_on_record)
+        minutes = settlement.minutes
+        spot_curve = _SpotCurve(minutes)
+
+        # hub přihlašuje hranice po minutách v :05 – stačí projít každou minutu
+        tick = clock.now.replace(second=5, microsecond=0)
+        if tick <= clock.now:
+            tick += timedelta(minutes=1)
+        step = timedelta(minutes=1)
+        set_state = hass.set_state
+        fire_time = hass.fire_time
+
+        t_start = time.perf_counter()
+        for change in changes:
+            when = datetime.fromtimestamp(change.ts, timezone.utc)
+            while tick <= when:
+                clock.now = tick
+                fire_time(tick)
+                tick += step
+            clock.now = when
+            attrs = change.attributes
+            if change.entity_id == spot_id and (attrs is None or len(attrs) <= 1):
+                attrs = {**(attrs or {}), **spot_curve.attributes(change.ts, change.state)}
+            set_state(change.entity_id, change.state, attrs)
+        # dovyúčtuj rozběhnutý interval
+        end = clock.now.replace(second=0, microsecond=0) + timedelta(minutes=minutes - clock.now.minute % minutes)
+        end = end.replace(second=5)
+        while tick <= end:
+            clock.now = tick
+            fire_time(tick)
+            tick += step
+        elapsed = time.perf_counter() - t_start
+
+        await unload_entry(hass, entry, entities)
+
+    return {
+        "records": records,
+        "events": len(changes),
+        "elapsed_s": elapsed,
+        "events_per_s": len(changes) / elapsed if elapsed > 0 else 0.0,
+        "span_s": changes[-1].ts - changes[0].ts,
+        "interval_min": minutes,
+        "state_writes": hass.writes,
+    }
+
+
+def summarize(result: dict) -> dict:
+    records: list[IntervalRecord] = result["records"]
+    total = {key: round(sum(getattr(r, key) for r in records), 6)
+             for key in ("kwh", "kwh_vt", "kwh_nt", "spot_cost", "fix_cost")}
+    return {
+        "intervals": len(records),
+        "first": records[0].start.isoformat() if records else None,
+        "last": records[-1].end.isoformat() if records else None,
+        **total,
+        "spot_minus_fix": round(total["spot_cost"] - total["fix_cost"], 6),
+        "events": result["events"],
+        "events_per_s": round(result["events_per_s"]),
+        "elapsed_s": round(result["elapsed_s"], 3),
+        "speedup": round(result["span_s"] / result["elapsed_s"]) if result["elapsed_s"] > 0 else None,
+        "interval_min": result["interval_min"],
+        "state_writes": result["state_writes"],
+    }
+
+
+def write_records(records: list[IntervalRecord], fh) -> None:
+    writer = csv.writer(fh)
+    writer.writerow(_FIELDS)
+    for r in records:
+        writer.writerow([r.start.isoformat(), r.end.isoformat()] + [getattr(r, k) for k in _FIELDS[2:]])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("trace", help="CSV (entity_id,timestamp,state,unit) nebo JSONL")
+    ap.add_argument("--entry", metavar="PATH", help="nastavení profilu (JSON: data/options config entry)")
+    ap.add_argument("--hdo", help="HDO přepínač")
+    ap.add_argument("--spot", help="senzor spotové ceny")
+    ap.add_argument("--total", help="senzor celkové spotřeby")
+    ap.add_argument("--phase", action="append", help="senzor fáze (až 3×)")
+    ap.add_argument("--interval", type=int, choices=(60, 15), help="zúčtovací interval [min]")
+    ap.add_argument("--integration", choices=("trapezoid", "hold"), help="režim integrace výkonu")
+    ap.add_argument("--out", metavar="PATH", help="uzavřené intervaly do CSV ('-' = stdout)")
+    ap.add_argument("--json", metavar="PATH", help="ulož souhrn")
+    args = ap.parse_args()
+
+    data = _entry_data(args)
+    if not any(data.get(k) for k in _CONSUMPTION):
+        ap.error("chybí zdroj spotřeby (--total / --phase / --entry)")
+
+    result = asyncio.run(replay(read_trace(args.trace), data))
+    summary = summarize(result)
+
+    if args.out == "-":
+        write_records(result["records"], sys.stdout)
+    elif args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as fh:
+            write_records(result["records"], fh)
+    out = sys.stderr if args.out == "-" else sys.stdout
+    for key, value in summary.items():
+        print(f"{key:16s} {value}", file=out)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
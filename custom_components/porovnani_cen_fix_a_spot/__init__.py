@@ -1,23 +1,128 @@
 from __future__ import annotations
 
+import logging
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import Platform
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    DATA_HUB,
+    SIGNAL_OPTIONS_UPDATED,
+    STORAGE_VERSION, STORAGE_KEY_WINDOWS,
+    CONF_CONS_TOTAL_ENERGY, CONF_CONS_PHASE1, CONF_CONS_PHASE2, CONF_CONS_PHASE3,
+    CONF_SPOT_PRICE_SENSOR, DEFAULT_SPOT_PRICE_SENSOR,
+    CONF_PUBLISH_MIN_INTERVAL, CONF_PUBLISH_DEADBAND,
+    CONF_SETTLEMENT_INTERVAL, SETTLEMENT_INTERVALS, DEFAULT_SETTLEMENT_INTERVAL,
+    CONF_COMPRESSION_TOLERANCE, CONF_COMPRESSION_MAX_SAMPLES,
+    CONF_POWER_INTEGRATION, POWER_INTEGRATION_MODES, DEFAULT_POWER_INTEGRATION,
+    CONF_HOLD_STEP, HOLD_STEPS, DEFAULT_HOLD_STEP,
+    CONF_CONSUMPTION_SOURCE, CONSUMPTION_SOURCES, DEFAULT_CONSUMPTION_SOURCE,
+)
+from .graph import DataflowGraph
+from .hub import get_hub
+from .planner import appliances_from_entry
+from .pricing import OfferBook
+from .services import async_setup_services
+from .stats import EntryStats
+from .tariff import Tariff, offers_from_entry
 
-from .const import DOMAIN
+LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+# klíče cfg, jejichž změna vyžaduje přihlásit se k jiným entitám
+_CONSUMPTION_KEYS = ("cons_total", "cons_l1", "cons_l2", "cons_l3")
+
+
+def _entry_config(entry: ConfigEntry) -> dict:
+    """Zdrojové entity profilu (options → data)."""
+    def g(key: str, default: str = "") -> str:
+        return (entry.options.get(key, entry.data.get(key)) or default).strip()
+
+    return {
+        "source_entity_id": g("source_entity_id"),
+        "cons_total": g(CONF_CONS_TOTAL_ENERGY),
+        "cons_l1": g(CONF_CONS_PHASE1),
+        "cons_l2": g(CONF_CONS_PHASE2),
+        "cons_l3": g(CONF_CONS_PHASE3),
+        "spot_price_sensor": g(CONF_SPOT_PRICE_SENSOR, DEFAULT_SPOT_PRICE_SENSOR),
+    }
+
+
+def _settlement_interval(entry: ConfigEntry) -> int:
+    """Délka zúčtovacího intervalu v minutách (60 / 15); neplatná hodnota → default."""
+    raw = entry.options.get(CONF_SETTLEMENT_INTERVAL, entry.data.get(CONF_SETTLEMENT_INTERVAL))
+    try:
+        minutes = int(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_SETTLEMENT_INTERVAL
+    return minutes if minutes in SETTLEMENT_INTERVALS else DEFAULT_SETTLEMENT_INTERVAL
+
+
+def _integration_config(entry: ConfigEntry) -> tuple[str, int]:
+    """(režim integrace výkonu, krok držení [s]); neplatné hodnoty → default."""
+    mode = entry.options.get(CONF_POWER_INTEGRATION, entry.data.get(CONF_POWER_INTEGRATION))
+    if mode not in POWER_INTEGRATION_MODES:
+        mode = DEFAULT_POWER_INTEGRATION
+    try:
+        step = int(entry.options.get(CONF_HOLD_STEP, entry.data.get(CONF_HOLD_STEP)))
+    except (TypeError, ValueError):
+        step = DEFAULT_HOLD_STEP
+    return mode, step if step in HOLD_STEPS else DEFAULT_HOLD_STEP
+
+
+def _consumption_source(entry: ConfigEntry) -> str:
+    """Zdroj spotřeby: živé události, nebo krátkodobé statistiky recorderu."""
+    source = entry.options.get(CONF_CONSUMPTION_SOURCE, entry.data.get(CONF_CONSUMPTION_SOURCE))
+    return source if source in CONSUMPTION_SOURCES else DEFAULT_CONSUMPTION_SOURCE
+
+
+def _offer_layout(book: OfferBook | None) -> tuple:
+    """Co určuje entity nabídek (název, slug, produkt) – změna = reload."""
+    return tuple((o.name, o.slug, o.product) for o in book.offers) if book is not None else ()
+
+
+def _publish_config(entry: ConfigEntry) -> tuple:
+    return tuple(entry.options.get(k, entry.data.get(k)) for k in (CONF_PUBLISH_MIN_INTERVAL, CONF_PUBLISH_DEADBAND))
+
+
+def _compression_config(entry: ConfigEntry) -> tuple:
+    return tuple(entry.options.get(k, entry.data.get(k)) for k in (CONF_COMPRESSION_TOLERANCE, CONF_COMPRESSION_MAX_SAMPLES))
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Služby domény (import historických cen) – nezávisle na profilech."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up the integration from a Config Entry."""
     hass.data.setdefault(DOMAIN, {})
 
-    source_entity_id = entry.options.get(
-        "source_entity_id", entry.data.get("source_entity_id")
-    )
-
-    hass.data[DOMAIN][entry.entry_id] = {"source_entity_id": source_entity_id}
+    cfg = _entry_config(entry)
+    # ceny se parsují jednou – senzory čtou jen předpočítaný snímek
+    cfg["tariff"] = Tariff.from_entry(entry)
+    cfg["offers"] = OfferBook(offers_from_entry(entry))
+    cfg["appliances"] = appliances_from_entry(entry)
+    cfg["publish"] = _publish_config(entry)
+    cfg["compression"] = _compression_config(entry)
+    cfg["interval"] = _settlement_interval(entry)
+    cfg["integration"] = _integration_config(entry)
+    cfg["consumption_source"] = _consumption_source(entry)
+    # sdílené přihlášení ke zdrojům a časovače pro všechny profily
+    cfg["hub"] = get_hub(hass)
+    cfg["stats"] = EntryStats()
+    # přepočty mezi senzory (spotřeba → ceny → náklady → akumulátory)
+    cfg["graph"] = DataflowGraph()
+    hass.data[DOMAIN][entry.entry_id] = cfg
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
@@ -26,13 +131,79 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 
 async def _update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload integration when options change."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Aplikuj změnu options za běhu; reload jen při změně HDO přepínače, intervalu, integrace nebo seznamu nabídek či spotřebičů."""
+    cfg = hass.data[DOMAIN].get(entry.entry_id)
+    if cfg is None:
+        return
+
+    new_cfg = _entry_config(entry)
+    offers = OfferBook(offers_from_entry(entry))
+    appliances = appliances_from_entry(entry)
+    if (
+        # HDO přepínač je součástí unique_id HDO senzoru – nutný reload
+        new_cfg["source_entity_id"] != cfg.get("source_entity_id")
+        # délka intervalu mění okno spotřeby, časovač i rozpočet paušálu
+        or _settlement_interval(entry) != cfg.get("interval")
+        # jiný režim integrace = jiný typ oken výkonu
+        or _integration_config(entry) != cfg.get("integration")
+        or _consumption_source(entry) != cfg.get("consumption_source")
+        # přidaná / odebraná / přejmenovaná nabídka = jiné entity
+        or _offer_layout(offers) != _offer_layout(cfg.get("offers"))
+        # přidaný / odebraný / přejmenovaný spotřebič = jiné entity (i uzel plánu v grafu)
+        or [a.slug for a in appliances] != [a.slug for a in cfg.get("appliances", ())]
+    ):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    changed: set[str] = set()
+
+    tariff = Tariff.from_entry(entry)
+    if tariff != cfg.get("tariff"):
+        cfg["tariff"] = tariff
+        changed.add("tariff")
+    if offers.offers != cfg["offers"].offers:
+        # ceny nabídek (i zděděné z profilu) – uzavření intervalu čte cfg["offers"]
+        cfg["offers"] = offers
+        changed.add("offers")
+    if appliances != cfg.get("appliances"):
+        # jen parametry (délka, energie, …) – přeplánuje uzel plánu
+        cfg["appliances"] = appliances
+        changed.add("appliances")
+
+    if any(new_cfg[k] != cfg.get(k) for k in _CONSUMPTION_KEYS):
+        changed.add("consumption")
+    if new_cfg["spot_price_sensor"] != cfg.get("spot_price_sensor"):
+        changed.add("spot_price")
+    cfg.update(new_cfg)
+
+    publish = _publish_config(entry)
+    if publish != cfg.get("publish"):
+        cfg["publish"] = publish
+        changed.add("publish")
+
+    compression = _compression_config(entry)
+    if compression != cfg.get("compression"):
+        cfg["compression"] = compression
+        changed.add("compression")
+
+    if changed:
+        LOGGER.debug("Options of %s applied in place: %s", entry.entry_id, sorted(changed))
+        async_dispatcher_send(hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id), changed)
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        domain_data = hass.data[DOMAIN]
+        domain_data.pop(entry.entry_id, None)
+        hub = domain_data.get(DATA_HUB)
+        # úložiště historických cen zůstává pro služby i bez profilů
+        if hub is not None and hub.idle and not any(isinstance(v, dict) for v in domain_data.values()):
+            domain_data.pop(DATA_HUB)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Smaž uložená okna spotřeby odebraného profilu."""
+    await Store(hass, STORAGE_VERSION, STORAGE_KEY_WINDOWS.format(entry.entry_id)).async_remove()
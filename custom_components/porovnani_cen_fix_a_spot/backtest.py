@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, TypeVar
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from homeassistant.components.recorder import get_instance                                         # type: ignore
+from homeassistant.components.recorder.history import state_changes_during_period                  # type: ignore
+from homeassistant.components.recorder.statistics import statistics_during_period                  # type: ignore
+from homeassistant.core import HomeAssistant                                                        # type: ignore
+
+from .hub import hdo_is_nt
+from .price_store import PriceStore
+from .pricing import batch_costs
+from .tariff import Tariff
+
+LOGGER = logging.getLogger(__name__)
+
+# dlouhodobé statistiky recorderu jsou hodinové
+STEP = 3600
+# jeden dotaz do databáze pokrývá nejvýš tolik dní (paměť i délka transakce)
+CHUNK_DAYS = 31
+_UNITS = {"energy": "kWh", "power": "kW"}
+
+T = TypeVar("T")
+
+
+# ---------------------------
+# Výpočty nad poli (bez závislosti na HA)
+# ---------------------------
+
+def hourly_kwh(rows_by_ent: dict[str, list[dict]], t0: float, n: int) -> np.ndarray:
+    """Spotřeba po hodinách ze statistik: energie = `change`, výkon = `mean` × 1 h; chybí = NaN."""
+    out = np.full(n, np.nan)
+    for rows in rows_by_ent.values():
+        for row in rows:
+            start = row["start"]
+            ts = start.timestamp() if isinstance(start, datetime) else float(start)
+            i = int((ts - t0) // STEP)
+            if not 0 <= i < n:
+                continue
+            if row.get("change") is not None:
+                kwh = max(0.0, row["change"])
+            elif row.get("mean") is not None:
+                kwh = max(0.0, row["mean"]) * STEP / 3600.0
+            else:
+                continue
+            out[i] = kwh if out[i] != out[i] else out[i] + kwh
+    return out
+
+
+def nt_shares(changes: Iterable[tuple[float, bool | None]], t0: float, n: int) -> np.ndarray:
+    """Podíl NT v každé hodině z průběhu HDO (čas změny, NT?); před první změnou VT.
+
+    Kumulované sekundy NT jsou po částech lineární funkce času – na hranicích
+    hodin je stačí interpolovat.
+    """
+    pts = sorted((max(ts, t0), bool(is_nt)) for ts, is_nt in changes)
+    edges = t0 + np.arange(n + 1, dtype=np.float64) * STEP
+    if not pts:
+        return np.zeros(n)
+    times = np.array([t for t, _ in pts] + [edges[-1]], dtype=np.float64)
+    times = np.minimum(times, edges[-1])
+    state = np.array([s for _, s in pts], dtype=np.float64)
+    cum = np.concatenate(([0.0], np.cumsum(state * np.diff(times))))
+    nt_at = np.interp(edges, np.concatenate(([t0], times)), np.concatenate(([0.0], cum)))
+    return np.clip(np.diff(nt_at) / STEP, 0.0, 1.0)
+
+
+def month_edges(t0: float, t1: float, tz: ZoneInfo) -> list[tuple[str, float]]:
+    """Začátky místních měsíců v [t0, t1) jako (YYYY-MM, epoch s); první = t0."""
+    local = datetime.fromtimestamp(t0, tz)
+    edges = [(local.strftime("%Y-%m"), t0)]
+    year, month = local.year, local.month
+    while True:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        ts = datetime(year, month, 1, tzinfo=tz).timestamp()
+        if ts >= t1:
+            return edges
+        edges.append((f"{year:04d}-{month:02d}", ts))
+
+
+def _empty_month() -> dict[str, float]:
+    return dict.fromkeys(
+        ("kwh", "kwh_vt", "kwh_nt", "spot_cost", "spot_fee", "fix_cost", "fix_fee",
+         "hours", "hours_without_consumption", "hours_without_price"), 0.0,
+    )
+
+
+def accumulate(
+    months: dict[str, dict[str, float]], edges: list[tuple[str, float]], tariff: Tariff,
+    starts: np.ndarray, kwh: np.ndarray, prices: np.ndarray, nt: np.ndarray,
+) -> None:
+    """Náklady jedné dávky hodin přičti k měsícům (hodiny bez ceny nebo spotřeby se vynechají)."""
+    ok = ~np.isnan(kwh) & ~np.isnan(prices)
+    costs = batch_costs(tariff, np.where(ok, kwh, 0.0), prices, nt, starts, STEP // 60)
+    month_idx = np.searchsorted([ts for _, ts in edges], starts, side="right") - 1
+    for m in np.unique(month_idx):
+        sel = month_idx == m
+        use = sel & ok
+        acc = months.setdefault(edges[m][0], _empty_month())
+        acc["hours"] += int(use.sum())
+        acc["hours_without_consumption"] += int((sel & np.isnan(kwh)).sum())
+        acc["hours_without_price"] += int((sel & ~np.isnan(kwh) & np.isnan(prices)).sum())
+        for key in ("kwh", "kwh_vt", "kwh_nt", "spot_cost", "spot_fee", "fix_cost", "fix_fee"):
+            acc[key] += float(getattr(costs, key)[use].sum())
+
+
+# ---------------------------
+# Backtest nad recorderem
+# ---------------------------
+
+def _hdo_shares(hass: HomeAssistant, hdo: str, t0: float, n: int) -> np.ndarray:
+    """Podíl NT v hodinách [t0, t0 + n h) z historie HDO přepínače – blokující."""
+    start = datetime.fromtimestamp(t0, timezone.utc)
+    states = state_changes_during_period(
+        hass, start, start + timedelta(seconds=n * STEP), hdo, no_attributes=True, include_start_time_state=True,
+    ).get(hdo, [])
+    return nt_shares([(s.last_changed.timestamp(), hdo_is_nt(s) is True) for s in states], t0, n)
+
+
+def _load_chunk(
+    hass: HomeAssistant, store: PriceStore, ids: list[str], hdo: str, t0: float, n: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(začátky, kWh, cena, podíl NT) pro hodiny [t0, t0 + n h) – blokující, executor recorderu."""
+    start = datetime.fromtimestamp(t0, timezone.utc)
+    end = start + timedelta(seconds=n * STEP)
+    rows = statistics_during_period(hass, start, end, set(ids), "hour", _UNITS, {"change", "mean"})
+    kwh = hourly_kwh(rows, t0, n)
+    nt = _hdo_shares(hass, hdo, t0, n) if hdo else np.zeros(n)
+    prices = np.frombuffer(store.prices(t0, t0 + n * STEP, STEP), dtype=np.float64)
+    starts = t0 + np.arange(n, dtype=np.float64) * STEP
+    return starts, kwh, prices, nt
+
+
+async def async_map_chunks(
+    hass: HomeAssistant, store: PriceStore, ids: list[str], hdo: str, t0: float, t1: float,
+    reduce: Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], T],
+) -> list[T]:
+    """Načti historii po dávkách (`CHUNK_DAYS`) a každou zpracuj `reduce` – vše v executoru recorderu."""
+    if t1 <= t0:
+        raise ValueError("prázdné období")
+
+    def _job(t: float, n: int) -> T:
+        return reduce(*_load_chunk(hass, store, ids, hdo, t, n))
+
+    recorder = get_instance(hass)
+    out: list[T] = []
+    t = t0
+    while t < t1:
+        n = int(min(CHUNK_DAYS * 86400, t1 - t) // STEP)
+        out.append(await recorder.async_add_executor_job(_job, t, n))
+        t += n * STEP
+    return out
+
+
+async def async_load_series(
+    hass: HomeAssistant, store: PriceStore, ids: list[str], hdo: str, t0: float, t1: float, step: int = STEP,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Celá řada (začátky, kWh, cena, podíl NT) po krocích `step` (3600 / 900 s).
+
+    Spotřeba i HDO jsou hodinové (statistiky recorderu) – v kratším kroku se
+    rozdělí rovnoměrně; ceny se berou z úložiště přímo v kroku `step`.
+    """
+    parts = await async_map_chunks(hass, store, ids, hdo, t0, t1, lambda *arrays: arrays)
+    starts, kwh, prices, nt = (np.concatenate(arrays) for arrays in zip(*parts))
+    if step != STEP:
+        ratio = STEP // step
+        starts = (starts[:, None] + np.arange(ratio) * step).ravel()
+        kwh = np.repeat(kwh / ratio, ratio)
+        nt = np.repeat(nt, ratio)
+        prices = np.frombuffer(
+            await get_instance(hass).async_add_executor_job(store.prices, t0, t1, step), dtype=np.float64,
+        )
+    return starts, kwh, prices, nt
+
+
+def hour_range(start: datetime, end: datetime) -> tuple[float, float]:
+    return start.timestamp() // STEP * STEP, -(-end.timestamp() // STEP) * STEP
+
+
+async def async_backtest(
+    hass: HomeAssistant, tariff: Tariff, store: PriceStore, consumption: list[str], hdo: str,
+    start: datetime, end: datetime,
+) -> dict[str, Any]:
+    """Co by stál fix a spot za [start, end) při současném nastavení, po měsících.
+
+    Data se čtou i počítají po dávkách (`CHUNK_DAYS`) v executoru recorderu;
+    event loop jen sčítá měsíční součty dávek.
+    """
+    t0, t1 = hour_range(start, end)
+    edges = month_edges(t0, t1, ZoneInfo(hass.config.time_zone))
+
+    def _reduce(starts, kwh, prices, nt) -> dict[str, dict[str, float]]:
+        part: dict[str, dict[str, float]] = {}
+        accumulate(part, edges, tariff, starts, kwh, prices, nt)
+        return part
+
+    months: dict[str, dict[str, float]] = {}
+    parts = await async_map_chunks(hass, store, consumption, hdo, t0, t1, _reduce)
+    for part in parts:
+        for key, acc in part.items():
+            into = months.setdefault(key, _empty_month())
+            for name, value in acc.items():
+                into[name] += value
+
+    total = _empty_month()
+    for acc in months.values():
+        for key, value in acc.items():
+            total[key] += value
+    for acc in (*months.values(), total):
+        acc["spot_total"] = acc["spot_cost"] + acc["spot_fee"]
+        acc["spot_minus_fix"] = acc["spot_total"] - acc["fix_cost"]
+        for key, value in acc.items():
+            acc[key] = round(value, 3) if isinstance(value, float) and not key.startswith("hours") else int(value)
+    LOGGER.debug("Backtest %s – %s: %d dávek, %d měsíců", start, end, len(parts), len(months))
+    return {
+        "start": datetime.fromtimestamp(t0, timezone.utc).isoformat(),
+        "end": datetime.fromtimestamp(t1, timezone.utc).isoformat(),
+        "months": [{"month": key, **acc} for key, acc in sorted(months.items())],
+        "total": total,
+    }
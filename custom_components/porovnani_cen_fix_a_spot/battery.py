@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import math
+from dataclasses import asdict, dataclass
+from datetime import datetime, tzinfo
+from typing import Any
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .pricing import batch_costs
+from .tariff import Tariff
+
+# ---------------------------
+# Simulace baterie / chytrého nabíjení elektromobilu (bez závislosti na HA)
+# ---------------------------
+#
+# Stav nabití je rozdělený na `levels` kroků. Dynamické programování jde od
+# konce období: pro každý interval a každý stav vybere změnu stavu j (nabíjení
+# j > 0, vybíjení j < 0, v mezích výkonu), která minimalizuje
+#   cena[t] · max(0, spotřeba[t] + odběr(j)) + V[t + 1](s + j).
+# Jeden krok je pár operací nad maticí stavy × změny (okno nad V[t + 1]),
+# takže rok po 15 minutách (35 tis. kroků) je řádově sekunda. Přetoky do sítě
+# se neprodávají – vybíjet víc, než dům spotřebuje, se nevyplatí.
+#
+# Elektromobil = baterie bez vybíjení do domu, nabíjí se jen doma
+# (příjezd–odjezd) a při odjezdu z ní ubude denní spotřeba (stav pod ní je
+# nepřípustný). Srovnává se s nabíjením hned po příjezdu plným výkonem.
+#
+# Ceny i paušály jsou z `pricing.batch_costs` – náklady (vč. paušálu) jsou tak
+# srovnatelné s backtestem; paušál na řízení nezávisí, úsporu nemění.
+
+# nejvýš tolik velikostí v jednom běhu (každá = dvě úlohy DP, rok po 15 min ≈ 1,5 s)
+MAX_SIZES = 32
+
+
+@dataclass(frozen=True, slots=True)
+class Storage:
+    """Parametry úložiště; účinnost je celková (nabití + vybití)."""
+
+    capacity: float                 # [kWh] využitelná kapacita
+    charge_kw: float                # [kW] max. nabíjecí výkon (ze sítě)
+    discharge_kw: float             # [kW] max. vybíjecí výkon (do domu); 0 = elektromobil
+    efficiency: float = 0.9
+    levels: int = 100               # kroků stavu nabití
+
+
+@dataclass(frozen=True, slots=True)
+class EvUsage:
+    """Denní provoz elektromobilu (místní hodiny)."""
+
+    daily_kwh: float                # [kWh] odebere se při odjezdu
+    arrival: int = 17
+    departure: int = 7
+
+
+@dataclass(frozen=True, slots=True)
+class Series:
+    """Vstupní řada intervalů; chybějící spotřeba = 0, chybějící cena = poslední známá."""
+
+    starts: np.ndarray              # [epoch s]
+    load: np.ndarray                # [kWh] spotřeba domu za interval
+    prices: dict[str, np.ndarray]   # produkt → jednotková cena [Kč/kWh]
+    fees: dict[str, np.ndarray]     # produkt → paušál rozpočítaný na interval [Kč]
+    step: float                     # [s]
+
+
+def tariff_series(
+    tariff: Tariff, spot: Any, nt_share: Any, starts: Any, step: float,
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """(jednotkové ceny, paušály) obou produktů – stejný vzorec jako backtest (náklady 1 kWh)."""
+    unit = batch_costs(tariff, np.ones(len(starts)), spot, nt_share, starts, int(step // 60))
+    return {"spot": unit.spot_unit, "fix": unit.fix_unit}, {"spot": unit.spot_fee, "fix": unit.fix_fee}
+
+
+def fill_prices(prices: np.ndarray) -> tuple[np.ndarray, int]:
+    """Doplň chybějící ceny poslední známou (na začátku první známou); vrací i počet doplněných."""
+    missing = np.isnan(prices)
+    if missing.all():
+        raise ValueError("v období nejsou žádné spotové ceny")
+    idx = np.where(missing, 0, np.arange(len(prices)))
+    np.maximum.accumulate(idx, out=idx)
+    filled = prices[idx]
+    first = np.flatnonzero(~missing)[0]
+    filled[:first] = prices[first]
+    return filled, int(missing.sum())
+
+
+def ev_schedule(starts: np.ndarray, step: float, tz: tzinfo, ev: EvUsage) -> tuple[np.ndarray, np.ndarray]:
+    """(doma?, kWh odebrané na konci intervalu) podle místních hodin příjezdu a odjezdu."""
+    hours = np.array([datetime.fromtimestamp(float(t), tz).hour for t in starts], dtype=np.int64)
+    if ev.arrival > ev.departure:
+        home = (hours >= ev.arrival) | (hours < ev.departure)
+    else:
+        home = (hours >= ev.arrival) & (hours < ev.departure)
+    drain = np.zeros(len(starts))
+    # odjezd = poslední interval doma před časem odjezdu
+    leaving = home & ~np.roll(home, -1)
+    leaving[-1] = False
+    drain[leaving] = ev.daily_kwh
+    return home, drain
+
+
+def dispatch(
+    price: np.ndarray, load: np.ndarray, dt_h: float, storage: Storage,
+    home: np.ndarray | None = None, drain: np.ndarray | None = None,
+) -> dict[str, float]:
+    """Optimální řízení úložiště nad řadou cen; začíná prázdné, konec je volný."""
+    n = len(price)
+    k = storage.levels
+    res = storage.capacity / k
+    eta = math.sqrt(storage.efficiency)
+    up = int(math.floor(storage.charge_kw * dt_h * eta / res + 1e-9))
+    down = int(math.floor(storage.discharge_kw * dt_h / (eta * res) + 1e-9))
+    steps = np.arange(-down, up + 1)
+    # změna odběru ze sítě pro každou změnu stavu
+    grid_delta = np.where(steps > 0, steps * res / eta, steps * res * eta)
+    zero = down                                         # index j = 0
+    need = np.zeros(n, dtype=np.int64) if drain is None else np.ceil(drain / res - 1e-9).astype(np.int64)
+    if need.max(initial=0) > k:
+        raise ValueError("denní spotřeba elektromobilu je větší než kapacita")
+
+    policy = np.empty((n, k + 1), dtype=np.int16)
+    value = np.zeros(k + 1)
+    pad = np.full(k + 1 + down + up, np.inf)
+    window = sliding_window_view(pad, len(steps))      # řádek s = stavy s − down … s + up
+    rows = np.arange(k + 1)
+    for t in range(n - 1, -1, -1):
+        nxt = value
+        if need[t]:
+            nxt = np.full(k + 1, np.inf)
+            nxt[need[t]:] = value[:k + 1 - need[t]]
+        pad[down:down + k + 1] = nxt
+        cost = price[t] * np.maximum(0.0, load[t] + grid_delta)
+        if home is not None and not home[t]:
+            cost = np.where(steps == 0, cost, np.inf)
+        total = window + cost
+        choice = total.argmin(axis=1)
+        policy[t] = choice
+        value = total[rows, choice]
+    if not np.isfinite(value[0]):
+        raise ValueError("zadání nejde splnit (výkon nebo doba nabíjení nestačí)")
+
+    # dopředný průchod z prázdného stavu
+    s = 0
+    grid = np.empty(n)
+    charged = discharged = 0.0
+    for t in range(n):
+        j = int(steps[policy[t, s]])
+        grid[t] = max(0.0, load[t] + grid_delta[j + zero])
+        if j > 0:
+            charged += j * res
+        elif j < 0:
+            discharged -= j * res
+        s += j - need[t]
+    return {
+        "cost": float((price * grid).sum()),
+        "grid_kwh": float(grid.sum()),
+        "charged_kwh": charged,
+        "discharged_kwh": discharged,
+        "cycles": discharged / storage.capacity if storage.capacity else 0.0,
+    }
+
+
+def _ev_immediate(
+    price: np.ndarray, load: np.ndarray, dt_h: float, storage: Storage, home: np.ndarray, drain: np.ndarray, target: float,
+) -> float:
+    """Náklady nabíjení hned po příjezdu plným výkonem na denní potřebu (srovnávací základ elektromobilu)."""
+    soc = 0.0
+    cost = 0.0
+    per_step = storage.charge_kw * dt_h
+    eta = math.sqrt(storage.efficiency)
+    target = min(target, storage.capacity)
+    for t in range(len(price)):
+        grid = load[t]
+        if home[t] and soc < target:
+            draw = min(per_step, (target - soc) / eta)
+            soc += draw * eta
+            grid += draw
+        cost += price[t] * grid
+        soc = max(0.0, soc - drain[t])
+    return float(cost)
+
+
+def simulate(series: Series, storage: Storage, ev: EvUsage | None = None, tz: tzinfo | None = None) -> dict[str, Any]:
+    """Úspora úložiště pro oba produkty nad jednou řadou intervalů (náklady vč. paušálu)."""
+    dt_h = series.step / 3600.0
+    home = drain = None
+    if ev is not None:
+        home, drain = ev_schedule(series.starts, series.step, tz, ev)
+    out: dict[str, Any] = {"storage": asdict(storage)}
+    for product, price in series.prices.items():
+        result = dispatch(price, series.load, dt_h, storage, home, drain)
+        if ev is None:
+            baseline = float((price * series.load).sum())
+        else:
+            baseline = _ev_immediate(price, series.load, dt_h, storage, home, drain, ev.daily_kwh)
+        fees = float(series.fees[product].sum())
+        result["cost"] += fees
+        result = {key: round(value, 3) for key, value in result.items()}
+        result["fees"] = round(fees, 3)
+        result["baseline"] = round(baseline + fees, 3)
+        result["saving"] = round(result["baseline"] - result["cost"], 3)
+        out[product] = result
+    out["spot_minus_fix"] = round(out["spot"]["cost"] - out["fix"]["cost"], 3)
+    return out
+
+
+def sweep_storage(
+    series: Series, storages: list[Storage], ev: EvUsage | None = None, tz: tzinfo | None = None,
+) -> list[dict[str, Any]]:
+    """Simulace více velikostí nad stejnou řadou – blokující, volá se v executoru."""
+    if len(storages) > MAX_SIZES:
+        raise ValueError(f"nejvýš {MAX_SIZES} velikostí")
+    return [simulate(series, storage, ev, tz) for storage in storages]
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from time import monotonic
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback                                              # type: ignore
+from homeassistant.helpers.event import async_call_later                                            # type: ignore
+
+
+class WriteCoalescer:
+    """Slučování zápisů stavu entity (rate-limit + pásmo necitlivosti).
+
+    - změna menší než `deadband` proti naposledy publikované hodnotě se nezapisuje,
+    - mezi dvěma zápisy uplyne alespoň `min_interval` sekund; co přijde mezitím,
+      se zapíše jednou po uplynutí intervalu (poslední hodnota vyhrává),
+    - `flush()` zapíše vždy, pokud se hodnota od posledního zápisu změnila
+      (volá se na hranici hodiny).
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        write: Callable[[], None],
+        min_interval: float = 0.0,
+        deadband: float = 0.0,
+    ) -> None:
+        self.hass = hass
+        self._write = write
+        self.min_interval = max(0.0, float(min_interval))
+        self.deadband = max(0.0, float(deadband))
+
+        self._published: float | None = None
+        self._pending: float | None = None
+        self._has_pending = False
+        self._last_write: float = 0.0
+        self._unsub_timer: Callable[[], None] | None = None
+
+    def configure(self, min_interval: float, deadband: float) -> None:
+        """Změna parametrů za běhu (změna options bez reloadu)."""
+        self.min_interval = max(0.0, float(min_interval))
+        self.deadband = max(0.0, float(deadband))
+
+    @callback
+    def request(self, value: float | None) -> None:
+        """Nová hodnota entity – zapiš hned, později, nebo vůbec."""
+        if value is not None and self._published is not None:
+            if abs(value - self._published) < self.deadband:
+                self._has_pending = False
+                return
+        wait = self.min_interval - (monotonic() - self._last_write)
+        if wait <= 0:
+            self._do_write(value)
+            return
+        self._pending = value
+        self._has_pending = True
+        if self._unsub_timer is None:
+            self._unsub_timer = async_call_later(self.hass, wait, self._on_timer)
+
+    @callback
+    def flush(self, value: float | None) -> None:
+        """Vynucený zápis (hranice hodiny) – bez ohledu na interval i pásmo."""
+        if value == self._published and not self._has_pending:
+            return
+        self._do_write(value)
+
+    @callback
+    def cancel(self) -> None:
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._has_pending = False
+
+    @callback
+    def _on_timer(self, _now) -> None:
+        self._unsub_timer = None
+        if self._has_pending:
+            self._do_write(self._pending)
+
+    def _do_write(self, value: float | None) -> None:
+        self._has_pending = False
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._published = value
+        self._last_write = monotonic()
+        self._write()
@@ -26,9 +26,30 @@ from .const import (
     # --- senzory spotřeby energie domácnosti (celková nebo po fázích)
     CONF_CONS_TOTAL_ENERGY, CONF_CONS_PHASE1, CONF_CONS_PHASE2, CONF_CONS_PHASE3,
     DEFAULT_CONS_TOTAL_ENERGY, DEFAULT_CONS_PHASE1, DEFAULT_CONS_PHASE2, DEFAULT_CONS_PHASE3,
+    # --- senzor spotové ceny
+    CONF_SPOT_PRICE_SENSOR, DEFAULT_SPOT_PRICE_SENSOR,
     # --- profil
     CONF_PROFILE_NAME, DEFAULT_PROFILE_NAME,
+    # --- zápis stavu
+    CONF_PUBLISH_MIN_INTERVAL, CONF_PUBLISH_DEADBAND,
+    DEFAULT_PUBLISH_MIN_INTERVAL, DEFAULT_PUBLISH_DEADBAND,
+    # --- interval vyúčtování
+    CONF_SETTLEMENT_INTERVAL, SETTLEMENT_INTERVALS, DEFAULT_SETTLEMENT_INTERVAL,
+    # --- komprese oken výkonu
+    CONF_COMPRESSION_TOLERANCE, CONF_COMPRESSION_MAX_SAMPLES,
+    DEFAULT_COMPRESSION_TOLERANCE, DEFAULT_COMPRESSION_MAX_SAMPLES,
+    # --- integrace výkonu
+    CONF_POWER_INTEGRATION, POWER_INTEGRATION_MODES, DEFAULT_POWER_INTEGRATION,
+    CONF_HOLD_STEP, HOLD_STEPS, DEFAULT_HOLD_STEP,
+    # --- zdroj spotřeby
+    CONF_CONSUMPTION_SOURCE, CONSUMPTION_SOURCES, DEFAULT_CONSUMPTION_SOURCE,
+    # --- další nabídky
+    CONF_OFFERS,
+    # --- plánovač spotřebičů
+    CONF_APPLIANCES,
 )
+from .planner import parse_appliances
+from .tariff import parse_offers
 
 
 # Úvodní konfigurace (výběr HDO + spotřeba)
@@ -119,7 +140,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     async def async_step_menu(self, user_input=None):
         return self.async_show_menu(
             step_id="menu",
-            menu_options=["fix", "spot", "distribuce", "poze", "profil"]
+            menu_options=["fix", "spot", "distribuce", "poze", "zdroje", "profil", "zapis", "vyuctovani", "komprese", "integrace", "nabidky", "spotrebice"]
         )
 
     # ==== FIX: jedna stránka s obchodní cenou VT/NT (a později sem může přijít i paušál) ====
@@ -279,6 +300,52 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         return self.async_show_form(step_id="distribuce", data_schema=schema)
 
+    # ==== ZDROJE: senzory spotřeby a spotové ceny (mění se bez reloadu) ====
+    async def async_step_zdroje(self, user_input=None):
+        errors: dict[str, str] = {}
+        opts = self.config_entry.options
+        data = self.config_entry.data
+
+        def cur(key: str, default: str = "") -> str:
+            return opts.get(key, data.get(key)) or default
+
+        if user_input is not None:
+            total = (user_input.get(CONF_CONS_TOTAL_ENERGY) or "").strip()
+            l1 = (user_input.get(CONF_CONS_PHASE1) or "").strip()
+
+            if not total and not l1:
+                errors["base"] = "consumption_missing"
+            else:
+                new_opts = dict(opts)
+                new_opts[CONF_CONS_TOTAL_ENERGY] = total
+                new_opts[CONF_CONS_PHASE1] = l1
+                new_opts[CONF_CONS_PHASE2] = (user_input.get(CONF_CONS_PHASE2) or "").strip()
+                new_opts[CONF_CONS_PHASE3] = (user_input.get(CONF_CONS_PHASE3) or "").strip()
+                new_opts[CONF_SPOT_PRICE_SENSOR] = (
+                    (user_input.get(CONF_SPOT_PRICE_SENSOR) or "").strip() or DEFAULT_SPOT_PRICE_SENSOR
+                )
+                return self.async_create_entry(title="", data=new_opts)
+
+        def optional(key: str):
+            return vol.Optional(key, description={"suggested_value": cur(key) or None})
+
+        phase_selector = selector.EntitySelector(
+            selector.EntitySelectorConfig(domain=["sensor"], device_class=["energy", "power"])
+        )
+        schema = vol.Schema({
+            optional(CONF_CONS_TOTAL_ENERGY):
+                selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain=["sensor"], device_class=["energy"])
+                ),
+            optional(CONF_CONS_PHASE1): phase_selector,
+            optional(CONF_CONS_PHASE2): phase_selector,
+            optional(CONF_CONS_PHASE3): phase_selector,
+            vol.Required(CONF_SPOT_PRICE_SENSOR, default=cur(CONF_SPOT_PRICE_SENSOR, DEFAULT_SPOT_PRICE_SENSOR)):
+                selector.EntitySelector(selector.EntitySelectorConfig(domain=["sensor"])),
+        })
+
+        return self.async_show_form(step_id="zdroje", data_schema=schema, errors=errors)
+
     async def async_step_profil(self, user_input=None):
         cur = self.config_entry.options.get(
             CONF_PROFILE_NAME,
@@ -296,3 +363,181 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             return self.async_create_entry(title="", data=new_opts)
 
         return self.async_show_form(step_id="profil", data_schema=schema)
+
+    async def async_step_zapis(self, user_input=None):
+        opts = self.config_entry.options
+        cur_interval = opts.get(CONF_PUBLISH_MIN_INTERVAL, DEFAULT_PUBLISH_MIN_INTERVAL)
+        cur_deadband = opts.get(CONF_PUBLISH_DEADBAND, DEFAULT_PUBLISH_DEADBAND)
+
+        schema = vol.Schema({
+            # Minimální odstup dvou zápisů stavu [s]
+            vol.Required(CONF_PUBLISH_MIN_INTERVAL, default=cur_interval):
+                selector.NumberSelector(
+                    selector.NumberSelectorConfig(min=0, max=3600, step=1, mode="box", unit_of_measurement="s")
+                ),
+            # Pásmo necitlivosti – menší změna se nezapisuje [kWh / Kč]
+            vol.Required(CONF_PUBLISH_DEADBAND, default=cur_deadband):
+                selector.NumberSelector(
+                    selector.NumberSelectorConfig(min=0, step=0.0001, mode="box")
+                ),
+        })
+
+        if user_input is not None:
+            new_opts = dict(self.config_entry.options)
+            new_opts[CONF_PUBLISH_MIN_INTERVAL] = float(user_input[CONF_PUBLISH_MIN_INTERVAL])
+            new_opts[CONF_PUBLISH_DEADBAND] = float(user_input[CONF_PUBLISH_DEADBAND])
+            return self.async_create_entry(title="", data=new_opts)
+
+        return self.async_show_form(step_id="zapis", data_schema=schema)
+
+    async def async_step_vyuctovani(self, user_input=None):
+        cur = self.config_entry.options.get(
+            CONF_SETTLEMENT_INTERVAL,
+            self.config_entry.data.get(CONF_SETTLEMENT_INTERVAL, DEFAULT_SETTLEMENT_INTERVAL),
+        )
+
+        schema = vol.Schema({
+            # Délka zúčtovacího intervalu [min] – OTE přešel na 15 min
+            vol.Required(CONF_SETTLEMENT_INTERVAL, default=str(cur)):
+                selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[str(m) for m in SETTLEMENT_INTERVALS],
+                        mode=selector.SelectSelectorMode.LIST,
+                    )
+                ),
+        })
+
+        if user_input is not None:
+            new_opts = dict(self.config_entry.options)
+            new_opts[CONF_SETTLEMENT_INTERVAL] = int(user_input[CONF_SETTLEMENT_INTERVAL])
+            return self.async_create_entry(title="", data=new_opts)
+
+        return self.async_show_form(step_id="vyuctovani", data_schema=schema)
+
+    async def async_step_komprese(self, user_input=None):
+        opts = self.config_entry.options
+        cur_tolerance = opts.get(CONF_COMPRESSION_TOLERANCE, DEFAULT_COMPRESSION_TOLERANCE)
+        cur_max = opts.get(CONF_COMPRESSION_MAX_SAMPLES, DEFAULT_COMPRESSION_MAX_SAMPLES)
+
+        schema = vol.Schema({
+            # Max. chyba energie za interval, kterou smí komprese vnést [Wh]; 0 = vypnuto
+            vol.Required(CONF_COMPRESSION_TOLERANCE, default=cur_tolerance):
+                selector.NumberSelector(
+                    selector.NumberSelectorConfig(min=0, max=1000, step=0.1, mode="box", unit_of_measurement="Wh")
+                ),
+            # Tvrdý strop vzorků v okně na jednu entitu výkonu; 0 = bez stropu
+            vol.Required(CONF_COMPRESSION_MAX_SAMPLES, default=cur_max):
+                selector.NumberSelector(
+                    selector.NumberSelectorConfig(min=0, max=100000, step=1, mode="box")
+                ),
+        })
+
+        if user_input is not None:
+            new_opts = dict(self.config_entry.options)
+            new_opts[CONF_COMPRESSION_TOLERANCE] = float(user_input[CONF_COMPRESSION_TOLERANCE])
+            new_opts[CONF_COMPRESSION_MAX_SAMPLES] = int(user_input[CONF_COMPRESSION_MAX_SAMPLES])
+            return self.async_create_entry(title="", data=new_opts)
+
+        return self.async_show_form(step_id="komprese", data_schema=schema)
+
+    async def async_step_integrace(self, user_input=None):
+        opts = self.config_entry.options
+        cur_mode = opts.get(CONF_POWER_INTEGRATION, DEFAULT_POWER_INTEGRATION)
+        cur_step = opts.get(CONF_HOLD_STEP, DEFAULT_HOLD_STEP)
+        cur_source = opts.get(CONF_CONSUMPTION_SOURCE, DEFAULT_CONSUMPTION_SOURCE)
+
+        schema = vol.Schema({
+            # trapezoid = lichoběžník mezi vzorky v okně; hold = poslední hodnota platí až do další
+            vol.Required(CONF_POWER_INTEGRATION, default=cur_mode):
+                selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=list(POWER_INTEGRATION_MODES),
+                        mode=selector.SelectSelectorMode.LIST,
+                    )
+                ),
+            # Virtuální krok režimu hold [s] – chyba na okraji okna ≤ výkon × krok
+            vol.Required(CONF_HOLD_STEP, default=str(cur_step)):
+                selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[str(s) for s in HOLD_STEPS],
+                        mode=selector.SelectSelectorMode.DROPDOWN,
+                    )
+                ),
+            # events = každá změna stavu; statistics = 5min statistiky recorderu (entity se state_class),
+            # nespočtený zbytek intervalu ze živého stavu
+            vol.Required(CONF_CONSUMPTION_SOURCE, default=cur_source):
+                selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=list(CONSUMPTION_SOURCES),
+                        mode=selector.SelectSelectorMode.LIST,
+                    )
+                ),
+        })
+
+        if user_input is not None:
+            new_opts = dict(self.config_entry.options)
+            new_opts[CONF_POWER_INTEGRATION] = user_input[CONF_POWER_INTEGRATION]
+            new_opts[CONF_HOLD_STEP] = int(user_input[CONF_HOLD_STEP])
+            new_opts[CONF_CONSUMPTION_SOURCE] = user_input[CONF_CONSUMPTION_SOURCE]
+            return self.async_create_entry(title="", data=new_opts)
+
+        return self.async_show_form(step_id="integrace", data_schema=schema)
+
+    # ==== NABÍDKY: další tarify oceňované nad stejnou spotřebou (seznam v YAML) ====
+    async def async_step_nabidky(self, user_input=None):
+        errors: dict[str, str] = {}
+        placeholders = {"error": ""}
+        opts = self.config_entry.options
+        cur = opts.get(CONF_OFFERS) or []
+
+        if user_input is not None:
+            offers = user_input.get(CONF_OFFERS) or []
+            try:
+                # chybějící parametry nabídky se dědí z profilu
+                parse_offers(offers, opts, self.config_entry.data)
+            except ValueError as err:
+                errors["base"] = "offers_invalid"
+                placeholders["error"] = str(err)
+                cur = offers
+            else:
+                new_opts = dict(opts)
+                new_opts[CONF_OFFERS] = [dict(o) for o in offers]
+                return self.async_create_entry(title="", data=new_opts)
+
+        schema = vol.Schema({
+            # [{name: "Dodavatel B", product: spot, spot_marze: 0.29, spot_stala_platba: 99}, …]
+            vol.Optional(CONF_OFFERS, description={"suggested_value": cur}): selector.ObjectSelector(),
+        })
+
+        return self.async_show_form(
+            step_id="nabidky", data_schema=schema, errors=errors, description_placeholders=placeholders,
+        )
+
+    # ==== SPOTŘEBIČE: nejlevnější okno podle křivky spotových cen (seznam v YAML) ====
+    async def async_step_spotrebice(self, user_input=None):
+        errors: dict[str, str] = {}
+        placeholders = {"error": ""}
+        opts = self.config_entry.options
+        cur = opts.get(CONF_APPLIANCES) or []
+
+        if user_input is not None:
+            appliances = user_input.get(CONF_APPLIANCES) or []
+            try:
+                parse_appliances(appliances)
+            except ValueError as err:
+                errors["base"] = "appliances_invalid"
+                placeholders["error"] = str(err)
+                cur = appliances
+            else:
+                new_opts = dict(opts)
+                new_opts[CONF_APPLIANCES] = [dict(a) for a in appliances]
+                return self.async_create_entry(title="", data=new_opts)
+
+        schema = vol.Schema({
+            # [{name: Bojler, duration: 120, energy: 4}, {name: Auto, duration: 240, energy: 30, contiguous: false, within: 12}]
+            vol.Optional(CONF_APPLIANCES, description={"suggested_value": cur}): selector.ObjectSelector(),
+        })
+
+        return self.async_show_form(
+            step_id="spotrebice", data_schema=schema, errors=errors, description_placeholders=placeholders,
+        )
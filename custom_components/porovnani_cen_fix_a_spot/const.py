@@ -67,3 +67,68 @@ DEFAULT_SPOT_PRICE_SENSOR = "sensor.current_spot_electricity_buy_price"
 # název profilu (volitelné)
 CONF_PROFILE_NAME = "profile_name"
 DEFAULT_PROFILE_NAME = "Porovnání cen"
+
+# ==== ZÁPIS STAVU (slučování zápisů u často se měnících senzorů) ====
+CONF_PUBLISH_MIN_INTERVAL = "publish_min_interval"       # [s] minimální odstup dvou zápisů
+CONF_PUBLISH_DEADBAND = "publish_deadband"               # [kWh / Kč] menší změna se nezapisuje
+
+DEFAULT_PUBLISH_MIN_INTERVAL = 30.0
+DEFAULT_PUBLISH_DEADBAND = 0.001
+
+# signál (dispatcher) – změna options aplikovaná bez reloadu; formátuje se entry_id
+SIGNAL_OPTIONS_UPDATED = f"{DOMAIN}_options_updated_{{}}"
+
+# ==== ÚLOŽIŠTĚ (okna vzorků spotřeby přes restart) ====
+STORAGE_VERSION = 1
+STORAGE_KEY_WINDOWS = f"{DOMAIN}.windows.{{}}"            # formátuje se entry_id
+
+# ==== KOMPRESE OKEN VÝKONU (swinging door) ====
+CONF_COMPRESSION_TOLERANCE = "compression_tolerance"     # [Wh] max. chyba energie za interval, 0 = vypnuto
+CONF_COMPRESSION_MAX_SAMPLES = "compression_max_samples" # tvrdý strop vzorků na entitu, 0 = bez stropu
+DEFAULT_COMPRESSION_TOLERANCE = 0.0
+DEFAULT_COMPRESSION_MAX_SAMPLES = 0
+
+# ==== INTEGRACE VÝKONU ====
+CONF_POWER_INTEGRATION = "power_integration"
+POWER_INTEGRATION_TRAPEZOID = "trapezoid"                # lichoběžník mezi vzorky v okně
+POWER_INTEGRATION_HOLD = "hold"                          # držení poslední hodnoty (ZOH) v pevných krocích
+POWER_INTEGRATION_MODES = (POWER_INTEGRATION_TRAPEZOID, POWER_INTEGRATION_HOLD)
+DEFAULT_POWER_INTEGRATION = POWER_INTEGRATION_TRAPEZOID
+CONF_HOLD_STEP = "hold_step"                             # [s] virtuální krok; dělí 15 i 60 min
+HOLD_STEPS = (1, 5, 10, 30, 60)
+DEFAULT_HOLD_STEP = 10
+
+# ==== ZDROJ SPOTŘEBY ====
+CONF_CONSUMPTION_SOURCE = "consumption_source"
+CONSUMPTION_SOURCE_EVENTS = "events"                     # každá změna stavu zdrojových entit
+CONSUMPTION_SOURCE_STATISTICS = "statistics"             # 5min statistiky recorderu + živý stav pro zbytek
+CONSUMPTION_SOURCES = (CONSUMPTION_SOURCE_EVENTS, CONSUMPTION_SOURCE_STATISTICS)
+DEFAULT_CONSUMPTION_SOURCE = CONSUMPTION_SOURCE_EVENTS
+
+# ==== DALŠÍ NABÍDKY (živé porovnání nad stejnou spotřebou) ====
+CONF_OFFERS = "offers"                                   # [{name, product, <parametry tarifu>…}]
+OFFER_PRODUCT_FIX = "fix"
+OFFER_PRODUCT_SPOT = "spot"
+OFFER_PRODUCTS = (OFFER_PRODUCT_FIX, OFFER_PRODUCT_SPOT)
+MAX_OFFERS = 20
+
+# ==== PLÁNOVAČ SPOTŘEBIČŮ (nejlevnější okno podle křivky spotových cen) ====
+CONF_APPLIANCES = "appliances"                           # [{name, duration [min], energy [kWh], contiguous, within [h]}]
+MAX_APPLIANCES = 50
+
+# ==== SDÍLENÝ HUB DOMÉNY (hass.data[DOMAIN][DATA_HUB]) ====
+DATA_HUB = "hub"
+
+# ==== HISTORICKÉ SPOTOVÉ CENY (hass.data[DOMAIN][DATA_PRICE_STORE]) ====
+DATA_PRICE_STORE = "price_store"
+PRICE_STORE_PREFIX = f"{DOMAIN}.spot_prices"             # .storage/<prefix>_<krok s>.bin
+SERVICE_IMPORT_SPOT_PRICES = "import_spot_prices"
+SERVICE_BACKTEST = "backtest"
+SERVICE_SWEEP_OFFERS = "sweep_offers"
+SERVICE_PLAN_WINDOWS = "plan_cheapest_windows"
+SERVICE_SIMULATE_STORAGE = "simulate_storage"
+
+# ==== INTERVAL VYÚČTOVÁNÍ (OTE: 60 nebo 15 minut) ====
+CONF_SETTLEMENT_INTERVAL = "settlement_interval"         # [min]
+SETTLEMENT_INTERVALS = (60, 15)
+DEFAULT_SETTLEMENT_INTERVAL = 60
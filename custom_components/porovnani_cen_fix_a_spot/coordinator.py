@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Callable
+
+from homeassistant.config_entries import ConfigEntry                                                # type: ignore
+from homeassistant.core import HomeAssistant, callback                                              # type: ignore
+from homeassistant.helpers.dispatcher import async_dispatcher_connect                               # type: ignore
+
+from .const import DEFAULT_SETTLEMENT_INTERVAL, DEFAULT_SPOT_PRICE_SENSOR, SIGNAL_OPTIONS_UPDATED
+from .graph import DataflowGraph
+from .hub import DomainHub
+from .planner import build_horizon, plan_all
+from .price_cache import SpotPriceSource
+from .pricing import OfferBook, interval_costs
+from .stats import EntryStats
+from .tariff import Tariff
+
+if TYPE_CHECKING:
+    from .sensor import HourlyConsumptionSensor
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class IntervalRecord:
+    """Neměnný záznam jednoho uzavřeného intervalu – jediný podklad pro všechny akumulátory."""
+
+    start: datetime                 # začátek uzavřeného intervalu (UTC)
+    end: datetime
+    kwh: float                      # spotřeba za interval
+    kwh_vt: float                   # … z toho ve VT
+    kwh_nt: float                   # … z toho v NT (podle podílu času s HDO=ON)
+    spot_price: float               # spotová cena uzavřeného intervalu [Kč/kWh] (0 při spot_missing)
+    spot_unit: float                # jednotková cena spot vč. přirážek [Kč/kWh]
+    fix_unit: float                 # průměrná jednotková cena fix (VT/NT) [Kč/kWh]
+    fix_fee: float                  # paušál fix rozpočítaný na interval [Kč]
+    spot_cost: float                # [Kč]
+    fix_cost: float                 # [Kč] vč. paušálu
+    offer_costs: tuple[float, ...] = ()  # [Kč] další nabídky profilu (pořadí jako cfg["offers"])
+    spot_missing: bool = False      # křivka cenu intervalu nezná – energie spot se nepočítá (spot_cost = 0)
+
+
+class IntervalSettlement:
+    """Uzavírání zúčtovacích intervalů (60 nebo 15 min) jednoho profilu.
+
+    Časovač hranic i přihlášení k HDO sdílí přes hub domény s ostatními
+    profily. Na každé hranici jednou přečte okno spotřeby
+    (bez přidání vzorků), podíl NT z HDO, spotovou cenu uzavřeného intervalu
+    z křivky a snímek tarifu, sestaví `IntervalRecord` a předá ho
+    registrovaným posluchačům (nákladové senzory) a grafu přepočtů
+    (uzel „record“ → akumulátory). Práce na jedno
+    uzavření je konstantní, takže 15min režim stojí jen čtyři levná volání za
+    hodinu.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cfg: dict, cons_sensor: "HourlyConsumptionSensor", prices: SpotPriceSource) -> None:
+        self.hass = hass
+        self._entry = entry
+        self._cfg = cfg
+        self._cons = cons_sensor
+        self._prices = prices
+        self._hub: DomainHub = cfg["hub"]
+        self.graph: DataflowGraph = cfg["graph"]
+        self.stats: EntryStats = cfg["stats"]
+        self.minutes: int = cfg.get("interval") or DEFAULT_SETTLEMENT_INTERVAL
+        self._listeners: list[Callable[[IntervalRecord], None]] = []
+        self._unsubs: list[Callable[[], None]] = []
+        self.last_record: IntervalRecord | None = None
+
+        # HDO – kolik sekund běžícího intervalu bylo NT
+        self._hdo_switch: str = cfg.get("source_entity_id") or ""
+        self._hdo_state: bool | None = None
+        self._hdo_since: float = 0.0
+        self._nt_seconds: float = 0.0
+        self._tracked_from: float = 0.0
+
+    @callback
+    def async_add_listener(self, listener: Callable[[IntervalRecord], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _remove
+
+    @callback
+    def async_start(self) -> None:
+        now = datetime.now(timezone.utc).timestamp()
+        self._tracked_from = self._hdo_since = now
+        if self._hdo_switch:
+            self._unsubs.append(self._hub.async_track_hdo(self._hdo_switch, self._on_hdo_change))
+            self._hdo_state = self._hub.hdo_is_nt(self._hdo_switch)
+        self._unsubs.append(self._hub.async_track_boundary(self.minutes, self._on_tick))
+
+    @callback
+    def async_stop(self) -> None:
+        for u in self._unsubs:
+            u()
+        self._unsubs.clear()
+        self._listeners.clear()
+
+    # --- HDO ---
+    def _close_hdo_span(self, until: float) -> None:
+        if self._hdo_state is True:
+            self._nt_seconds += max(0.0, until - self._hdo_since)
+        self._hdo_since = until
+
+    @callback
+    def _on_hdo_change(self, is_nt: bool | None) -> None:
+        self.stats.event(self._hdo_switch)
+        now = datetime.now(timezone.utc).timestamp()
+        self._close_hdo_span(now)
+        self._hdo_state = is_nt
+
+    def _take_nt_share(self, until: float) -> float:
+        """Podíl NT od posledního uzavření do `until` (a vynulování počítadla)."""
+        self._close_hdo_span(until)
+        span = until - self._tracked_from
+        share = min(1.0, self._nt_seconds / span) if span > 0 else (1.0 if self._hdo_state else 0.0)
+        self._nt_seconds = 0.0
+        self._tracked_from = until
+        return share
+
+    # --- uzavření intervalu ---
+    @callback
+    def _on_tick(self, now: datetime) -> None:
+        self.async_settle(now)
+
+    @callback
+    def async_settle(self, now: datetime) -> IntervalRecord:
+        t0 = perf_counter_ns()
+        now_utc = now.astimezone(timezone.utc)
+        end = now_utc.replace(minute=now_utc.minute - now_utc.minute % self.minutes, second=0, microsecond=0)
+        start = end - timedelta(minutes=self.minutes)
+        tariff: Tariff = self._cfg["tariff"]
+
+        kwh = self._cons.settle_kwh()
+        nt_share = self._take_nt_share(now_utc.timestamp())
+
+        # cena intervalu, ke kterému spotřeba patří – ne ta, která platí v :mm:05
+        spot = self._prices.price_for(start.timestamp(), end.timestamp())
+        missing = spot is None
+        if missing:
+            LOGGER.warning(
+                "[settlement][%s] spotová cena intervalu %s chybí – spot se za interval nepočítá",
+                self._entry.entry_id, start.isoformat(),
+            )
+        # stejný vzorec jako dávkový výpočet (pricing.batch_costs)
+        costs = interval_costs(tariff, kwh, nt_share, spot or 0.0, start, self.minutes, self._hdo_state)
+        # další nabídky – jeden vektorový průchod pro všechny
+        offers: OfferBook | None = self._cfg.get("offers")
+        offer_costs = offers.interval_costs(kwh, nt_share, spot, start, self.minutes) if offers else ()
+
+        record = IntervalRecord(
+            start=start,
+            end=end,
+            kwh=round(kwh, 6),
+            kwh_vt=round(costs.kwh_vt, 6),
+            kwh_nt=round(costs.kwh_nt, 6),
+            spot_price=0.0 if missing else spot,
+            spot_unit=0.0 if missing else costs.spot_unit,
+            fix_unit=costs.fix_unit,
+            fix_fee=costs.fix_fee,
+            spot_cost=0.0 if missing else round(costs.spot_cost, 6),
+            fix_cost=round(costs.fix_cost, 6),
+            offer_costs=offer_costs,
+            spot_missing=missing,
+        )
+        self.last_record = record
+        LOGGER.debug("[settlement][%s] %s", self._entry.entry_id, record)
+
+        for listener in list(self._listeners):
+            listener(record)
+        # akumulátory (den / měsíc) jsou uzly grafu za záznamem intervalu
+        self.graph.invalidate("record")
+        self.stats.settle.add(perf_counter_ns() - t0)
+        return record
+
+
+# ---------------------------
+# Graf přepočtů profilu – vstupní a odvozené uzly
+# ---------------------------
+
+@callback
+def async_setup_graph(
+    hass: HomeAssistant, entry: ConfigEntry, cfg: dict,
+    cons_sensor: "HourlyConsumptionSensor", prices: SpotPriceSource, settlement: IntervalSettlement,
+) -> Callable[[], None]:
+    """Vstupy grafu (spotřeba, tarif, HDO, cena, záznam intervalu), jednotkové ceny a plán spotřebičů.
+
+    Nákladové senzory a akumulátory přidávají své uzly při přidání do HA;
+    přihlášení ke změnám vstupů je jen tady, jednou za profil. Vrací funkci
+    pro odhlášení.
+    """
+    graph: DataflowGraph = cfg["graph"]
+    hub: DomainHub = cfg["hub"]
+    stats: EntryStats = cfg["stats"]
+    hdo_switch = cfg.get("source_entity_id") or ""
+    window_s = settlement.minutes * 60.0
+
+    def _price() -> float | None:
+        now = datetime.now(timezone.utc).timestamp()
+        return prices.price_for(now - window_s, now)
+
+    def _spot_unit() -> float | None:
+        # (spot + marže) + distribuce_vt + (daň + služby) + POZE = spot + předpočítaná přirážka
+        price = graph.value("price")
+        return None if price is None else price + graph.value("tariff").spot_adder_vt
+
+    def _fix_unit() -> float:
+        # bezpečný default – když nevíme, použij VT
+        tariff: Tariff = graph.value("tariff")
+        return tariff.fix_unit_nt if graph.value("hdo") is True else tariff.fix_unit_vt
+
+    graph.add_node("consumption", cons_sensor.live_kwh)
+    graph.add_node("tariff", lambda: cfg["tariff"])
+    graph.add_node("hdo", lambda: hub.hdo_is_nt(hdo_switch) if hdo_switch else None)
+    graph.add_node("price", _price)
+    graph.add_node("record", lambda: settlement.last_record)
+    graph.add_node("spot_unit", _spot_unit, deps=("price", "tariff"))
+    graph.add_node("fix_unit", _fix_unit, deps=("hdo", "tariff"))
+    # přestavba křivky (nové ceny na zítra) – aktuální cena se přitom měnit nemusí
+    graph.add_node("curve", lambda: (prices.entity_id, prices.curve.version))
+
+    def _plan() -> dict:
+        curve = prices.curve
+        horizon = build_horizon(
+            graph.value("tariff"), curve.base, curve.step, curve.prices,
+            datetime.now(timezone.utc).timestamp(),
+        )
+        return plan_all(horizon, cfg["appliances"])
+
+    if cfg.get("appliances"):
+        # nejlevnější okna všech spotřebičů jedním uzlem; senzory spotřebičů jsou uzly za ním
+        graph.add_node("plan", _plan, deps=("curve", "tariff"), stats=stats.sensor("plan"))
+    # první průchod až při přidání entit (po async_start cen), uzly zatím zůstávají dirty
+
+    @callback
+    def _on_prices() -> None:
+        stats.event(prices.entity_id)
+        graph.invalidate("price", "curve")
+
+    @callback
+    def _on_options_updated(changed: set[str]) -> None:
+        with graph.batch():
+            if "tariff" in changed:
+                graph.invalidate("tariff")
+            if "appliances" in changed:
+                graph.invalidate("plan")
+            if "spot_price" in changed:
+                # přepnutí zdroje ohlásí změnu cen → _on_prices
+                prices.async_set_entity(cfg.get("spot_price_sensor") or DEFAULT_SPOT_PRICE_SENSOR)
+
+    unsubs = [
+        prices.async_add_listener(_on_prices),
+        async_dispatcher_connect(hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id), _on_options_updated),
+    ]
+    if hdo_switch:
+        unsubs.append(hub.async_track_hdo(hdo_switch, lambda _is_nt: graph.invalidate("hdo")))
+    # průměr ceny za poslední okno se posouvá s časem, ne jen s událostmi cenového senzoru;
+    # na každé čtvrthodině (dělí 15 i 60min ceny) i horizont plánovače
+    unsubs.append(hub.async_track_boundary(
+        15, lambda _now: graph.invalidate("price", "plan") if "plan" in graph else graph.invalidate("price"),
+    ))
+
+    def _remove() -> None:
+        for u in unsubs:
+            u()
+        unsubs.clear()
+
+    return _remove
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry                                                # type: ignore
+from homeassistant.core import HomeAssistant                                                        # type: ignore
+
+from .const import DOMAIN, DATA_PRICE_STORE
+
+
+def _record_dict(record) -> dict[str, Any] | None:
+    if record is None:
+        return None
+    data = asdict(record)
+    data["start"] = record.start.isoformat()
+    data["end"] = record.end.isoformat()
+    return data
+
+
+def _curve_dict(prices) -> dict[str, Any] | None:
+    if prices is None:
+        return None
+    curve = prices.curve
+    known = sum(1 for p in curve.prices if p == p)
+    return {
+        "entity_id": prices.entity_id,
+        "intervals": len(curve),
+        "known": known,
+        "step_s": curve.step,
+        "start": datetime.fromtimestamp(curve.base, timezone.utc).isoformat() if len(curve) else None,
+        "current": curve.current,
+    }
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Diagnostika profilu: nastavení, tarif, výkonová počítadla a stav oken."""
+    cfg = hass.data.get(DOMAIN, {}).get(entry.entry_id) or {}
+    stats = cfg.get("stats")
+    cons = cfg.get("consumption")
+    settlement = cfg.get("settlement")
+    tariff = cfg.get("tariff")
+    hub = cfg.get("hub")
+    graph = cfg.get("graph")
+    offers = cfg.get("offers")
+    price_store = hass.data.get(DOMAIN, {}).get(DATA_PRICE_STORE)
+
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "config": {
+            "interval_min": cfg.get("interval"),
+            "hdo_switch": cfg.get("source_entity_id"),
+            "consumption": [cfg.get(k) for k in ("cons_total", "cons_l1", "cons_l2", "cons_l3") if cfg.get(k)],
+            "spot_price_sensor": cfg.get("spot_price_sensor"),
+            "publish": cfg.get("publish"),
+            "compression": cfg.get("compression"),
+            "power_integration": cfg.get("integration"),
+            "consumption_source": cfg.get("consumption_source"),
+        },
+        "tariff": asdict(tariff) if tariff is not None else None,
+        "offers": [
+            {"name": o.name, "slug": o.slug, "product": o.product, "tariff": asdict(o.tariff)}
+            for o in (offers.offers if offers is not None else ())
+        ],
+        "stats": stats.as_dict() if stats is not None else None,
+        "windows": cons.memory_report() if cons is not None else None,
+        "price_curve": _curve_dict(cfg.get("prices")),
+        "planner": {
+            "appliances": [a.name for a in cfg.get("appliances", ())],
+        },
+        "last_record": _record_dict(settlement.last_record if settlement is not None else None),
+        "hub": hub.stats() if hub is not None else None,
+        "graph": graph.stats() if graph is not None else None,
+        "price_store": price_store.stats() if price_store is not None else None,
+    }
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from time import perf_counter_ns
+from typing import Any, Callable, Iterable, Iterator
+
+
+# ---------------------------
+# Datový tok profilu (bez závislosti na HA)
+# ---------------------------
+#
+# spotřeba ─┬──────────────────────────→ spot_cost
+#           │   cena → spot_unit ──────↗
+#           └──────────────────────────→ fix_cost
+#               HDO  → fix_unit ───────↗
+#               tarif ─┘ (i do spot_unit, fix_cost)
+#               záznam intervalu → akumulátory (den / měsíc)
+#
+# Změna vstupu označí uzel jako „dirty“; průchod (generace) přepočítá
+# v topologickém pořadí jen označené uzly, každý nejvýš jednou, a jejich
+# závislé označí jen tehdy, když se hodnota opravdu změnila. Zápisy stavu
+# (sinky) se volají až na konci průchodu.
+
+class Node:
+    """Uzel grafu: výpočet, závislosti, příznak dirty a generace posledního přepočtu."""
+
+    __slots__ = ("name", "compute", "deps", "dependents", "sinks", "stats",
+                 "dirty", "generation", "recomputes", "value")
+
+    def __init__(self, name: str, compute: Callable[[], Any], deps: tuple[Node, ...], stats=None) -> None:
+        self.name = name
+        self.compute = compute
+        self.deps = deps
+        self.dependents: list[Node] = []
+        self.sinks: list[Callable[[Any], None]] = []
+        self.stats = stats                        # volitelně TimingStats (doba přepočtu)
+        self.dirty = True                         # nový uzel se při nejbližším průchodu spočítá
+        self.generation = 0
+        self.recomputes = 0
+        self.value: Any = None
+
+
+class DataflowGraph:
+    """Acyklický graf přepočtů jednoho profilu.
+
+    Uzly se přidávají až po svých závislostech, pořadí přidání je tedy
+    zároveň topologické pořadí. Přidání uzlu i sinku vrací funkci pro
+    odebrání (jako ostatní posluchači v integraci).
+    """
+
+    def __init__(self) -> None:
+        self._nodes: dict[str, Node] = {}
+        self._order: list[Node] = []
+        self._pending = False                     # některý uzel je dirty
+        self._running = False
+        self._batch = 0
+        self.generation = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._nodes
+
+    def value(self, name: str) -> Any:
+        return self._nodes[name].value
+
+    # --- stavba ---
+    def add_node(
+        self, name: str, compute: Callable[[], Any], deps: Iterable[str] = (),
+        sink: Callable[[Any], None] | None = None, stats=None,
+    ) -> Callable[[], None]:
+        if name in self._nodes:
+            raise ValueError(f"uzel {name} už existuje")
+        dep_nodes = tuple(self._nodes[d] for d in deps)   # KeyError = závislost ještě neexistuje
+        node = Node(name, compute, dep_nodes, stats)
+        if sink is not None:
+            node.sinks.append(sink)
+        for dep in dep_nodes:
+            dep.dependents.append(node)
+        self._nodes[name] = node
+        self._order.append(node)
+        self._pending = True
+
+        def _remove() -> None:
+            if self._nodes.get(name) is not node:
+                return
+            if node.dependents:
+                raise ValueError(f"na uzlu {name} závisí {[d.name for d in node.dependents]}")
+            for dep in node.deps:
+                dep.dependents.remove(node)
+            del self._nodes[name]
+            self._order.remove(node)
+
+        return _remove
+
+    def add_sink(self, name: str, sink: Callable[[Any], None]) -> Callable[[], None]:
+        """Posluchač změny hodnoty uzlu (volá se na konci průchodu)."""
+        sinks = self._nodes[name].sinks
+        sinks.append(sink)
+
+        def _remove() -> None:
+            if sink in sinks:
+                sinks.remove(sink)
+
+        return _remove
+
+    # --- změny vstupů ---
+    def invalidate(self, *names: str) -> None:
+        """Označ uzly k přepočtu a (mimo dávku) rovnou proveď průchod."""
+        for name in names:
+            node = self._nodes.get(name)
+            if node is not None:
+                node.dirty = True
+                self._pending = True
+        if not self._batch:
+            self.propagate()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Více změn vstupů → jeden průchod na konci bloku."""
+        self._batch += 1
+        try:
+            yield
+        finally:
+            self._batch -= 1
+        if not self._batch:
+            self.propagate()
+
+    def propagate(self) -> None:
+        # sink může znovu něco zneplatnit – to se zpracuje další generací, ne rekurzí
+        if self._running:
+            return
+        self._running = True
+        try:
+            while self._pending:
+                self._pending = False
+                self.generation += 1
+                self._pass(self.generation)
+        finally:
+            self._running = False
+
+    def _pass(self, gen: int) -> None:
+        changed: list[Node] = []
+        for node in self._order:
+            if not node.dirty:
+                continue
+            node.dirty = False
+            t0 = perf_counter_ns()
+            value = node.compute()
+            if node.stats is not None:
+                node.stats.add(perf_counter_ns() - t0)
+            node.generation = gen
+            node.recomputes += 1
+            if value == node.value and node.recomputes > 1:
+                continue
+            node.value = value
+            for dep in node.dependents:
+                dep.dirty = True
+            if node.sinks:
+                changed.append(node)
+        for node in changed:
+            for sink in tuple(node.sinks):
+                sink(node.value)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "nodes": {
+                n.name: {
+                    "deps": [d.name for d in n.deps],
+                    "generation": n.generation,
+                    "recomputes": n.recomputes,
+                    "sinks": len(n.sinks),
+                }
+                for n in self._order
+            },
+        }
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Hashable
+
+from homeassistant.core import HomeAssistant, callback, State                                       # type: ignore
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_change     # type: ignore
+from homeassistant.helpers.event import async_track_time_interval                                   # type: ignore
+
+from .const import DOMAIN, DATA_HUB
+from .price_cache import PriceCurve
+
+LOGGER = logging.getLogger(__name__)
+
+
+def hdo_is_nt(state: State | None) -> bool | None:
+    """Stav HDO přepínače -> NT (True) / VT (False) / neznámé (None)."""
+    if state is None or state.state in ("unknown", "unavailable", None, ""):
+        return None
+    return str(state.state).lower() in ("on", "true", "1")
+
+
+# ---------------------------
+# Rozbočovač jedné subscription / časovače na více posluchačů
+# ---------------------------
+
+class _FanOut:
+    """Jedno přihlášení v HA, libovolně posluchačů; odhlásí se s posledním."""
+
+    __slots__ = ("listeners", "unsub")
+
+    def __init__(self) -> None:
+        self.listeners: list[Callable[..., None]] = []
+        self.unsub: Callable[[], None] | None = None
+
+    def dispatch(self, *args: Any) -> None:
+        for listener in tuple(self.listeners):
+            listener(*args)
+
+
+class _HdoCache:
+    """Naparsovaný stav HDO přepínače – spočte se jednou za změnu pro všechny profily."""
+
+    __slots__ = ("is_nt", "listeners", "unsub")
+
+    def __init__(self) -> None:
+        self.is_nt: bool | None = None
+        self.listeners: list[Callable[[bool | None], None]] = []
+        self.unsub: Callable[[], None] | None = None
+
+
+class _PriceCache:
+    """Sdílená křivka spotových cen jednoho senzoru + posluchači změn."""
+
+    __slots__ = ("curve", "listeners", "unsub")
+
+    def __init__(self) -> None:
+        self.curve = PriceCurve()
+        self.listeners: list[Callable[[], None]] = []
+        self.unsub: Callable[[], None] | None = None
+
+
+# ---------------------------
+# Hub domény (jeden na celé HA, sdílený všemi profily)
+# ---------------------------
+
+class DomainHub:
+    """Sdílené vstupy všech config entries integrace.
+
+    Drží jediné přihlášení ke změnám každé zdrojové entity a jediný časovač
+    pro každou hranici (krok intervalu), výsledky rozesílá registrovaným
+    profilům. Sdílené vstupy – křivku spotových cen a stav HDO – naparsuje
+    jednou za změnu, ne jednou za profil.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._entities: dict[str, _FanOut] = {}
+        self._timers: dict[Hashable, _FanOut] = {}
+        self._hdo: dict[str, _HdoCache] = {}
+        self._prices: dict[str, _PriceCache] = {}
+
+    @property
+    def idle(self) -> bool:
+        return not (self._entities or self._timers)
+
+    def stats(self) -> dict[str, int]:
+        """Počty sdílených přihlášení (diagnostika / benchmark)."""
+        return {
+            "entities": len(self._entities),
+            "timers": len(self._timers),
+            "listeners": sum(len(f.listeners) for f in self._entities.values())
+            + sum(len(f.listeners) for f in self._timers.values()),
+            "hdo": len(self._hdo),
+            "prices": len(self._prices),
+        }
+
+    # --- obecné registrace ---
+    def _add(self, table: dict, key: Hashable, listener: Callable[..., None], start: Callable[[_FanOut], Callable[[], None]]) -> Callable[[], None]:
+        fan = table.get(key)
+        if fan is None:
+            fan = table[key] = _FanOut()
+            fan.unsub = start(fan)
+        fan.listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in fan.listeners:
+                fan.listeners.remove(listener)
+            if not fan.listeners and table.get(key) is fan:
+                del table[key]
+                if fan.unsub:
+                    fan.unsub()
+                    fan.unsub = None
+
+        return _remove
+
+    @callback
+    def async_track_entity(self, entity_id: str, listener: Callable[[Any], None]) -> Callable[[], None]:
+        """Posluchač změn stavu entity; v HA vznikne jen jedno přihlášení na entitu."""
+        return self._add(
+            self._entities, entity_id, listener,
+            lambda fan: async_track_state_change_event(self.hass, [entity_id], fan.dispatch),
+        )
+
+    @callback
+    def async_track_entities(self, entity_ids: list[str], listener: Callable[[Any], None]) -> Callable[[], None]:
+        unsubs = [self.async_track_entity(e, listener) for e in dict.fromkeys(entity_ids) if e]
+
+        def _remove() -> None:
+            for u in unsubs:
+                u()
+            unsubs.clear()
+
+        return _remove
+
+    @callback
+    def async_track_boundary(self, minutes: int, listener: Callable[[datetime], None]) -> Callable[[], None]:
+        """Posluchač hranice intervalu (každých `minutes` min, v :mm:05); jeden časovač na krok."""
+        return self._add(
+            self._timers, ("boundary", minutes), listener,
+            lambda fan: async_track_time_change(
+                self.hass, fan.dispatch, minute=tuple(range(0, 60, minutes)), second=5
+            ),
+        )
+
+    @callback
+    def async_track_interval(self, period: timedelta, listener: Callable[[datetime], None]) -> Callable[[], None]:
+        """Periodický posluchač (např. ukládání oken); jeden časovač na periodu."""
+        return self._add(
+            self._timers, ("interval", period), listener,
+            lambda fan: async_track_time_interval(self.hass, fan.dispatch, period),
+        )
+
+    # --- HDO ---
+    def hdo_is_nt(self, entity_id: str) -> bool | None:
+        """Poslední známý stav HDO (z cache, pokud ho někdo sleduje)."""
+        cache = self._hdo.get(entity_id)
+        if cache is not None:
+            return cache.is_nt
+        return hdo_is_nt(self.hass.states.get(entity_id))
+
+    @callback
+    def async_track_hdo(self, entity_id: str, listener: Callable[[bool | None], None]) -> Callable[[], None]:
+        """Posluchač změn HDO; stav se naparsuje jednou za změnu pro všechny profily."""
+        cache = self._hdo.get(entity_id)
+        if cache is None:
+            cache = self._hdo[entity_id] = _HdoCache()
+            cache.is_nt = hdo_is_nt(self.hass.states.get(entity_id))
+
+            @callback
+            def _on_change(event) -> None:
+                cache.is_nt = hdo_is_nt(event.data.get("new_state"))
+                for cb in tuple(cache.listeners):
+                    cb(cache.is_nt)
+
+            cache.unsub = self.async_track_entity(entity_id, _on_change)
+        cache.listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in cache.listeners:
+                cache.listeners.remove(listener)
+            if not cache.listeners and self._hdo.get(entity_id) is cache:
+                del self._hdo[entity_id]
+                cache.unsub()
+
+        return _remove
+
+    # --- spotové ceny ---
+    def price_curve(self, entity_id: str) -> PriceCurve:
+        """Sdílená křivka cen; bez posluchačů se jen jednorázově načte ze stavu."""
+        cache = self._prices.get(entity_id)
+        if cache is not None:
+            return cache.curve
+        curve = PriceCurve()
+        curve.update(self.hass.states.get(entity_id))
+        return curve
+
+    @callback
+    def async_track_prices(self, entity_id: str, listener: Callable[[], None]) -> Callable[[], None]:
+        """Posluchač změn křivky; atributy cenového senzoru se parsují jednou za změnu."""
+        cache = self._prices.get(entity_id)
+        if cache is None:
+            cache = self._prices[entity_id] = _PriceCache()
+            cache.curve.update(self.hass.states.get(entity_id))
+
+            @callback
+            def _on_change(event) -> None:
+                if cache.curve.update(event.data.get("new_state")):
+                    for cb in tuple(cache.listeners):
+                        cb()
+
+            cache.unsub = self.async_track_entity(entity_id, _on_change)
+        cache.listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in cache.listeners:
+                cache.listeners.remove(listener)
+            if not cache.listeners and self._prices.get(entity_id) is cache:
+                del self._prices[entity_id]
+                cache.unsub()
+
+        return _remove
+
+
+def get_hub(hass: HomeAssistant) -> DomainHub:
+    """Hub domény (vytvoří se s prvním profilem)."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    hub = domain_data.get(DATA_HUB)
+    if hub is None:
+        hub = domain_data[DATA_HUB] = DomainHub(hass)
+    return hub
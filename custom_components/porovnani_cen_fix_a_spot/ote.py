@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timezone
+from zoneinfo import ZoneInfo
+
+# ---------------------------
+# Parsování exportů cen OTE (bez závislosti na HA)
+# ---------------------------
+#
+# Podporované tvary (CSV přímo z OTE nebo uložené z XLSX):
+#   Den;Hodina;Cena (EUR/MWh);…        – hodinové ceny, hodina 1–24 (23/25 při změně času)
+#   Den;Perioda;Cena (Kč/MWh);…        – 15min ceny, perioda 1–96 (92/100)
+#   Start;Cena (Kč/kWh)                – časová značka ISO s časovou zónou
+# Titulkové řádky nad hlavičkou se přeskočí, desetinná čárka i mezery
+# v tisících jsou v pořádku.
+
+TZ_PRAGUE = ZoneInfo("Europe/Prague")
+
+_DATE_COLS = ("den", "datum", "date", "day")
+_HOUR_COLS = ("hodina", "hour")
+_PERIOD_COLS = ("perioda", "period", "interval", "čtvrthodina", "ctvrthodina")
+_TS_COLS = ("start", "čas", "cas", "time", "datetime", "timestamp", "od")
+_PRICE_WORDS = ("cena", "price")
+
+
+class OteFormatError(ValueError):
+    """Soubor nevypadá jako export cen (chybí hlavička, sloupec ceny, kurz…)."""
+
+
+@dataclass(slots=True)
+class ParsedPrices:
+    step: int                                           # [s] 3600 / 900
+    points: list[tuple[float, float]] = field(default_factory=list)   # (začátek UTC, Kč/kWh)
+    rows: int = 0
+    bad_rows: int = 0
+    column: str = ""
+
+
+def _norm(header: str) -> str:
+    return " ".join(header.strip().lower().split())
+
+
+def _number(text: str) -> float | None:
+    text = text.strip().replace("\xa0", "").replace(" ", "").replace(",", ".")
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _parse_day(text: str) -> date | None:
+    text = text.strip()
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d", "%d/%m/%Y", "%Y%m%d"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _find(headers: list[str], names: tuple[str, ...]) -> int | None:
+    for i, h in enumerate(headers):
+        if h in names or h.split(" (")[0] in names:
+            return i
+    return None
+
+
+def _price_column(headers: list[str], eur_czk: float | None) -> tuple[int, float, str]:
+    """(index, násobek na Kč/kWh, název) – přednost má sloupec v Kč."""
+    candidates = [(i, h) for i, h in enumerate(headers) if any(w in h for w in _PRICE_WORDS)]
+    if not candidates:
+        raise OteFormatError("chybí sloupec s cenou")
+
+    def _scale(h: str) -> float:
+        return 1e-3 if "mwh" in h else 1.0
+
+    for i, h in candidates:
+        if "kč" in h or "czk" in h or "kc/" in h:
+            return i, _scale(h), h
+    for i, h in candidates:
+        if "eur" in h or "€" in h:
+            if not eur_czk:
+                raise OteFormatError(f"ceny v EUR ({h}) – zadej kurz eur_czk")
+            return i, _scale(h) * eur_czk, h
+    i, h = candidates[0]
+    return i, _scale(h), h
+
+
+def _local_midnight_utc(day: date) -> float:
+    return datetime.combine(day, time(0), TZ_PRAGUE).astimezone(timezone.utc).timestamp()
+
+
+def _slot_start(text: str) -> tuple[int | None, time | None]:
+    """Hodina/perioda jako pořadí (1…) nebo jako místní čas začátku („00:15-00:30“)."""
+    text = text.strip()
+    if ":" in text:
+        m = re.match(r"(\d{1,2}):(\d{2})", text)
+        return (None, time(int(m.group(1)) % 24, int(m.group(2)))) if m else (None, None)
+    m = re.match(r"(\d+)", text)
+    return (int(m.group(1)), None) if m else (None, None)
+
+
+def parse_prices(content: bytes | str, eur_czk: float | None = None) -> ParsedPrices:
+    """Ceny z exportu OTE → body (začátek intervalu UTC, Kč/kWh)."""
+    if isinstance(content, bytes):
+        try:
+            text = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            text = content.decode("cp1250")
+    else:
+        text = content
+    lines = text.splitlines()
+    if not lines:
+        raise OteFormatError("prázdný soubor")
+
+    sample = "\n".join(lines[:50])
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        delimiter = dialect.delimiter
+    except csv.Error:
+        delimiter = ";"
+    rows = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+
+    # hlavička = první řádek se sloupcem ceny a s časem (den / časová značka)
+    header_idx = None
+    for n, row in enumerate(rows[:50]):
+        headers = [_norm(c) for c in row]
+        if any(any(w in h for w in _PRICE_WORDS) for h in headers) and (
+            _find(headers, _DATE_COLS) is not None or _find(headers, _TS_COLS) is not None
+        ):
+            header_idx = n
+            break
+    if header_idx is None:
+        raise OteFormatError("nenalezena hlavička (den / čas + cena)")
+
+    headers = [_norm(c) for c in rows[header_idx]]
+    price_i, scale, column = _price_column(headers, eur_czk)
+    day_i = _find(headers, _DATE_COLS)
+    hour_i = _find(headers, _HOUR_COLS)
+    period_i = _find(headers, _PERIOD_COLS)
+    ts_i = _find(headers, _TS_COLS)
+
+    result = ParsedPrices(step=3600, column=column)
+    # (den, pořadí | místní čas, cena) – krok se u period určí až z jejich počtu
+    slots: list[tuple[date, int | None, time | None, float]] = []
+    stamps: list[tuple[float, float]] = []
+
+    for row in rows[header_idx + 1:]:
+        if not any(c.strip() for c in row):
+            continue
+        result.rows += 1
+        try:
+            price = _number(row[price_i])
+            if price is None:
+                raise ValueError
+            price *= scale
+            if day_i is not None and (hour_i is not None or period_i is not None):
+                day = _parse_day(row[day_i])
+                idx, start = _slot_start(row[hour_i if hour_i is not None else period_i])
+                if day is None or (idx is None and start is None):
+                    raise ValueError
+                slots.append((day, idx, start, price))
+            elif ts_i is not None:
+                dt = datetime.fromisoformat(row[ts_i].strip().replace("Z", "+00:00"))
+                if dt.tzinfo is None:
+                    dt = dt.replace(tzinfo=TZ_PRAGUE)
+                stamps.append((dt.timestamp(), price))
+            else:
+                raise ValueError
+        except (ValueError, IndexError):
+            # souhrnné řádky (Celkem, průměr…) a nečitelná data
+            result.bad_rows += 1
+
+    if slots:
+        if hour_i is not None:
+            step = 3600
+        else:
+            top = max((s[1] for s in slots if s[1] is not None), default=0)
+            starts = {s[2].minute for s in slots if s[2] is not None}
+            step = 900 if top > 25 or starts - {0} else 3600
+        result.step = step
+        midnight: dict[date, float] = {}
+        for day, idx, start, price in slots:
+            base = midnight.get(day)
+            if base is None:
+                base = midnight[day] = _local_midnight_utc(day)
+            if idx is not None:
+                # pořadí běží ve skutečném čase – změna času je v počtu period, ne v posunu
+                ts = base + (idx - 1) * step
+            else:
+                ts = datetime.combine(day, start, TZ_PRAGUE).timestamp()
+            result.points.append((ts, price))
+    elif stamps:
+        stamps.sort()
+        diffs = [b[0] - a[0] for a, b in zip(stamps, stamps[1:]) if b[0] > a[0]]
+        result.step = 900 if diffs and min(diffs) <= 900 else 3600
+        result.points = stamps
+    if not result.points:
+        raise OteFormatError("v souboru nejsou žádné ceny")
+    return result
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+import math
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+
+from .const import CONF_APPLIANCES, MAX_APPLIANCES
+from .pricing import spot_unit_prices
+from .tariff import Tariff, offer_slug
+
+LOGGER = logging.getLogger(__name__)
+
+# ---------------------------
+# Plánovač spotřebičů – nejlevnější okno nad křivkou cen (bez závislosti na HA)
+# ---------------------------
+#
+# Horizont = intervaly křivky od běžícího do posledního známého, s jednotkovou
+# cenou spot (stejný vzorec jako uzavření intervalu). Pro všechny spotřebiče se
+# staví jednou; každý spotřebič je pak O(n):
+#   souvislé okno  – prefixové součty, součet okna = P[i + d] − P[i]
+#   nesouvislé     – d nejlevnějších intervalů (argpartition)
+
+@dataclass(frozen=True, slots=True)
+class Appliance:
+    """Spotřebič k naplánování: délka běhu a (volitelně) energie za běh."""
+
+    name: str
+    slug: str
+    duration: float                 # [min]
+    energy: float | None = None     # [kWh] za celý běh; None = jen průměrná cena
+    contiguous: bool = True         # běh v jednom kuse / libovolné intervaly
+    within: float | None = None     # [h] musí doběhnout do tolika hodin od teď
+
+
+def parse_appliance(item: Mapping, index: int = 1) -> Appliance:
+    """Jeden spotřebič ze slovníku (options i služba); neplatný → ValueError."""
+    if not isinstance(item, Mapping):
+        raise ValueError(f"spotřebič {index}: očekávám slovník")
+    unknown = [k for k in item if k not in ("name", "duration", "energy", "contiguous", "within")]
+    if unknown:
+        raise ValueError(f"spotřebič {index}: neznámé parametry {unknown}")
+    name = str(item.get("name") or f"spotrebic_{index}").strip()
+
+    def number(key: str, required: bool = False) -> float | None:
+        value = item.get(key)
+        if value is None:
+            if required:
+                raise ValueError(f"{name}: chybí {key}")
+            return None
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: {key}={value!r} není číslo") from None
+        if not value > 0:
+            raise ValueError(f"{name}: {key} musí být kladné")
+        return value
+
+    return Appliance(
+        name=name,
+        slug=offer_slug(name),
+        duration=number("duration", required=True),
+        energy=number("energy"),
+        contiguous=bool(item.get("contiguous", True)),
+        within=number("within"),
+    )
+
+
+def parse_appliances(raw) -> tuple[Appliance, ...]:
+    """Spotřebiče z options (`[{name, duration, energy, contiguous, within}]`)."""
+    if not raw:
+        return ()
+    if not isinstance(raw, (list, tuple)):
+        raise ValueError("spotřebiče musí být seznam")
+    if len(raw) > MAX_APPLIANCES:
+        raise ValueError(f"nejvýš {MAX_APPLIANCES} spotřebičů")
+    out = tuple(parse_appliance(item, i) for i, item in enumerate(raw, start=1))
+    slugs = [a.slug for a in out]
+    if not all(slugs):
+        raise ValueError("spotřebič bez názvu")
+    if len(set(slugs)) != len(slugs):
+        raise ValueError("názvy spotřebičů se opakují")
+    return out
+
+
+def appliances_from_entry(entry) -> tuple[Appliance, ...]:
+    """Spotřebiče profilu; neplatné nastavení se zaloguje a plánovač se vypne."""
+    try:
+        return parse_appliances(entry.options.get(CONF_APPLIANCES))
+    except ValueError as err:
+        LOGGER.warning("Neplatné spotřebiče profilu %s: %s", entry.title, err)
+        return ()
+
+
+@dataclass(frozen=True, slots=True)
+class Horizon:
+    """Zbývající intervaly křivky s jednotkovou cenou spot."""
+
+    now: float                      # [epoch s]
+    step: float                     # [s]
+    starts: np.ndarray              # začátky intervalů [epoch s]; první = běžící interval
+    unit: np.ndarray                # jednotková cena [Kč/kWh], NaN = chybí cena
+    csum: np.ndarray                # prefixové součty ceny (NaN = 0), délka n + 1
+    cgap: np.ndarray                # prefixový počet chybějících cen, délka n + 1
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+def build_horizon(tariff: Tariff, base: float, step: float, prices: Any, now: float) -> Horizon:
+    """Horizont od běžícího intervalu křivky (`base`, `step`, pole cen) do jejího konce."""
+    prices = np.asarray(prices, dtype=np.float64)
+    i0 = max(0, math.floor((now - base) / step)) if step > 0 else len(prices)
+    spot = prices[i0:].copy()
+    starts = base + (i0 + np.arange(len(spot), dtype=np.float64)) * step
+    unit = spot_unit_prices(tariff, spot)
+    missing = np.isnan(unit)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, unit))))
+    cgap = np.concatenate(([0], np.cumsum(missing)))
+    return Horizon(now, float(step), starts, unit, csum, cgap)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def plan(horizon: Horizon, app: Appliance) -> dict[str, Any] | None:
+    """Nejlevnější okno pro spotřebič; None = v horizontu není dost známých cen."""
+    step = horizon.step
+    n = len(horizon)
+    if app.within is not None:
+        n = min(n, int(np.searchsorted(horizon.starts + step, horizon.now + app.within * 3600.0, side="right")))
+    d = max(1, math.ceil(app.duration * 60.0 / step - 1e-9))
+    if d > n:
+        return None
+    unit = horizon.unit[:n]
+
+    # souvislá okna délky d: součet a počet chybějících cen z prefixových součtů horizontu
+    csum, cgap = horizon.csum[:n + 1], horizon.cgap[:n + 1]
+    sums = csum[d:] - csum[:-d]
+    sums[(cgap[d:] - cgap[:-d]) > 0] = np.inf
+    now_sum = float(sums[0])
+
+    if app.contiguous:
+        i = int(np.argmin(sums))
+        if not np.isfinite(sums[i]):
+            return None
+        idx = np.arange(i, i + d)
+        best = float(sums[i])
+    else:
+        candidates = np.flatnonzero(~np.isnan(unit))
+        if len(candidates) < d:
+            return None
+        idx = np.sort(candidates[np.argpartition(unit[candidates], d - 1)[:d]])
+        best = float(unit[idx].sum())
+
+    kwh = app.energy / d if app.energy else None
+    first = float(horizon.starts[idx[0]])
+    result: dict[str, Any] = {
+        "start": _iso(max(first, horizon.now)),
+        "end": _iso(float(horizon.starts[idx[-1]]) + step),
+        "contiguous": app.contiguous,
+        "intervals": d,
+        "avg_unit_price": round(best / d, 4),
+        "now_unit_price": round(now_sum / d, 4) if math.isfinite(now_sum) else None,
+        "cost": round(best * kwh, 4) if kwh else None,
+        "cost_now": round(now_sum * kwh, 4) if kwh and math.isfinite(now_sum) else None,
+    }
+    result["saving"] = (
+        round(result["cost_now"] - result["cost"], 4) if result["cost"] is not None and result["cost_now"] is not None else None
+    )
+    if not app.contiguous:
+        result["slots"] = [_iso(float(horizon.starts[i])) for i in idx]
+    return result
+
+
+def plan_all(horizon: Horizon, appliances: tuple[Appliance, ...]) -> dict[str, dict[str, Any] | None]:
+    return {app.slug: plan(horizon, app) for app in appliances}
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+import math
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable
+
+from homeassistant.core import HomeAssistant, callback, State                                       # type: ignore
+
+if TYPE_CHECKING:
+    from .hub import DomainHub
+
+LOGGER = logging.getLogger(__name__)
+
+_NAN = float("nan")
+
+# klíče v seznamových atributech typu [{"start": ..., "price": ...}, ...]
+_TIME_KEYS = ("start", "time", "datetime", "from", "date")
+_PRICE_KEYS = ("price", "value", "total", "buy")
+
+
+def _parse_ts(value: Any) -> float | None:
+    if isinstance(value, datetime):
+        return value.timestamp() if value.tzinfo else None
+    if not isinstance(value, str) or len(value) < 16 or value[4] != "-":
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return dt.timestamp() if dt.tzinfo else None
+
+
+def _parse_float(value: Any) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _iter_points(attributes: Mapping) -> list[tuple[float, float]]:
+    """Najdi v atributech dvojice (čas začátku intervalu, cena).
+
+    Podporuje ISO klíče s cenou (`{"2025-01-01T00:00:00+01:00": 2.1, ...}`) i
+    seznamy slovníků (`"today": [{"start": ..., "price": ...}, ...]`).
+    """
+    points: list[tuple[float, float]] = []
+    for key, value in attributes.items():
+        ts = _parse_ts(key)
+        if ts is not None:
+            price = _parse_float(value)
+            if price is not None:
+                points.append((ts, price))
+            continue
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                if not isinstance(item, Mapping):
+                    continue
+                t = next((_parse_ts(item[k]) for k in _TIME_KEYS if k in item), None)
+                p = next((_parse_float(item[k]) for k in _PRICE_KEYS if k in item), None)
+                if t is not None and p is not None:
+                    points.append((t, p))
+    return points
+
+
+class PriceCurve:
+    """Časově indexovaná křivka cen (dnes + zítra) nad polem array('d').
+
+    Interval i začíná v `base + i * step`; chybějící intervaly jsou NaN.
+    Vyhledání ceny je O(1), přestavba jen při změně atributů zdroje.
+    """
+
+    __slots__ = ("base", "step", "prices", "current", "version", "_attrs_ref", "_state_ref")
+
+    def __init__(self) -> None:
+        self.base: float = 0.0
+        self.step: float = 3600.0
+        self.prices = array("d")
+        self.current: float | None = None       # aktuální stav senzoru (záloha)
+        self.version = 0                         # roste s každou přestavbou křivky
+        self._attrs_ref: Any = None
+        self._state_ref: str | None = None
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def update(self, state: State | None) -> bool:
+        """Načti stav zdrojového senzoru; vrací True, pokud se něco změnilo."""
+        if state is None:
+            changed = self.current is not None
+            self.current = None
+            self._state_ref = None
+            return changed
+
+        changed = False
+        if state.state != self._state_ref:
+            self._state_ref = state.state
+            self.current = _parse_float(state.state) if state.state not in ("unknown", "unavailable", "") else None
+            changed = True
+
+        # HA při nezměněných atributech předává tentýž objekt → levná kontrola identity
+        attrs = state.attributes
+        if attrs is not self._attrs_ref and attrs != self._attrs_ref:
+            self._rebuild(attrs)
+            changed = True
+        self._attrs_ref = attrs
+        return changed
+
+    def _rebuild(self, attributes: Mapping) -> None:
+        self.version += 1
+        points = _iter_points(attributes)
+        if not points:
+            self.prices = array("d")
+            return
+        points.sort()
+        steps = [b[0] - a[0] for a, b in zip(points, points[1:]) if b[0] > a[0]]
+        step = min(steps) if steps else 3600.0
+        base = points[0][0]
+        n = int(round((points[-1][0] - base) / step)) + 1
+        prices = array("d", [_NAN]) * n
+        for ts, price in points:
+            prices[int(round((ts - base) / step))] = price
+        self.base, self.step, self.prices = base, step, prices
+
+    def price_at(self, ts: float) -> float | None:
+        """Cena intervalu, do kterého padne `ts` (None = neznámá)."""
+        i = math.floor((ts - self.base) / self.step)
+        if 0 <= i < len(self.prices):
+            p = self.prices[i]
+            if p == p:      # není NaN
+                return p
+        return None
+
+    def mean_price(self, t0: float, t1: float) -> float | None:
+        """Časově vážený průměr ceny v intervalu [t0, t1) (None = chybí data)."""
+        if t1 <= t0 or not self.prices:
+            return None
+        step, base = self.step, self.base
+        acc = 0.0
+        t = t0
+        while t < t1:
+            i = math.floor((t - base) / step)
+            end = min(t1, base + (i + 1) * step)
+            p = self.price_at(t)
+            if p is None:
+                return None
+            acc += p * (end - t)
+            t = end
+        return acc / (t1 - t0)
+
+
+class SpotPriceSource:
+    """Zdroj spotové ceny jednoho profilu.
+
+    Křivku i přihlášení ke změnám cenového senzoru drží hub domény – profily
+    se stejným senzorem sdílí jediné parsování atributů.
+    """
+
+    def __init__(self, hass: HomeAssistant, entity_id: str, hub: "DomainHub") -> None:
+        self.hass = hass
+        self.entity_id = entity_id
+        self._hub = hub
+        self._listeners: list[Callable[[], None]] = []
+        self._unsub: Callable[[], None] | None = None
+
+    @property
+    def curve(self) -> PriceCurve:
+        return self._hub.price_curve(self.entity_id)
+
+    @callback
+    def async_start(self) -> None:
+        self._unsub = self._hub.async_track_prices(self.entity_id, self._notify)
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def async_set_entity(self, entity_id: str) -> None:
+        """Přepni na jiný cenový senzor (změna options)."""
+        if entity_id == self.entity_id:
+            return
+        self.async_stop()
+        self.entity_id = entity_id
+        self.async_start()
+        self._notify()
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _remove
+
+    @callback
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+    def price_for(self, t0: float, t1: float) -> float | None:
+        """Cena pro interval [t0, t1) z křivky; None = křivka interval nepokrývá.
+
+        Aktuální stav senzoru se nedosazuje – platí pro jiný interval.
+        """
+        return self.curve.mean_price(t0, t1)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from typing import Iterable
+
+LOGGER = logging.getLogger(__name__)
+
+_NAN = float("nan")
+
+# ---------------------------
+# Binární řada cen (bez závislosti na HA)
+# ---------------------------
+#
+# Soubor = hlavička + pole float64 (little endian), interval i začíná
+# v `base + i * step`. Chybějící intervaly jsou NaN, vyhledání ceny je
+# index do pole – O(1) bez parsování textu. Rok 15min cen ≈ 280 kB.
+
+_MAGIC = b"PCSP"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHxxIdI")            # magic, verze, step [s], base [epoch s], počet
+_LITTLE = array("d", [1.0]).tobytes() == struct.pack("<d", 1.0)
+
+
+@dataclass(slots=True)
+class MergeResult:
+    """Výsledek importu do jedné řady."""
+
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0                            # čas mimo mřížku kroku
+
+    def as_dict(self) -> dict[str, int]:
+        return {"added": self.added, "updated": self.updated, "unchanged": self.unchanged, "skipped": self.skipped}
+
+
+class PriceSeries:
+    """Ceny s pevným krokem (3600 / 900 s) nad souvislým polem array('d')."""
+
+    __slots__ = ("step", "base", "prices")
+
+    def __init__(self, step: int, base: float = 0.0, prices: array | None = None) -> None:
+        self.step = step
+        self.base = base
+        self.prices = prices if prices is not None else array("d")
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def end(self) -> float:
+        return self.base + len(self.prices) * self.step
+
+    def known(self) -> int:
+        return sum(1 for p in self.prices if p == p)
+
+    def price_at(self, ts: float) -> float | None:
+        i = math.floor((ts - self.base) / self.step)
+        if 0 <= i < len(self.prices):
+            p = self.prices[i]
+            if p == p:
+                return p
+        return None
+
+    def slice(self, t0: float, t1: float) -> array:
+        """Ceny intervalů [t0, t1) zarovnaných na krok; mimo řadu NaN."""
+        step = self.step
+        start = math.floor((t0 - self.base) / step)
+        stop = math.ceil((t1 - self.base) / step)
+        if stop <= start:
+            return array("d")
+        out = array("d", [_NAN]) * (stop - start)
+        lo, hi = max(start, 0), min(stop, len(self.prices))
+        if hi > lo:
+            out[lo - start:hi - start] = self.prices[lo:hi]
+        return out
+
+    def merge(self, points: Iterable[tuple[float, float]]) -> MergeResult:
+        """Vlož body (začátek intervalu, cena); pozdější import přepíše dřívější hodnotu.
+
+        Pracuje nad kopií pole – čtenáři během importu vidí buď starou, nebo
+        celou novou řadu.
+        """
+        res = MergeResult()
+        step = self.step
+        pts = []
+        for ts, price in points:
+            if ts % step or price != price:
+                res.skipped += 1
+                continue
+            pts.append((ts, price))
+        if not pts:
+            return res
+
+        lo = min(ts for ts, _ in pts)
+        hi = max(ts for ts, _ in pts) + step
+        if not self.prices:
+            base, prices = lo, array("d")
+        else:
+            base, prices = self.base, array("d", self.prices)
+        if lo < base:
+            prices = array("d", [_NAN]) * int((base - lo) // step) + prices
+            base = lo
+        end = base + len(prices) * step
+        if hi > end:
+            prices += array("d", [_NAN]) * int((hi - end) // step)
+
+        for ts, price in pts:
+            i = int((ts - base) // step)
+            old = prices[i]
+            if old != old:
+                res.added += 1
+            elif old == price:
+                res.unchanged += 1
+                continue
+            else:
+                res.updated += 1
+            prices[i] = price
+        self.base, self.prices = base, prices
+        return res
+
+    # --- soubor ---
+    def to_bytes(self) -> bytes:
+        data = self.prices
+        if not _LITTLE:
+            data = array("d", data)
+            data.byteswap()
+        return _HEADER.pack(_MAGIC, _VERSION, self.step, self.base, len(self.prices)) + data.tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> PriceSeries:
+        magic, version, step, base, count = _HEADER.unpack_from(raw)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("neznámý formát úložiště cen")
+        prices = array("d")
+        prices.frombytes(raw[_HEADER.size:_HEADER.size + count * 8])
+        if not _LITTLE:
+            prices.byteswap()
+        if len(prices) != count:
+            raise ValueError("zkrácený soubor úložiště cen")
+        return cls(step, base, prices)
+
+
+class PriceStore:
+    """Historické spotové ceny [Kč/kWh] po krocích 60 a 15 min.
+
+    Každý krok má vlastní soubor v `directory`. Načtení i zápis jsou
+    blokující (volat přes executor); čtení z pole je pak čistě v paměti.
+    """
+
+    STEPS = (3600, 900)
+
+    def __init__(self, directory: str, prefix: str) -> None:
+        self._directory = directory
+        self._prefix = prefix
+        self.series: dict[int, PriceSeries] = {}
+
+    def _path(self, step: int) -> str:
+        return os.path.join(self._directory, f"{self._prefix}_{step}.bin")
+
+    def load(self) -> None:
+        for step in self.STEPS:
+            path = self._path(step)
+            try:
+                with open(path, "rb") as fh:
+                    self.series[step] = PriceSeries.from_bytes(fh.read())
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, struct.error) as err:
+                LOGGER.warning("Úložiště cen %s nelze načíst: %s", path, err)
+
+    def save(self, step: int) -> None:
+        series = self.series.get(step)
+        if series is None:
+            return
+        path = self._path(step)
+        os.makedirs(self._directory, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(series.to_bytes())
+        os.replace(tmp, path)
+
+    def merge(self, step: int, points: Iterable[tuple[float, float]]) -> MergeResult:
+        """Import bodů do řady `step` a uložení (jen když se něco změnilo)."""
+        if step not in self.STEPS:
+            raise ValueError(f"nepodporovaný krok {step} s")
+        series = self.series.get(step) or PriceSeries(step)
+        res = series.merge(points)
+        if res.added or res.updated:
+            self.series[step] = series
+            self.save(step)
+        return res
+
+    def prices(self, t0: float, t1: float, step: int) -> array:
+        """Ceny intervalů [t0, t1) po kroku `step`; díry z druhé řady, jinak NaN.
+
+        15min ceny chybějící v 15min řadě se doplní hodinovou cenou, hodinové
+        ceny chybějící v hodinové řadě průměrem čtyř 15min cen.
+        """
+        first = math.floor(t0 / step)
+        n = max(0, math.ceil(t1 / step) - first)
+        t = first * step
+        own = self.series.get(step)
+        out = own.slice(t, t + n * step) if own is not None else array("d", [_NAN]) * n
+        other_step = 900 if step == 3600 else 3600
+        other = self.series.get(other_step)
+        if other is None:
+            return out
+        for i in range(len(out)):
+            if out[i] != out[i]:
+                if other_step > step:
+                    p = other.price_at(t + i * step)
+                    if p is not None:
+                        out[i] = p
+                else:
+                    quarter = other.slice(t + i * step, t + (i + 1) * step)
+                    if len(quarter) and all(q == q for q in quarter):
+                        out[i] = sum(quarter) / len(quarter)
+        return out
+
+    def price_at(self, ts: float) -> float | None:
+        """Nejjemnější známá cena v čase `ts`."""
+        for step in (900, 3600):
+            series = self.series.get(step)
+            if series is not None:
+                p = series.price_at(ts)
+                if p is not None:
+                    return p
+        return None
+
+    def stats(self) -> dict:
+        return {
+            str(step): {
+                "intervals": len(s),
+                "known": s.known(),
+                "start": s.base,
+                "end": s.end,
+                "bytes": len(s) * 8,
+            }
+            for step, s in sorted(self.series.items())
+        }
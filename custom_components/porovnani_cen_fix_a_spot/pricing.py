@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+
+from .tariff import Offer, Tariff
+
+# ---------------------------
+# Cenové vzorce fix / spot (bez závislosti na HA)
+# ---------------------------
+#
+# spot: (spot + marže) + distribuce_vt + (daň + služby) + POZE = spot + tariff.spot_adder_vt
+# fix:  VT/NT podle podílu NT × jednotková cena fix + paušál rozpočítaný na interval
+#       (měsíc s 28–31 dny, podle začátku intervalu v UTC – stejně jako živé uzavření)
+#
+# `_formula` počítá stejně nad čísly (uzavření jednoho intervalu) i nad poli
+# NumPy (dávka pro analýzy) – živé senzory a offline výpočty sdílí jeden vzorec.
+
+
+def _formula(tariff: Tariff, kwh: Any, nt_share: Any, spot: Any, fix_fee: Any) -> tuple[Any, ...]:
+    kwh_nt = kwh * nt_share
+    kwh_vt = kwh - kwh_nt
+    spot_unit = spot + tariff.spot_adder_vt
+    spot_cost = spot_unit * kwh
+    fix_energy = kwh_vt * tariff.fix_unit_vt + kwh_nt * tariff.fix_unit_nt
+    return kwh_vt, kwh_nt, spot_unit, spot_cost, fix_energy, fix_energy + fix_fee
+
+
+@dataclass(frozen=True, slots=True)
+class IntervalCosts:
+    """Náklady jednoho intervalu (nezaokrouhlené)."""
+
+    kwh_vt: float
+    kwh_nt: float
+    spot_unit: float
+    spot_cost: float
+    fix_unit: float
+    fix_fee: float
+    fix_cost: float
+
+
+def interval_costs(
+    tariff: Tariff, kwh: float, nt_share: float, spot: float, start: datetime, minutes: int,
+    nt_now: bool | None = None,
+) -> IntervalCosts:
+    """Uzavření jednoho intervalu; `nt_now` = jednotková cena fix, když je spotřeba 0."""
+    fix_fee = tariff.fix_interval_fee(start, minutes)
+    kwh_vt, kwh_nt, spot_unit, spot_cost, fix_energy, fix_cost = _formula(tariff, kwh, nt_share, spot, fix_fee)
+    fix_unit = fix_energy / kwh if kwh > 0 else (tariff.fix_unit_nt if nt_now is True else tariff.fix_unit_vt)
+    return IntervalCosts(kwh_vt, kwh_nt, spot_unit, spot_cost, fix_unit, fix_fee, fix_cost)
+
+
+def spot_unit_prices(tariff: Tariff, spot: Any) -> np.ndarray:
+    """Jednotková cena spot [Kč/kWh] pro pole intervalů – stejný vzorec jako `_formula`; NaN zůstává NaN."""
+    return np.asarray(spot, dtype=np.float64) + tariff.spot_adder_vt
+
+
+# ---------------------------
+# Dávkový výpočet nad poli
+# ---------------------------
+
+@dataclass(frozen=True, slots=True)
+class CostArrays:
+    """Výsledek dávky – pole stejné délky jako vstup."""
+
+    kwh: np.ndarray
+    kwh_vt: np.ndarray
+    kwh_nt: np.ndarray
+    spot_unit: np.ndarray
+    spot_cost: np.ndarray
+    fix_unit: np.ndarray
+    fix_fee: np.ndarray
+    fix_cost: np.ndarray
+    spot_fee: np.ndarray                # paušál spot rozpočítaný na interval (ve spot_cost není, jako živě)
+
+    def totals(self) -> dict[str, float]:
+        return {
+            "kwh": float(self.kwh.sum()),
+            "kwh_vt": float(self.kwh_vt.sum()),
+            "kwh_nt": float(self.kwh_nt.sum()),
+            "spot_cost": float(self.spot_cost.sum()),
+            "spot_fee": float(self.spot_fee.sum()),
+            "fix_cost": float(self.fix_cost.sum()),
+            "fix_fee": float(self.fix_fee.sum()),
+        }
+
+
+def month_days(starts: np.ndarray) -> np.ndarray:
+    """Počet dní měsíce (UTC), do kterého padne každý začátek intervalu [epoch s]."""
+    month = np.asarray(starts, dtype="int64").astype("datetime64[s]").astype("datetime64[M]")
+    return ((month + 1).astype("datetime64[D]") - month.astype("datetime64[D]")).astype(np.int64)
+
+
+def batch_costs(
+    tariff: Tariff, kwh: Any, spot: Any, nt_share: Any, starts: Any, minutes: int,
+) -> CostArrays:
+    """Náklady obou produktů pro pole intervalů v jednom vektorovém průchodu.
+
+    `kwh` – spotřeba intervalů, `spot` – spotová cena [Kč/kWh] (NaN = 0),
+    `nt_share` – podíl NT 0–1 nebo příznak HDO (bool), `starts` – začátky
+    intervalů [epoch s, UTC], `minutes` – délka intervalu.
+    """
+    kwh = np.asarray(kwh, dtype=np.float64)
+    spot = np.nan_to_num(np.asarray(spot, dtype=np.float64), nan=0.0)
+    nt = np.asarray(nt_share, dtype=np.float64)
+    starts = np.asarray(starts)
+    days = month_days(starts) - 28
+    scale = minutes / 60.0
+    fix_fee = np.asarray(tariff.fix_fee_per_hour)[days] * scale
+    spot_fee = np.asarray(tariff.spot_fee_per_hour)[days] * scale
+
+    kwh_vt, kwh_nt, spot_unit, spot_cost, fix_energy, fix_cost = _formula(tariff, kwh, nt, spot, fix_fee)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fix_unit = np.where(
+            kwh > 0, fix_energy / kwh, np.where(nt >= 0.5, tariff.fix_unit_nt, tariff.fix_unit_vt),
+        )
+    return CostArrays(
+        kwh=kwh, kwh_vt=kwh_vt, kwh_nt=kwh_nt, spot_unit=spot_unit, spot_cost=spot_cost,
+        fix_unit=fix_unit, fix_fee=fix_fee, fix_cost=fix_cost, spot_fee=spot_fee,
+    )
+
+
+# ---------------------------
+# Další nabídky profilu – všechny v jednom průchodu
+# ---------------------------
+
+class OfferBook:
+    """Koeficienty nabídek profilu jako pole (jeden prvek = jedna nabídka).
+
+    Atributy se jmenují jako u `Tariff`, takže `_formula` nad nimi spočítá
+    interval pro všechny nabídky najednou. Počítá se jen při uzavření
+    intervalu – události spotřeby nabídky nezdražují. Cena obou produktů je
+    včetně paušálu, nabídky jsou tak srovnatelné mezi sebou i s backtestem.
+    """
+
+    __slots__ = (
+        "offers", "is_fix", "spot_adder_vt", "fix_unit_vt", "fix_unit_nt", "fix_fee_per_hour", "spot_fee_per_hour",
+    )
+
+    def __init__(self, offers: tuple[Offer, ...]) -> None:
+        self.offers = offers
+        tariffs = [o.tariff for o in offers]
+        self.is_fix = np.array([o.product == "fix" for o in offers], dtype=bool)
+        self.spot_adder_vt = np.array([t.spot_adder_vt for t in tariffs], dtype=np.float64)
+        self.fix_unit_vt = np.array([t.fix_unit_vt for t in tariffs], dtype=np.float64)
+        self.fix_unit_nt = np.array([t.fix_unit_nt for t in tariffs], dtype=np.float64)
+        # (dny v měsíci − 28) × nabídka
+        self.fix_fee_per_hour = np.array([t.fix_fee_per_hour for t in tariffs], dtype=np.float64).reshape(-1, 4).T
+        self.spot_fee_per_hour = np.array([t.spot_fee_per_hour for t in tariffs], dtype=np.float64).reshape(-1, 4).T
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+    @property
+    def slugs(self) -> tuple[str, ...]:
+        return tuple(o.slug for o in self.offers)
+
+    def interval_costs(
+        self, kwh: float, nt_share: float, spot: float | None, start: datetime, minutes: int,
+    ) -> tuple[float, ...]:
+        """Cena intervalu pro každou nabídku, fix i spot vč. paušálu rozpočítaného na interval.
+
+        `spot` None = cena intervalu chybí; u spotových nabídek se pak počítá jen paušál.
+        """
+        if not self.offers:
+            return ()
+        days = monthrange(start.year, start.month)[1] - 28
+        scale = minutes / 60.0
+        fix_fee = self.fix_fee_per_hour[days] * scale
+        *_, spot_cost, _fix_energy, fix_cost = _formula(self, kwh, nt_share, spot or 0.0, fix_fee)
+        spot_total = (0.0 if spot is None else spot_cost) + self.spot_fee_per_hour[days] * scale
+        return tuple(np.round(np.where(self.is_fix, fix_cost, spot_total), 6).tolist())
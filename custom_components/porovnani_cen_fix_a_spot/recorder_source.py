@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from homeassistant.components.recorder import get_instance                                         # type: ignore
+from homeassistant.components.recorder.statistics import statistics_during_period                  # type: ignore
+from homeassistant.core import HomeAssistant, State                                                 # type: ignore
+
+LOGGER = logging.getLogger(__name__)
+
+# délka krátkodobé statistiky recorderu [s]
+STATS_PERIOD = 300.0
+
+# statistiky se počítají jen pro entity se state_class
+_STATE_CLASSES = ("measurement", "total", "total_increasing")
+# převod jednotek dělá recorder (kWh / kW bez ohledu na jednotku senzoru)
+_UNITS = {"energy": "kWh", "power": "kW"}
+
+
+def has_statistics(hass: HomeAssistant, state: State | None) -> bool:
+    """Má entita krátkodobé statistiky (běží recorder a entita má state_class)?"""
+    if state is None or "recorder" not in hass.config.components:
+        return False
+    return state.attributes.get("state_class") in _STATE_CLASSES
+
+
+def floor_period(ts: float) -> float:
+    return ts - ts % STATS_PERIOD
+
+
+def _ts(value: Any) -> float:
+    # HA ≥ 2023.3 vrací epoch s, starší datetime
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+class ShortTermStatistics:
+    """Spotřeba z 5min statistik recorderu: jeden dávkový dotaz pro všechny entity.
+
+    Pro výkon se bere `mean` (kW) × 5 min, pro energii `change` (kWh) a
+    `state` na konci periody jako základ pro dopočet ještě nespočtené části
+    intervalu ze živého stavu (u výkonu průměr periody v kW). Drží se jen
+    řádky od začátku okna – pár desítek čísel na entitu.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        # entita → [(začátek, konec, kWh, stav na konci periody / průměr kW | None)], seřazeno podle času
+        self._rows: dict[str, list[tuple[float, float, float, float | None]]] = {}
+        self.fetched_at: float | None = None
+        self.queries = 0
+
+    async def async_fetch(self, kinds: dict[str, str], since: float) -> bool:
+        """Načti statistiky entit `kinds` (entita → "energy" / "power") od `since`.
+
+        Dotaz se posune o jednu periodu dřív – poslední řádek před oknem dává
+        u energie stav na začátku okna. Vrací False, když recorder selže.
+        """
+        if not kinds:
+            self._rows = {}
+            return True
+        start = datetime.fromtimestamp(floor_period(since) - STATS_PERIOD, timezone.utc)
+        try:
+            result = await get_instance(self.hass).async_add_executor_job(
+                statistics_during_period,
+                self.hass, start, None, set(kinds), "5minute", _UNITS, {"mean", "change", "state"},
+            )
+        except Exception:
+            LOGGER.warning("Krátkodobé statistiky recorderu nelze načíst", exc_info=True)
+            return False
+        self.queries += 1
+        self.fetched_at = datetime.now(timezone.utc).timestamp()
+
+        rows: dict[str, list[tuple[float, float, float, float | None]]] = {}
+        for ent_id, kind in kinds.items():
+            out = rows[ent_id] = []
+            for row in result.get(ent_id) or ():
+                t0, t1 = _ts(row["start"]), _ts(row["end"])
+                if kind == "power":
+                    mean = row.get("mean")
+                    kwh = mean * (t1 - t0) / 3600.0 if mean is not None else 0.0
+                    out.append((t0, t1, max(0.0, kwh), mean))
+                else:
+                    kwh = row.get("change") or 0.0
+                    out.append((t0, t1, max(0.0, kwh), row.get("state")))
+        self._rows = rows
+        return True
+
+    def covered(self, ent_id: str, cutoff: float) -> tuple[float, float, float | None]:
+        """(kWh řádků od `cutoff`, konec pokrytí, stav na konci pokrytí / průměr poslední periody)."""
+        kwh = 0.0
+        until = cutoff
+        state: float | None = None
+        for t0, t1, row_kwh, row_state in self._rows.get(ent_id, ()):
+            if t1 <= cutoff:
+                # řádek před oknem – jen základ pro dopočet energie
+                state = row_state
+                continue
+            if t0 < cutoff:
+                continue
+            kwh += row_kwh
+            until = t1
+            state = row_state
+        return kwh, until, state
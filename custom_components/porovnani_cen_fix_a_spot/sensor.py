@@ -1,111 +1,142 @@
 from __future__ import annotations
 
 import logging
-from collections import deque, defaultdict
+import sys
+from base64 import b64decode, b64encode
+from collections import defaultdict
 from datetime import datetime, timedelta, timezone
-from calendar import monthrange
+from functools import partial
+from time import perf_counter_ns
 
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass       # type: ignore
-from homeassistant.const import UnitOfEnergy                                                        # type: ignore
+from homeassistant.const import UnitOfEnergy, EVENT_HOMEASSISTANT_STOP                              # type: ignore
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime                       # type: ignore
 from homeassistant.core import HomeAssistant, callback, State                                       # type: ignore
 from homeassistant.helpers.entity_platform import AddEntitiesCallback                               # type: ignore
 from homeassistant.helpers.restore_state import RestoreEntity                                       # type: ignore
 from homeassistant.config_entries import ConfigEntry                                                # type: ignore
-from homeassistant.helpers.event import async_track_state_change_event, async_track_time_change     # type: ignore
+from homeassistant.helpers.storage import Store                                                     # type: ignore
+from homeassistant.helpers.dispatcher import async_dispatcher_connect                               # type: ignore
 
 LOGGER = logging.getLogger(__name__)
 
 from .const import (
     DOMAIN,
+    SIGNAL_OPTIONS_UPDATED,
+    STORAGE_VERSION, STORAGE_KEY_WINDOWS,
     ATTR_SOURCE_ENTITY_ID, ATTR_SOURCE_STATE, ATTR_IS_LOW_TARIFF,
-    # --- FIX ---
-    CONF_FIX_OBCHODNI_CENA_VT, CONF_FIX_OBCHODNI_CENA_NT,
-    CONF_FIX_STALA_PLATBA, CONF_FIX_ZA_JISTIC, CONF_FIX_PROVOZ_INFRASTRUKTURY,
-    DEFAULT_FIX_OBCHODNI_CENA_VT, DEFAULT_FIX_OBCHODNI_CENA_NT,
-    DEFAULT_FIX_STALA_PLATBA, DEFAULT_FIX_ZA_JISTIC, DEFAULT_FIX_PROVOZ_INFRASTRUKTURY,
-    # --- SPOT ---
-    CONF_SPOT_MARZE, CONF_SPOT_STALA_PLATBA, CONF_SPOT_ZA_JISTIC, CONF_SPOT_PROVOZ_INFRASTRUKTURY,
-    DEFAULT_SPOT_MARZE, DEFAULT_SPOT_STALA_PLATBA, DEFAULT_SPOT_ZA_JISTIC, DEFAULT_SPOT_PROVOZ_INFRASTRUKTURY,
-    # --- POZE / DISTRIBUCE ---
-    CONF_POZE, DEFAULT_POZE,
-    CONF_DISTRIBUCE_VT, CONF_DISTRIBUCE_NT, CONF_DISTRIBUCE_DAN, CONF_DISTRIBUCE_SLUZBY,
-    DEFAULT_DISTRIBUCE_VT, DEFAULT_DISTRIBUCE_NT, DEFAULT_DISTRIBUCE_DAN, DEFAULT_DISTRIBUCE_SLUZBY,
-    # --- spotřeba ---
-    CONF_CONS_TOTAL_ENERGY, CONF_CONS_PHASE1, CONF_CONS_PHASE2, CONF_CONS_PHASE3,
     # --- spot price ---
     DEFAULT_SPOT_PRICE_SENSOR,
+    # --- zápis stavu ---
+    CONF_PUBLISH_MIN_INTERVAL, CONF_PUBLISH_DEADBAND,
+    DEFAULT_PUBLISH_MIN_INTERVAL, DEFAULT_PUBLISH_DEADBAND,
+    # --- komprese oken ---
+    CONF_COMPRESSION_TOLERANCE, CONF_COMPRESSION_MAX_SAMPLES,
+    DEFAULT_COMPRESSION_TOLERANCE, DEFAULT_COMPRESSION_MAX_SAMPLES,
+    # --- interval vyúčtování ---
+    DEFAULT_SETTLEMENT_INTERVAL,
+    # --- integrace výkonu ---
+    POWER_INTEGRATION_HOLD, DEFAULT_POWER_INTEGRATION, DEFAULT_HOLD_STEP,
+    # --- zdroj spotřeby ---
+    CONSUMPTION_SOURCE_STATISTICS,
 )
-
-DEFAULT_MAP: dict[str, float] = {
-    # FIX
-    CONF_FIX_OBCHODNI_CENA_VT: DEFAULT_FIX_OBCHODNI_CENA_VT,
-    CONF_FIX_OBCHODNI_CENA_NT: DEFAULT_FIX_OBCHODNI_CENA_NT,
-    CONF_FIX_STALA_PLATBA: DEFAULT_FIX_STALA_PLATBA,
-    CONF_FIX_ZA_JISTIC: DEFAULT_FIX_ZA_JISTIC,
-    CONF_FIX_PROVOZ_INFRASTRUKTURY: DEFAULT_FIX_PROVOZ_INFRASTRUKTURY,
-    # SPOT
-    CONF_SPOT_MARZE: DEFAULT_SPOT_MARZE,
-    CONF_SPOT_STALA_PLATBA: DEFAULT_SPOT_STALA_PLATBA,
-    CONF_SPOT_ZA_JISTIC: DEFAULT_SPOT_ZA_JISTIC,
-    CONF_SPOT_PROVOZ_INFRASTRUKTURY: DEFAULT_SPOT_PROVOZ_INFRASTRUKTURY,
-    # POZE / DISTRIBUCE
-    CONF_POZE: DEFAULT_POZE,
-    CONF_DISTRIBUCE_VT: DEFAULT_DISTRIBUCE_VT,
-    CONF_DISTRIBUCE_NT: DEFAULT_DISTRIBUCE_NT,
-    CONF_DISTRIBUCE_DAN: DEFAULT_DISTRIBUCE_DAN,
-    CONF_DISTRIBUCE_SLUZBY: DEFAULT_DISTRIBUCE_SLUZBY,
-}
+from .coalescer import WriteCoalescer
+from .coordinator import IntervalRecord, IntervalSettlement, async_setup_graph
+from .graph import DataflowGraph
+from .hub import DomainHub
+from .planner import Appliance
+from .price_cache import SpotPriceSource
+from .recorder_source import ShortTermStatistics, floor_period, has_statistics
+from .stats import EntryStats, SensorStats
+from .tariff import Offer, Tariff
+from .window import EnergyWindow, HoldWindow, PowerWindow
 
 
 # ---------------------------
 # Pomocné konverze/jednotky (MODULOVÉ FUNKCE)
 # ---------------------------
 
-def _energy_to_kwh(state: State | None) -> float | None:
-    """State -> hodnota v kWh (akumulační senzor energie)."""
-    if state is None or state.state in (None, "unknown", "unavailable"):
-        return None
-    try:
-        val = float(state.state)
-    except ValueError:
-        return None
-    unit = (state.attributes.get("unit_of_measurement") or "").lower()
-    if unit in ("kwh", "kw·h", "kw*h"):
-        return val
-    if unit in ("wh",):
-        return val / 1000.0
-    # neznámá jednotka – ignoruj
-    return None
-
-def _power_to_kw(state: State | None) -> float | None:
-    """State -> kW (okamžitý výkon)."""
-    if state is None or state.state in (None, "unknown", "unavailable"):
-        return None
-    try:
-        val = float(state.state)
-    except ValueError:
-        return None
-    unit = (state.attributes.get("unit_of_measurement") or "").lower()
-    if unit in ("kw",):
-        return val
-    if unit in ("w",):
-        return val / 1000.0
-    return None
-
-def _hours_in_current_month(now: datetime) -> int:
-    """Počet hodin v právě běžícím měsíci (zohlední délku měsíce)."""
-    y, m = now.year, now.month
-    days = monthrange(y, m)[1]
-    return days * 24
-
-def _is_low_tariff(hass: HomeAssistant, hdo_switch_entity_id: str | None) -> bool | None:
-    """Zjisti, zda je aktuálně NT (True) nebo VT (False). None pokud nevíme."""
-    if not hdo_switch_entity_id:
-        return None
-    st = hass.states.get(hdo_switch_entity_id)
-    if not st or st.state in ("unknown", "unavailable", None, ""):
-        return None
-    return str(st.state).lower() in ("on", "true", "1")
+# jednotka (lowercase) → násobek na kWh / kW; neznámá jednotka se ignoruje
+_ENERGY_SCALE = {"kwh": 1.0, "kw·h": 1.0, "kw*h": 1.0, "wh": 0.001}
+_POWER_SCALE = {"kw": 1.0, "w": 0.001}
+
+_UNRESOLVED = object()
+
+
+class _SourceUnit:
+    """Převod stavu zdrojové entity na kWh (energie) nebo kW (výkon).
+
+    Režim a násobek se určí z `unit_of_measurement` jednou a drží se, dokud
+    entita nepošle jinou jednotku – událost pak stojí jedno porovnání
+    řetězce a jeden float().
+    """
+
+    __slots__ = ("kind", "scale", "_unit", "_allow_power")
+
+    def __init__(self, allow_power: bool) -> None:
+        self.kind: str | None = None                    # "energy" | "power" | None
+        self.scale = 0.0
+        self._unit = _UNRESOLVED
+        self._allow_power = allow_power                 # celkový senzor je jen energie
+
+    def parse(self, state: State | None) -> float | None:
+        if state is None:
+            return None
+        unit = state.attributes.get("unit_of_measurement")
+        if unit != self._unit:
+            self._resolve(unit)
+        if self.kind is None:
+            return None
+        try:
+            # "unknown" / "unavailable" neprojdou float()
+            return float(state.state) * self.scale
+        except (TypeError, ValueError):
+            return None
+
+    def _resolve(self, unit) -> None:
+        self._unit = unit
+        key = (unit or "").lower()
+        if key in _ENERGY_SCALE:
+            self.kind, self.scale = "energy", _ENERGY_SCALE[key]
+        elif self._allow_power and key in _POWER_SCALE:
+            self.kind, self.scale = "power", _POWER_SCALE[key]
+        else:
+            self.kind, self.scale = None, 0.0
+
+
+def _publish_params(entry: ConfigEntry) -> tuple[float, float]:
+    """(min_interval, deadband) zápisu stavu dle nastavení profilu (options → data → default)."""
+    def _get(key: str, default: float) -> float:
+        try:
+            return float(entry.options.get(key, entry.data.get(key, default)))
+        except (TypeError, ValueError):
+            return default
+
+    return (
+        _get(CONF_PUBLISH_MIN_INTERVAL, DEFAULT_PUBLISH_MIN_INTERVAL),
+        _get(CONF_PUBLISH_DEADBAND, DEFAULT_PUBLISH_DEADBAND),
+    )
+
+def _compression_params(entry: ConfigEntry, window: timedelta) -> tuple[float, int]:
+    """(odchylka kW, strop vzorků) komprese oken výkonu dle nastavení profilu.
+
+    Tolerance je zadaná jako max. chyba energie za okno [Wh]; chyba
+    swinging door je ≤ odchylka × délka okna, odtud odchylka v kW.
+    """
+    def _get(key: str, default: float) -> float:
+        try:
+            return float(entry.options.get(key, entry.data.get(key, default)))
+        except (TypeError, ValueError):
+            return default
+
+    tolerance_kwh = max(0.0, _get(CONF_COMPRESSION_TOLERANCE, DEFAULT_COMPRESSION_TOLERANCE)) / 1000.0
+    hours = window.total_seconds() / 3600.0
+    return tolerance_kwh / hours, int(_get(CONF_COMPRESSION_MAX_SAMPLES, DEFAULT_COMPRESSION_MAX_SAMPLES))
+
+def _make_coalescer(hass: HomeAssistant, entry: ConfigEntry, entity: SensorEntity, stats: SensorStats) -> WriteCoalescer:
+    """Slučovač zápisů stavu dle nastavení profilu (zápisy se počítají do `stats`)."""
+    min_interval, deadband = _publish_params(entry)
+    return WriteCoalescer(hass, stats.counting(entity.async_write_ha_state), min_interval=min_interval, deadband=deadband)
 
 class HDOTariffSensor(SensorEntity):
     """Sensor odvozující HDO tarif z přepínače (ON=nízký, OFF=vysoký)."""
@@ -113,8 +144,9 @@ class HDOTariffSensor(SensorEntity):
     _attr_icon = "mdi:flash-auto"
     _attr_translation_key = "hdo_tariff"
 
-    def __init__(self, hass: HomeAssistant, source_entity_id: str) -> None:
+    def __init__(self, hass: HomeAssistant, source_entity_id: str, hub: DomainHub) -> None:
         self.hass = hass
+        self._hub = hub
         self._source_entity_id = source_entity_id
         self._unsubscribe = None
         safe_source = source_entity_id.replace(".", "_").replace(":", "_").replace("/", "_")
@@ -130,9 +162,7 @@ class HDOTariffSensor(SensorEntity):
             new_state = event.data.get("new_state")
             self._set_from_source(new_state)
 
-        self._unsubscribe = async_track_state_change_event(
-            self.hass, [self._source_entity_id], _state_change
-        )
+        self._unsubscribe = self._hub.async_track_entity(self._source_entity_id, _state_change)
 
     async def async_will_remove_from_hass(self) -> None:
         if self._unsubscribe:
@@ -169,9 +199,14 @@ class HDOTariffSensor(SensorEntity):
 
 
 # ---------------------------
-# Senzor: spotřeba za poslední hodinu (kWh)
+# Senzor: spotřeba za poslední zúčtovací interval (kWh)
 # ---------------------------
 
+# jak často se okna ukládají (navíc vždy při vypnutí HA)
+WINDOW_SAVE_INTERVAL = timedelta(minutes=10)
+# [s] jak často událost dořízne i okna ostatních entit (zbytek času jen okno své entity)
+_SWEEP_INTERVAL = 5.0
+
 class HourlyConsumptionSensor(SensorEntity):
     _attr_translation_key = "hourly_consumption"
     _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
@@ -186,19 +221,55 @@ class HourlyConsumptionSensor(SensorEntity):
 
         # debug info
         self._dbg_mode: str | None = None                   # "energy" | "power" | None
-        self._dbg_breakdown: dict[str, float] = {}          # kWh za poslední 1h per entita
+        self._dbg_breakdown: dict[str, float] = {}          # kWh za poslední interval per entita
 
         # zdroje
+        self._cfg = cfg
+        self._hub: DomainHub = cfg["hub"]
+        self._graph: DataflowGraph = cfg["graph"]
         self._total = cfg.get("cons_total") or ""
         self._l1 = cfg.get("cons_l1") or ""
         self._l2 = cfg.get("cons_l2") or ""
         self._l3 = cfg.get("cons_l3") or ""
-
-        # okno posledních 60 minut – per entita
-        self._energy_samples_by_ent: dict[str, deque[tuple[datetime, float]]] = defaultdict(deque)
-        self._power_samples_by_ent: dict[str, deque[tuple[datetime, float]]] = defaultdict(deque)
+        self._unsub_sources = None
+        self._units: dict[str, _SourceUnit] = {}
+        self._configure_units()
+
+        # délka okna = zúčtovací interval (60 / 15 min)
+        self._window = timedelta(minutes=cfg.get("interval") or DEFAULT_SETTLEMENT_INTERVAL)
+        self._window_s = self._window.total_seconds()
+
+        # příspěvky entit k oknu (kWh) a jejich průběžné součty – událost mění jen svou entitu
+        self._energy_kwh: dict[str, float] = {}
+        self._power_kwh: dict[str, float] = {}
+        self._energy_sum = 0.0
+        self._power_sum = 0.0
+        self._last_sweep = 0.0
+
+        # okno posledního intervalu – per entita (průběžně integrované)
+        self._energy_samples_by_ent: dict[str, EnergyWindow] = defaultdict(EnergyWindow)
+        self._compression = _compression_params(entry, self._window)
+        # výkon: lichoběžník mezi vzorky, nebo držení poslední hodnoty (ZOH)
+        mode, self._hold_step = cfg.get("integration") or (DEFAULT_POWER_INTEGRATION, DEFAULT_HOLD_STEP)
+        self._hold = mode == POWER_INTEGRATION_HOLD
+        self._power_samples_by_ent: dict[str, PowerWindow | HoldWindow] = defaultdict(self._new_power_window)
         self._unsubs: list[callable] = []
 
+        # režim statistik: entity se statistikami čte recorder po 5 min, ostatní jdou živými událostmi
+        self._statistics: ShortTermStatistics | None = (
+            ShortTermStatistics(hass) if cfg.get("consumption_source") == CONSUMPTION_SOURCE_STATISTICS else None
+        )
+        self._stats_ids: dict[str, str] = {}                # entita → "energy" / "power"
+
+        # vzorky jdou do okna hned, zápis stavu se slučuje
+        self._entry_stats: EntryStats = cfg["stats"]
+        self._stats = self._entry_stats.sensor("consumption")
+        self._writer = _make_coalescer(hass, entry, self, self._stats)
+
+        # okna přežijí restart (binární snímek v .storage)
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY_WINDOWS.format(entry.entry_id))
+        self._unsub_stop = None
+
     @property
     def unique_id(self) -> str:
         return self._unique_id
@@ -206,109 +277,349 @@ class HourlyConsumptionSensor(SensorEntity):
     def _now(self) -> datetime:
         return datetime.now(timezone.utc)
 
+    def _new_power_window(self) -> PowerWindow | HoldWindow:
+        if self._hold:
+            return HoldWindow(self._window.total_seconds(), self._hold_step)
+        return PowerWindow(*self._compression)
+
     def _trim(self):
-        cutoff = self._now() - timedelta(hours=1)
-        for dq in self._energy_samples_by_ent.values():
-            while dq and dq[0][0] < cutoff:
-                dq.popleft()
-        for dq in self._power_samples_by_ent.values():
-            while dq and dq[0][0] < cutoff:
-                dq.popleft()
-
-    def _sample_energy_for_ent(self, ent_id: str) -> None:
-        st = self.hass.states.get(ent_id)
-        val = _energy_to_kwh(st)
-        if val is not None:
-            self._energy_samples_by_ent[ent_id].append((self._now(), val))
-
-    def _sample_power_for_ent(self, ent_id: str) -> None:
-        st = self.hass.states.get(ent_id)
-        val = _power_to_kw(st)
-        if val is not None:
-            self._power_samples_by_ent[ent_id].append((self._now(), val))
+        cutoff = (self._now() - self._window).timestamp()
+        for win in self._energy_samples_by_ent.values():
+            win.trim(cutoff)
+        # HoldWindow tu zároveň dosčítá drženou hodnotu až do „teď“
+        for win in self._power_samples_by_ent.values():
+            win.trim(cutoff)
+
+    def _configure_units(self) -> None:
+        """Převodníky jednotek pro nakonfigurované entity (stávající se ponechají)."""
+        units: dict[str, _SourceUnit] = {}
+        if self._total:
+            units[self._total] = self._units.get(self._total) or _SourceUnit(allow_power=False)
+        for ent in (self._l1, self._l2, self._l3):
+            if ent and ent not in units:
+                units[ent] = self._units.get(ent) or _SourceUnit(allow_power=True)
+        self._units = units
+
+    def _add_sample(self, ent_id: str, state: State | None, ts: float) -> str | None:
+        """Vzorek ze stavu do okna entity; vrací režim ("energy" / "power") nebo None."""
+        unit = self._units.get(ent_id)
+        if unit is None:
+            return None
+        val = unit.parse(state)
+        if val is None:
+            return None
+        if unit.kind == "energy":
+            self._energy_samples_by_ent[ent_id].add(ts, val)
+        else:
+            self._power_samples_by_ent[ent_id].add(ts, val)
+        return unit.kind
 
     @callback
-    def _on_source_change(self, _event):
-        self._recompute()
-        self.async_write_ha_state()
-
-    def _delta_1h_energy(self) -> tuple[float, dict[str, float]]:
-        total = 0.0
-        per_ent: dict[str, float] = {}
-        for ent_id, dq in self._energy_samples_by_ent.items():
-            if len(dq) >= 2:
-                first = dq[0][1]
-                last = dq[-1][1]
-                d = max(0.0, last - first)
-                per_ent[ent_id] = d
-                total += d
-        return total, per_ent
-
-    def _integrate_1h_power(self) -> tuple[float, dict[str, float]]:
+    def _on_source_change(self, event):
+        if event is None:
+            self._recompute()
+        else:
+            t0 = perf_counter_ns()
+            data = event.data
+            ent_id = data.get("entity_id")
+            self._entry_stats.event(ent_id)
+            self._ingest(ent_id, data.get("new_state"))
+            self._stats.add(perf_counter_ns() - t0)
+        # zápis stavu i přepočet nákladů jen při změně hodnoty (sink uzlu „consumption“)
+        self._graph.invalidate("consumption")
+
+    def live_kwh(self) -> float:
+        """Spotřeba běžícího okna – vstup grafu přepočtů."""
+        return float(self._attr_native_value or 0.0)
+
+    def _ingest(self, ent_id: str, state: State | None) -> None:
+        """Jedna změna stavu: stav z události, jen okno dané entity – bez ohledu na počet fází."""
+        ts = self._now().timestamp()
+        kind = self._add_sample(ent_id, state, ts)
+        if ts - self._last_sweep >= _SWEEP_INTERVAL:
+            # okna ostatních entit se dořezávají v intervalu, ne při každé události
+            self._refresh()
+            return
+        if kind is None:
+            return
+        cutoff = ts - self._window_s
+        if kind == "energy":
+            win = self._energy_samples_by_ent[ent_id]
+            win.trim(cutoff)
+            new = win.kwh if len(win) >= 2 else 0.0
+            self._energy_sum += new - self._energy_kwh.get(ent_id, 0.0)
+            self._energy_kwh[ent_id] = new
+        else:
+            win = self._power_samples_by_ent[ent_id]
+            win.trim(cutoff)
+            new = win.kwh if len(win) >= 2 else 0.0
+            self._power_sum += new - self._power_kwh.get(ent_id, 0.0)
+            self._power_kwh[ent_id] = new
+        self._set_value()
+
+    def settle_kwh(self) -> float:
+        """Spotřeba okna pro uzavření intervalu – bez přidání vzorků; stav se publikuje vždy."""
+        self._refresh()
+        self._writer.flush(self._attr_native_value)
+        return float(self._attr_native_value or 0.0)
+
+    @staticmethod
+    def _window_kwh(windows: dict) -> tuple[float, dict[str, float]]:
+        # O(1) na entitu – integrál / rozdíl se drží průběžně v okně
         total = 0.0
         per_ent: dict[str, float] = {}
-        for ent_id, dq in self._power_samples_by_ent.items():
-            if len(dq) < 2:
-                continue
-            acc = 0.0
-            prev_t, prev_p = dq[0]
-            for t, p in list(dq)[1:]:
-                dt_h = (t - prev_t).total_seconds() / 3600.0
-                acc += (prev_p + p) * 0.5 * dt_h
-                prev_t, prev_p = t, p
-            acc = max(0.0, acc)
-            per_ent[ent_id] = acc
-            total += acc
+        for ent_id, win in windows.items():
+            if len(win) >= 2:
+                kwh = per_ent[ent_id] = win.kwh
+                total += kwh
         return total, per_ent
 
     def _recompute(self):
-        # 1) přidej nové vzorky (total nebo fáze)
-        if self._total:
-            self._sample_energy_for_ent(self._total)
-        for ent in (self._l1, self._l2, self._l3):
-            if not ent:
-                continue
-            # Zkus nejdřív ENERGY; pokud není, dej POWER
-            if _energy_to_kwh(self.hass.states.get(ent)) is not None:
-                self._sample_energy_for_ent(ent)
-            elif _power_to_kw(self.hass.states.get(ent)) is not None:
-                self._sample_power_for_ent(ent)
-
-        # 2) ořízni okna na poslední hodinu
+        t0 = perf_counter_ns()
+        self._sample_sources()
+        self._refresh()
+        self._stats.add(perf_counter_ns() - t0)
+
+    def _sample_sources(self) -> None:
+        # vzorek aktuálního stavu všech zdrojů (start, změna nastavení)
+        ts = self._now().timestamp()
+        for ent_id in self._units:
+            if ent_id not in self._stats_ids:
+                self._add_sample(ent_id, self.hass.states.get(ent_id), ts)
+
+    def _refresh(self) -> None:
+        # ořízni všechna okna na poslední interval a přepočti součty načisto
         self._trim()
-
-        # 3) výsledná 1h spotřeba
-        val_energy, per_energy = self._delta_1h_energy()
-        if val_energy > 0:
+        self._last_sweep = self._now().timestamp()
+        self._energy_sum, self._energy_kwh = self._window_kwh(self._energy_samples_by_ent)
+        self._power_sum, self._power_kwh = self._window_kwh(self._power_samples_by_ent)
+        if self._stats_ids:
+            self._add_statistics()
+        self._set_value()
+
+    def _add_statistics(self) -> None:
+        """Příspěvky entit čtených z recorderu: 5min statistiky + živý stav pro nespočtený zbytek.
+
+        Počítá se jen na ticku statistik a při uzavření intervalu – entity ze
+        statistik neodebírají události. Výkon platí od `last_changed` stavu;
+        mezeru mezi koncem statistik a poslední změnou pokryje průměr poslední
+        spočtené periody.
+        """
+        now = self._now().timestamp()
+        # okno zarovnané na periodu statistik (při uzavření v :mm:05 = začátek intervalu)
+        cutoff = floor_period(now - self._window_s)
+        for ent_id, kind in self._stats_ids.items():
+            kwh, until, base = self._statistics.covered(ent_id, cutoff)
+            state = self.hass.states.get(ent_id)
+            live = self._units[ent_id].parse(state)
+            if live is not None:
+                if kind == "power":
+                    changed = min(now, max(until, state.last_changed.timestamp()))
+                    held = base if base is not None else live
+                    kwh += (held * (changed - until) + live * (now - changed)) / 3600.0
+                elif base is not None:
+                    kwh += max(0.0, live - base)
+            if kind == "energy":
+                self._energy_kwh[ent_id] = kwh
+                self._energy_sum += kwh
+            else:
+                self._power_kwh[ent_id] = kwh
+                self._power_sum += kwh
+
+    def _set_value(self) -> None:
+        # výsledná spotřeba intervalu – energie má přednost před integrací výkonu
+        if self._energy_sum > 0:
             self._dbg_mode = "energy"
-            self._dbg_breakdown = per_energy
-            val = val_energy
+            self._dbg_breakdown = self._energy_kwh
+            val = self._energy_sum
         else:
-            val_power, per_power = self._integrate_1h_power()
             self._dbg_mode = "power"
-            self._dbg_breakdown = per_power
-            val = val_power
-
-        self._attr_native_value = round(val, 6)
+            self._dbg_breakdown = self._power_kwh
+            val = self._power_sum
+        self._attr_native_value = round(max(0.0, val), 6)
+
+    def memory_report(self) -> dict[str, dict[str, int]]:
+        """Počet vzorků a obsazená paměť oken per entita."""
+        report: dict[str, dict[str, int]] = {}
+        for kind, windows in (("energy", self._energy_samples_by_ent), ("power", self._power_samples_by_ent)):
+            for ent_id, win in windows.items():
+                report[ent_id] = {"kind": kind, "samples": len(win), "bytes": win.nbytes}
+        return report
 
     # Export debug dat pro cenový senzor
     def get_debug_data(self) -> dict:
         return {
             "mode": self._dbg_mode,
+            "interval_minutes": int(self._window.total_seconds() // 60),
+            "power_integration": f"hold/{self._hold_step}s" if self._hold else "trapezoid",
             "total_kwh": float(self._attr_native_value or 0.0),
             "per_entity_kwh": dict(self._dbg_breakdown),
+            "memory": self.memory_report(),
+            "statistics": {
+                "entities": dict(self._stats_ids),
+                "queries": self._statistics.queries,
+                "fetched_at": self._statistics.fetched_at,
+            } if self._statistics is not None else None,
         }
 
-    async def async_added_to_hass(self) -> None:
-        self._recompute()
+    def _subscribe_sources(self) -> None:
+        if self._unsub_sources:
+            self._unsub_sources()
+            self._unsub_sources = None
         ents = [e for e in [self._total, self._l1, self._l2, self._l3] if e]
+        if self._statistics is not None:
+            self._stats_ids = self._statistics_entities()
+            ents = [e for e in ents if e not in self._stats_ids]
+            # obnovená živá okna těchto entit by se započetla podruhé
+            for windows in (self._energy_samples_by_ent, self._power_samples_by_ent):
+                for ent_id in [e for e in windows if e in self._stats_ids]:
+                    del windows[ent_id]
         if ents:
-            self._unsubs.append(async_track_state_change_event(self.hass, ents, self._on_source_change))
+            self._unsub_sources = self._hub.async_track_entities(ents, self._on_source_change)
+
+    def _statistics_entities(self) -> dict[str, str]:
+        """Entity, které lze číst z krátkodobých statistik (jinak zůstávají na živých událostech)."""
+        out: dict[str, str] = {}
+        for ent_id, unit in self._units.items():
+            state = self.hass.states.get(ent_id)
+            if unit.parse(state) is not None and has_statistics(self.hass, state):
+                out[ent_id] = unit.kind
+        return out
+
+    @callback
+    def _on_statistics_tick(self, _now=None) -> None:
+        if self._stats_ids:
+            self.hass.async_create_task(self._async_update_statistics())
+
+    async def _async_update_statistics(self) -> None:
+        since = self._now().timestamp() - self._window_s
+        if not await self._statistics.async_fetch(self._stats_ids, since):
+            # recorder nejede – do reloadu zpět na živé události
+            LOGGER.warning("Spotřeba %s: statistiky nedostupné, přecházím na živé události", self._entry.entry_id)
+            self._statistics = None
+            self._stats_ids = {}
+            self._subscribe_sources()
+            self._recompute()
+        else:
+            self._refresh()
+        self._graph.invalidate("consumption")
+
+    @callback
+    def _on_options_updated(self, changed: set[str]) -> None:
+        if "publish" in changed:
+            self._writer.configure(*_publish_params(self._entry))
+        if "compression" in changed:
+            self._compression = _compression_params(self._entry, self._window)
+            for win in self._power_samples_by_ent.values():
+                if isinstance(win, PowerWindow):
+                    win.configure(*self._compression)
+        if "consumption" not in changed:
+            return
+        cfg = self._cfg
+        self._total = cfg.get("cons_total") or ""
+        self._l1 = cfg.get("cons_l1") or ""
+        self._l2 = cfg.get("cons_l2") or ""
+        self._l3 = cfg.get("cons_l3") or ""
+        self._configure_units()
+        # okna entit, které zůstaly, se zachovají; vyřazené zahoď
+        keep = {self._total, self._l1, self._l2, self._l3}
+        for windows in (self._energy_samples_by_ent, self._power_samples_by_ent):
+            for ent_id in [e for e in windows if e not in keep]:
+                del windows[ent_id]
+        self._subscribe_sources()
+        self._recompute()
+        self._writer.flush(self._attr_native_value)
+        self._graph.invalidate("consumption")
+
+    # --- perzistence oken ---
+    def _windows_snapshot(self) -> dict:
+        """Kompaktní snímek oken: surová pole array('d') v base64."""
+        def encode(windows) -> dict:
+            out = {}
+            for ent_id, win in windows.items():
+                if len(win):
+                    ts, val = win.dump()
+                    out[ent_id] = {"ts": b64encode(ts).decode("ascii"), "val": b64encode(val).decode("ascii")}
+            return out
+
+        return {
+            "byteorder": sys.byteorder,
+            "energy": encode(self._energy_samples_by_ent),
+            # jiný formát snímku → jiný klíč; při změně režimu se okno výkonu nepřevádí
+            "hold" if self._hold else "power": encode(self._power_samples_by_ent),
+        }
+
+    async def _async_restore_windows(self) -> None:
+        try:
+            data = await self._store.async_load()
+        except Exception:
+            LOGGER.warning("Nelze načíst uložená okna spotřeby", exc_info=True)
+            return
+        if not data:
+            return
+        byteorder = data.get("byteorder", sys.byteorder)
+        cutoff = (self._now() - self._window).timestamp()
+        configured = {self._total, self._l1, self._l2, self._l3} - {""}
+        if self._hold:
+            power_key = "hold"
+            power_load = partial(HoldWindow.load, span=self._window.total_seconds(), step=self._hold_step)
+        else:
+            power_key, power_load = "power", PowerWindow.load
+        for key, windows, load in (
+            ("energy", self._energy_samples_by_ent, EnergyWindow.load),
+            (power_key, self._power_samples_by_ent, power_load),
+        ):
+            for ent_id, raw in (data.get(key) or {}).items():
+                if ent_id not in configured:
+                    continue
+                try:
+                    win = load(b64decode(raw["ts"]), b64decode(raw["val"]), byteorder, cutoff)
+                except Exception:
+                    LOGGER.debug("Vadný snímek okna %s", ent_id, exc_info=True)
+                    continue
+                if isinstance(win, PowerWindow):
+                    win.configure(*self._compression)
+                if len(win):
+                    windows[ent_id] = win
+
+    @callback
+    def _schedule_save(self, *_) -> None:
+        self._store.async_delay_save(self._windows_snapshot, 0)
+
+    @callback
+    def _on_hass_stop(self, _event) -> None:
+        self._unsub_stop = None
+        self._schedule_save()
+
+    async def async_added_to_hass(self) -> None:
+        await self._async_restore_windows()
+        self._unsubs.append(self._hub.async_track_interval(WINDOW_SAVE_INTERVAL, self._schedule_save))
+        self._unsub_stop = self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._on_hass_stop)
+        self._subscribe_sources()
+        self._recompute()
+        self._unsubs.append(self._graph.add_sink("consumption", self._writer.request))
+        self._graph.invalidate("consumption")
+        if self._statistics is not None:
+            # jeden dávkový dotaz na všechny entity za 5 min (+ hned po startu)
+            self._unsubs.append(self._hub.async_track_boundary(5, self._on_statistics_tick))
+            self._on_statistics_tick()
+        self._unsubs.append(async_dispatcher_connect(
+            self.hass, SIGNAL_OPTIONS_UPDATED.format(self._entry.entry_id), self._on_options_updated
+        ))
 
     async def async_will_remove_from_hass(self) -> None:
+        if self._unsub_sources:
+            self._unsub_sources()
+            self._unsub_sources = None
+        if self._unsub_stop:
+            self._unsub_stop()
+            self._unsub_stop = None
         for u in self._unsubs:
             u()
         self._unsubs.clear()
+        self._writer.cancel()
+        # reload / odebrání entity – okna ulož hned
+        await self._store.async_save(self._windows_snapshot())
 
 class _DailyTariffEnergySensor(SensorEntity, RestoreEntity):
     """Denní akumulace spotřeby (kWh) dle tarifu (VT/NT). Reset o půlnoci."""
@@ -317,20 +628,23 @@ class _DailyTariffEnergySensor(SensorEntity, RestoreEntity):
     _attr_device_class = SensorDeviceClass.ENERGY
     _attr_state_class = SensorStateClass.TOTAL  # v rámci dne roste, o půlnoci reset
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cons_sensor: "HourlyConsumptionSensor", hdo_switch: str | None, want_nt: bool) -> None:
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cons_sensor: "HourlyConsumptionSensor", hdo_switch: str | None, want_nt: bool, settlement: IntervalSettlement) -> None:
         self.hass = hass
         self._entry = entry
         self._cons = cons_sensor
         self._hdo_switch = hdo_switch
         self._want_nt = want_nt  # True=NT, False=VT
+        self._settlement = settlement
 
         tag = "nt" if want_nt else "vt"
         self._attr_unique_id = f"{DOMAIN}_daily_energy_{tag}_{entry.entry_id}"
+        self._stats = settlement.stats.sensor(f"daily_energy_{tag}")
 
         self._unsubs: list[callable] = []
         self._value: float = 0.0
         self._day_key: str | None = None   # "YYYY-MM-DD"
         self._last_closed_total: float | None = None
+        self._applied: IntervalRecord | None = None   # poslední započtený záznam
 
     def _now(self) -> datetime:
         return datetime.now(timezone.utc)
@@ -338,16 +652,6 @@ class _DailyTariffEnergySensor(SensorEntity, RestoreEntity):
     def _cur_day_key(self) -> str:
         return self._now().strftime("%Y-%m-%d")
 
-    def _cons_1h(self) -> float:
-        # DONUCENÍ k přepočtu před čtením
-        recompute = getattr(self._cons, "_recompute", None)
-        if callable(recompute):
-            recompute()
-        try:
-            return float(self._cons.native_value or 0.0)
-        except Exception:
-            return 0.0
-
     async def async_added_to_hass(self) -> None:
         # obnov poslední stav
         last = await self.async_get_last_state()
@@ -361,55 +665,51 @@ class _DailyTariffEnergySensor(SensorEntity, RestoreEntity):
             lct = last.attributes.get("last_closed_total")
             self._last_closed_total = float(lct) if isinstance(lct, (int, float)) else None
 
-        # tick: každou celou hodinu přičti spotřebu, pokud odpovídá tarifu
-        self._unsubs.append(async_track_time_change(self.hass, self._on_hour_tick, minute=0, second=5))
-        # plus malý půlnoční „pojistný“ tick (kdyby HA přes půlnoc nespal)
-        self._unsubs.append(async_track_time_change(self.hass, self._on_midnight_tick, hour=0, minute=0, second=30))
-
         if not self._day_key:
             self._day_key = self._cur_day_key()
-        self.async_write_ha_state()
+
+        # každý uzavřený interval přičti jeho VT/NT část (uzel grafu za záznamem intervalu);
+        # záznam uzavřený před přidáním entity se nezapočítá
+        graph = self._settlement.graph
+        self._applied = graph.value("record")
+        self._unsubs.append(graph.add_node(
+            self._attr_translation_key, self._accumulate, deps=("record",), sink=self._on_value, stats=self._stats,
+        ))
+        graph.propagate()
 
     async def async_will_remove_from_hass(self) -> None:
         for u in self._unsubs:
             u()
         self._unsubs.clear()
 
-    @callback
-    def _on_midnight_tick(self, _now) -> None:
-        # o půlnoci uzavři předchozí den (pokud by _on_hour_tick zrovna neběžel)
-        today = self._cur_day_key()
-        if self._day_key and self._day_key != today:
+    def _roll_day(self, key: str) -> None:
+        if self._day_key and self._day_key != key:
             self._last_closed_total = self._value
             self._value = 0.0
-            self._day_key = today
-            self.async_write_ha_state()
+        self._day_key = key
+
+    def _accumulate(self) -> tuple[float, str | None]:
+        record: IntervalRecord | None = self._settlement.graph.value("record")
+        if record is not None and record is not self._applied:
+            self._applied = record
+            # interval patří do dne, kdy začal; po něm případně rovnou otevři nový den
+            self._roll_day(record.start.strftime("%Y-%m-%d"))
+            add = record.kwh_nt if self._want_nt else record.kwh_vt
+            if add:
+                self._value = round(self._value + add, 6)
+            self._roll_day(record.end.strftime("%Y-%m-%d"))
+
+            LOGGER.debug(
+                "[daily_energy_%s] day=%s interval=%s add=%.6f kWh total=%.6f kWh",
+                "nt" if self._want_nt else "vt",
+                self._day_key, record.start.isoformat(), add, self._value
+            )
+        # VT senzor v NT (a naopak) nic nepřičte – beze změny graf sink nevolá
+        return self._value, self._day_key
 
     @callback
-    def _on_hour_tick(self, _now) -> None:
-        today = self._cur_day_key()
-        if self._day_key and self._day_key != today:
-            self._last_closed_total = self._value
-            self._value = 0.0
-            self._day_key = today
-    
-        is_nt = _is_low_tariff(self.hass, self._hdo_switch)
-        # chceme-li NT a HDO je True => NT
-        # chceme-li VT a HDO je False nebo None => VT (fallback, ať nic nezmizí)
-        use_bucket = (is_nt is True) if self._want_nt else (is_nt is False or is_nt is None)
-    
-        add = self._cons_1h() if use_bucket else 0.0
-        if add:
-            self._value = round(self._value + add, 6)
-    
-        # DEBUG – co se kdy přičetlo a jak HDO rozhodlo
-        LOGGER.debug(
-            "[daily_energy_%s] day=%s HDO=%s use_bucket=%s add=%.6f kWh total=%.6f kWh",
-            "nt" if self._want_nt else "vt",
-            self._day_key, ("NT" if is_nt else ("VT" if is_nt is False else "UNKNOWN")),
-            use_bucket, add, self._value
-        )
-    
+    def _on_value(self, _value: tuple[float, str | None]) -> None:
+        self._stats.writes += 1
         self.async_write_ha_state()
 
     @property
@@ -430,18 +730,18 @@ class _DailyTariffEnergySensor(SensorEntity, RestoreEntity):
 class DailyEnergyVTSensor(_DailyTariffEnergySensor):
     _attr_translation_key = "daily_energy_vt"
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cons_sensor: "HourlyConsumptionSensor", hdo_switch: str | None) -> None:
-        super().__init__(hass, entry, cons_sensor, hdo_switch, want_nt=False)
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cons_sensor: "HourlyConsumptionSensor", hdo_switch: str | None, settlement: IntervalSettlement) -> None:
+        super().__init__(hass, entry, cons_sensor, hdo_switch, want_nt=False, settlement=settlement)
 
 
 class DailyEnergyNTSensor(_DailyTariffEnergySensor):
     _attr_translation_key = "daily_energy_nt"
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cons_sensor: "HourlyConsumptionSensor", hdo_switch: str | None) -> None:
-        super().__init__(hass, entry, cons_sensor, hdo_switch, want_nt=True)
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cons_sensor: "HourlyConsumptionSensor", hdo_switch: str | None, settlement: IntervalSettlement) -> None:
+        super().__init__(hass, entry, cons_sensor, hdo_switch, want_nt=True, settlement=settlement)
 
 # ---------------------------
-# Senzor: cena za poslední hodinu (CZK)
+# Senzor: cena za poslední interval (CZK)
 # ---------------------------
 
 class SpotHourlyCostSensor(SensorEntity):
@@ -450,147 +750,97 @@ class SpotHourlyCostSensor(SensorEntity):
     _attr_native_unit_of_measurement = "CZK"
     _attr_state_class = SensorStateClass.MEASUREMENT
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cfg: dict, cons_sensor: HourlyConsumptionSensor) -> None:
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cfg: dict, cons_sensor: HourlyConsumptionSensor, settlement: IntervalSettlement, prices: SpotPriceSource) -> None:
         self.hass = hass
         self._entry = entry
         self._unique_id = f"{DOMAIN}_spot_cost_1h_{entry.entry_id}"
         self._attr_unique_id = self._unique_id
 
+        self._cfg = cfg
         self._cons_entity = cons_sensor
-        self._price_entity_id = cfg.get("spot_price_sensor") or DEFAULT_SPOT_PRICE_SENSOR
+        self._settlement = settlement
+        self._graph: DataflowGraph = cfg["graph"]
+        self._prices = prices
         self._unsubs: list[callable] = []
+        self._stats = cfg["stats"].sensor("spot_cost")
+        self._writer = _make_coalescer(hass, entry, self, self._stats)
 
         # logování
-        # po přiřazení self._price_entity_id
         LOGGER.debug(
             "Entry options (live) for %s: %s | spot_price_sensor=%s",
-            self.__class__.__name__, dict(entry.options), self._price_entity_id
+            self.__class__.__name__, dict(entry.options), prices.entity_id
         )
 
     @property
     def unique_id(self) -> str:
         return self._unique_id
 
-    def _opt(self, key: str, default: float | None = None) -> float:
-        """Čti aktuální hodnotu z entry.options → entry.data → DEFAULT_MAP."""
-        if default is None:
-            default = DEFAULT_MAP.get(key, 0.0)
-        # 1) aktuální options
-        if key in self._entry.options:
-            try:
-                return float(self._entry.options[key])
-            except Exception:
-                return float(default or 0.0)
-        # 2) původní data z config flow
-        if key in self._entry.data:
-            try:
-                return float(self._entry.data[key])
-            except Exception:
-                return float(default or 0.0)
-        # 3) fallback
-        return float(default or 0.0)
-
-    def _price_kwh(self) -> float:
-        st = self.hass.states.get(self._price_entity_id)
-        if not st or st.state in ("unknown", "unavailable", None, ""):
-            return 0.0
-        try:
-            return float(st.state)
-        except Exception:
-            return 0.0
-
-    def _cons_kwh(self) -> float:
-        val = self._cons_entity.native_value
-        try:
-            return float(val or 0.0)
-        except Exception:
-            return 0.0
-
-    def _recompute(self):
-        # načtení hodnot
-        spot = self._price_kwh()
-        marze = self._opt(CONF_SPOT_MARZE, 0.0)
-        distribuce_vt = self._opt(CONF_DISTRIBUCE_VT, 0.0)
-        distribuce_dan = self._opt(CONF_DISTRIBUCE_DAN, 0.0)
-        distribuce_sluzby = self._opt(CONF_DISTRIBUCE_SLUZBY, 0.0)
-        poze = self._opt(CONF_POZE, 0.0)
-        cons = self._cons_kwh()
-
-        # výpočet
-        unit_kc_per_kwh = (spot + marze) + distribuce_vt + (distribuce_dan + distribuce_sluzby) + poze
-        result_kc = unit_kc_per_kwh * cons
-        self._attr_native_value = round(result_kc, 6)
-
-        # jemný debug při každém přepočtu
-        LOGGER.debug(
-            "[spot_cost_1h] spot=%.6f, marze=%.6f, dist_vt=%.6f, dist_dan=%.6f, dist_sluzby=%.6f, poze=%.6f, cons_1h=%.6f => unit=%.6f Kč/kWh, result=%.6f Kč",
-            spot, marze, distribuce_vt, distribuce_dan, distribuce_sluzby, poze, cons, unit_kc_per_kwh, result_kc
-        )
-
-        # podklady pro hodinový report
-        self._last_debug_payload = {
-            "spot": spot,
-            "marze": marze,
-            "distribuce_vt": distribuce_vt,
-            "distribuce_dan": distribuce_dan,
-            "distribuce_sluzby": distribuce_sluzby,
-            "poze": poze,
-            "cons_1h": cons,
-            "unit": unit_kc_per_kwh,
-            "result": result_kc,
-            "cons_breakdown": getattr(self._cons_entity, "get_debug_data", lambda: {})(),
-        }
-
-    async def async_added_to_hass(self) -> None:
-        # změny spotové ceny
-        self._unsubs.append(
-            async_track_state_change_event(self.hass, [self._price_entity_id], self._on_change)
-        )
-        self._last_debug_payload: dict | None = None
+    @property
+    def _tariff(self) -> Tariff:
+        """Aktuální snímek cen profilu (sestavený při (re)konfiguraci)."""
+        return self._cfg["tariff"]
 
-        # 1× za hodinu (na celé) souhrnný report do logu
-        self._unsubs.append(
-            async_track_time_change(self.hass, self._hourly_report, minute=0, second=5)
-        )
-        self._recompute()
+    def _compute(self) -> float:
+        # jednotková cena (uzel spot_unit) × spotřeba běžícího okna
+        graph = self._graph
+        unit = graph.value("spot_unit")
+        return None if unit is None else round(unit * graph.value("consumption"), 6)
 
     @callback
-    def _on_change(self, *_):
-        self._recompute()
-        self.async_write_ha_state()
+    def _on_value(self, value: float) -> None:
+        self._attr_native_value = value
+        self._writer.request(value)
 
     @callback
-    def _hourly_report(self, now):
-        """Hodinový souhrn do logu: dosazení do vzorce + výsledek."""
-        self._recompute()
-        payload = self._last_debug_payload or {}
-
-        spot = payload.get("spot", 0.0)
-        marze = payload.get("marze", 0.0)
-        dv = payload.get("distribuce_vt", 0.0)
-        dd = payload.get("distribuce_dan", 0.0)
-        ds = payload.get("distribuce_sluzby", 0.0)
-        poze = payload.get("poze", 0.0)
-        cons = payload.get("cons_1h", 0.0)
-        unit = payload.get("unit", 0.0)
-        result = payload.get("result", 0.0)
-        cons_dbg = payload.get("cons_breakdown", {})
+    def _on_options_updated(self, changed: set[str]) -> None:
+        # tarif a cenový senzor řeší graf přepočtů
+        if "publish" in changed:
+            self._writer.configure(*_publish_params(self._entry))
 
-        formula = f"(({spot:.6f}+{marze:.6f}) + {dv:.6f} + ({dd:.6f}+{ds:.6f}) + {poze:.6f}) * {cons:.6f} = {result:.6f} Kč"
+    async def async_added_to_hass(self) -> None:
+        # přepočet při změně spotřeby, ceny i tarifu (uzel grafu; zápis na konci průchodu)
+        self._unsubs.append(self._graph.add_node(
+            "spot_cost", self._compute, deps=("consumption", "spot_unit"), sink=self._on_value, stats=self._stats,
+        ))
+        self._unsubs.append(async_dispatcher_connect(
+            self.hass, SIGNAL_OPTIONS_UPDATED.format(self._entry.entry_id), self._on_options_updated
+        ))
+
+        # po uzavření každého intervalu hodnota ze záznamu + souhrnný report do logu
+        self._unsubs.append(self._settlement.async_add_listener(self._on_settled))
+        self._graph.propagate()
 
-        LOGGER.debug(
-            "[spot_cost_1h][%s] VZOREC: %s | jednotkova_cena=%.6f Kč/kWh | spotreba_1h=%.6f kWh | rozpad_spotreby=%s",
-            now.isoformat(), formula, unit, cons, cons_dbg,
-        )
+    @callback
+    def _on_settled(self, record: IntervalRecord) -> None:
+        """Souhrn intervalu: hodnota uzavřeného intervalu + dosazení do vzorce do logu."""
+        if record.spot_missing:
+            # bez ceny intervalu není co ukázat; akumulátory přičtou 0
+            self._attr_native_value = None
+            self._writer.flush(self._attr_native_value)
+            return
+        self._attr_native_value = record.spot_cost
+        self._writer.flush(self._attr_native_value)
+
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            t = self._tariff
+            formula = (
+                f"(({record.spot_price:.6f}+{t.spot_marze:.6f}) + {t.distribuce_vt:.6f} + "
+                f"({t.distribuce_dan:.6f}+{t.distribuce_sluzby:.6f}) + {t.poze:.6f}) * {record.kwh:.6f} = {record.spot_cost:.6f} Kč"
+            )
+            LOGGER.debug(
+                "[spot_cost][%s] VZOREC: %s | jednotkova_cena=%.6f Kč/kWh | spotreba=%.6f kWh | rozpad_spotreby=%s",
+                record.end.isoformat(), formula, record.spot_unit, record.kwh, self._cons_entity.get_debug_data(),
+            )
         LOGGER.info(
-            "[spot_cost_1h][%s] Cena za posledni hodinu: %.6f Kč (unit=%.6f Kč/kWh, spotreba=%.6f kWh)",
-            now.isoformat(), result, unit, cons
+            "[spot_cost][%s] Cena za posledni interval: %.6f Kč (unit=%.6f Kč/kWh, spotreba=%.6f kWh)",
+            record.end.isoformat(), record.spot_cost, record.spot_unit, record.kwh
         )
 
     async def async_will_remove_from_hass(self) -> None:
-        for u in self._unsubs:
+        for u in reversed(self._unsubs):
             u()
         self._unsubs.clear()
+        self._writer.cancel()
 
 class FixHourlyCostSensor(SensorEntity):
     _attr_translation_key = "fix_cost_hourly"
@@ -598,16 +848,20 @@ class FixHourlyCostSensor(SensorEntity):
     _attr_native_unit_of_measurement = "CZK"
     _attr_state_class = SensorStateClass.MEASUREMENT
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cfg: dict, cons_sensor: HourlyConsumptionSensor) -> None:
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cfg: dict, cons_sensor: HourlyConsumptionSensor, settlement: IntervalSettlement) -> None:
         self.hass = hass
         self._entry = entry
         self._attr_unique_id = f"{DOMAIN}_fix_cost_1h_{entry.entry_id}"
 
+        self._cfg = cfg
         self._cons_entity = cons_sensor
+        self._settlement = settlement
+        self._graph: DataflowGraph = cfg["graph"]
         self._hdo_switch = cfg.get("source_entity_id")  # HDO přepínač
 
         self._unsubs: list[callable] = []
-        self._last_debug_payload: dict | None = None
+        self._stats = cfg["stats"].sensor("fix_cost")
+        self._writer = _make_coalescer(hass, entry, self, self._stats)
 
         # DEBUG
         LOGGER.debug(
@@ -615,186 +869,106 @@ class FixHourlyCostSensor(SensorEntity):
             self.__class__.__name__, dict(entry.options), self._hdo_switch
         )
 
-    def _opt(self, key: str, default: float | None = None) -> float:
-        """Čti aktuální hodnotu z entry.options → entry.data → DEFAULT_MAP."""
-        if default is None:
-            default = DEFAULT_MAP.get(key, 0.0)
-
-        # 1) aktuální options
-        if key in self._entry.options:
-            try:
-                return float(self._entry.options[key])
-            except Exception:
-                LOGGER.debug(
-                    "Chyba v získání ceny - krok 1 - aktuální options",
-                    exc_info=True,
-                )
-                return float(default or 0.0)
-
-        # 2) původní data z config flow
-        if key in self._entry.data:
-            try:
-                return float(self._entry.data[key])
-            except Exception:
-                LOGGER.debug(
-                    "Chyba v získání ceny - krok 2 - původní data z config flow",
-                    exc_info=True,
-                )
-                return float(default or 0.0)
-
-        # 3) fallback
-        LOGGER.debug("Chyba v získání ceny - krok 3 - fallback")
-        return float(default or 0.0)
-
-    def _cons_kwh(self) -> float:
-        try:
-            return float(self._cons_entity.native_value or 0.0)
-        except Exception:
-            return 0.0
-
-    def _hourly_fixed_share(self) -> float:
-        """Rozpočítaná měsíční paušální částka na 1 hodinu aktuálního měsíce."""
-        now = datetime.now(timezone.utc)
-        hours = _hours_in_current_month(now)
-        total_monthly = (
-            self._opt(CONF_FIX_STALA_PLATBA, 0.0)
-            + self._opt(CONF_FIX_ZA_JISTIC, 0.0)
-            + self._opt(CONF_FIX_PROVOZ_INFRASTRUKTURY, 0.0)
-        )
-        return total_monthly / hours if hours > 0 else 0.0
-
-    def _unit_price_kc_per_kwh(self) -> tuple[float, dict]:
-        """Jednotková cena za kWh dle aktuálního tarifu (bez paušálů). Vrací (unit_price, debug dict)."""
-        is_nt = _is_low_tariff(self.hass, self._hdo_switch)
-        # bezpečný default – když nevíme, použij VT
-        use_nt = (is_nt is True)
-
-        if use_nt:
-            energy = self._opt(CONF_FIX_OBCHODNI_CENA_NT, 0.0)
-            distrib = self._opt(CONF_DISTRIBUCE_NT, 0.0)
-            tarif = "NT"
-        else:
-            energy = self._opt(CONF_FIX_OBCHODNI_CENA_VT, 0.0)
-            distrib = self._opt(CONF_DISTRIBUCE_VT, 0.0)
-            tarif = "VT"
-
-        distrib_common = self._opt(CONF_DISTRIBUCE_DAN, 0.0) + self._opt(CONF_DISTRIBUCE_SLUZBY, 0.0)
-        poze = self._opt(CONF_POZE, 0.0)
-
-        unit = energy + distrib + distrib_common + poze
-
-        dbg = {
-            "tarif": tarif if is_nt is not None else "VT (fallback, HDO neznámé)",
-            "fix_energy": energy,
-            "distrib_tarif": distrib,
-            "distrib_common": distrib_common,
-            "poze": poze,
-        }
-        return unit, dbg
-
-    def _recompute(self):
-        cons = self._cons_kwh()
-        unit, dbg = self._unit_price_kc_per_kwh()
-        hourly_fixed = self._hourly_fixed_share()
-
-        result_kc = unit * cons + hourly_fixed
-        self._attr_native_value = round(result_kc, 6)
+    @property
+    def _tariff(self) -> Tariff:
+        """Aktuální snímek cen profilu (sestavený při (re)konfiguraci)."""
+        return self._cfg["tariff"]
 
-        # DEBUG detail
-        LOGGER.debug(
-            "[fix_cost_1h] unit=%.6f Kč/kWh (tarif=%s, energy=%.6f, dist_t=%.6f, dist_c=%.6f, poze=%.6f); "
-            "cons_1h=%.6f kWh; hourly_fixed=%.6f Kč => result=%.6f Kč",
-            unit,
-            dbg["tarif"],
-            dbg["fix_energy"], dbg["distrib_tarif"], dbg["distrib_common"], dbg["poze"],
-            cons, hourly_fixed, result_kc,
-        )
+    def _compute(self) -> float:
+        # jednotková cena dle HDO (uzel fix_unit) × spotřeba + paušál rozpočítaný na interval
+        graph = self._graph
+        interval_fixed = graph.value("tariff").fix_interval_fee(datetime.now(timezone.utc), self._settlement.minutes)
+        return round(graph.value("fix_unit") * graph.value("consumption") + interval_fixed, 6)
 
-        self._last_debug_payload = {
-            "unit": unit,
-            "tarif": dbg["tarif"],
-            "fix_energy": dbg["fix_energy"],
-            "distrib_tarif": dbg["distrib_tarif"],
-            "distrib_common": dbg["distrib_common"],
-            "poze": dbg["poze"],
-            "cons_1h": cons,
-            "hourly_fixed": hourly_fixed,
-            "result": result_kc,
-        }
+    @callback
+    def _on_value(self, value: float) -> None:
+        self._attr_native_value = value
+        self._writer.request(value)
 
     async def async_added_to_hass(self) -> None:
-        # přepočítej při změně HDO přepínače i kdykoli přeteče hodina (kvůli paušálům)
-        if self._hdo_switch:
-            self._unsubs.append(
-                async_track_state_change_event(self.hass, [self._hdo_switch], self._on_change)
-            )
-        # každou celou hodinu proveď přepočet a zapíš „report“
-        self._unsubs.append(async_track_time_change(self.hass, self._hourly_report, minute=0, second=7))
-        self._recompute()
+        # přepočet při změně spotřeby, HDO i tarifu (uzel grafu; zápis na konci průchodu)
+        self._unsubs.append(self._graph.add_node(
+            "fix_cost", self._compute, deps=("consumption", "fix_unit", "tariff"), sink=self._on_value, stats=self._stats,
+        ))
+        # každý uzavřený interval převezmi jeho cenu a zapiš „report“
+        self._unsubs.append(self._settlement.async_add_listener(self._on_settled))
+        self._unsubs.append(async_dispatcher_connect(
+            self.hass, SIGNAL_OPTIONS_UPDATED.format(self._entry.entry_id), self._on_options_updated
+        ))
+        self._graph.propagate()
 
     @callback
-    def _on_change(self, *_):
-        self._recompute()
-        self.async_write_ha_state()
+    def _on_options_updated(self, changed: set[str]) -> None:
+        # tarif řeší graf přepočtů
+        if "publish" in changed:
+            self._writer.configure(*_publish_params(self._entry))
 
     @callback
-    def _hourly_report(self, now):
-        self._recompute()
-        p = self._last_debug_payload or {}
-        unit = p.get("unit", 0.0)
-        cons = p.get("cons_1h", 0.0)
-        hf = p.get("hourly_fixed", 0.0)
-        res = p.get("result", 0.0)
-        tarif = p.get("tarif", "?")
-        fe = p.get("fix_energy", 0.0)
-        dt = p.get("distrib_tarif", 0.0)
-        dc = p.get("distrib_common", 0.0)
-        poze = p.get("poze", 0.0)
-
-        formula = f"([{tarif}] ({fe:.6f}+{dt:.6f}+{dc:.6f}+{poze:.6f}) * {cons:.6f}) + hourly_fixed({hf:.6f}) = {res:.6f} Kč"
-        LOGGER.debug("[fix_cost_1h][%s] VZOREC: %s | unit=%.6f Kč/kWh | cons=%.6f kWh | hourly_fixed=%.6f Kč",
-                     now.isoformat(), formula, unit, cons, hf)
-        LOGGER.info("[fix_cost_1h][%s] Cena za posledni hodinu (fix): %.6f Kč (unit=%.6f, cons=%.6f kWh, paušál/h=%.6f)",
-                    now.isoformat(), res, unit, cons, hf)
+    def _on_settled(self, record: IntervalRecord) -> None:
+        self._attr_native_value = record.fix_cost
+        self._writer.flush(self._attr_native_value)
+
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            t = self._tariff
+            formula = (
+                f"([VT] {record.kwh_vt:.6f} * {t.fix_unit_vt:.6f} + [NT] {record.kwh_nt:.6f} * {t.fix_unit_nt:.6f})"
+                f" + interval_fixed({record.fix_fee:.6f}) = {record.fix_cost:.6f} Kč"
+            )
+            LOGGER.debug("[fix_cost][%s] VZOREC: %s | unit=%.6f Kč/kWh | cons=%.6f kWh | interval_fixed=%.6f Kč",
+                         record.end.isoformat(), formula, record.fix_unit, record.kwh, record.fix_fee)
+        LOGGER.info("[fix_cost][%s] Cena za posledni interval (fix): %.6f Kč (unit=%.6f, cons=%.6f kWh, paušál/interval=%.6f)",
+                    record.end.isoformat(), record.fix_cost, record.fix_unit, record.kwh, record.fix_fee)
+
+    async def async_will_remove_from_hass(self) -> None:
+        for u in reversed(self._unsubs):
+            u()
+        self._unsubs.clear()
+        self._writer.cancel()
 
 class _BaseAccumCostSensor(SensorEntity, RestoreEntity):
-    """Základ pro denní/měsíční akumulaci hodinové ceny."""
+    """Základ pro denní/měsíční akumulaci ceny uzavřených intervalů."""
 
     _attr_device_class = SensorDeviceClass.MONETARY
     _attr_native_unit_of_measurement = "CZK"
     _attr_state_class = SensorStateClass.TOTAL  # v rámci období roste, na hranici období se vynuluje
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cost_sensor: "SpotHourlyCostSensor", period: str) -> None:
+    # pole IntervalRecord, které se sčítá ("spot_cost" / "fix_cost")
+    _record_field: str
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement, period: str, node: str | None = None) -> None:
         assert period in ("day", "month")
         self.hass = hass
         self._entry = entry
-        self._cost_sensor = cost_sensor
+        self._settlement = settlement
         self._period = period
         self._unsubs: list[callable] = []
+        # uzel grafu (a jméno v počítadlech) – u nabídek doplněný o slug
+        self._node = node or self._attr_translation_key
+        self._stats = settlement.stats.sensor(self._node)
 
         self._value = 0.0
         self._period_key: str | None = None   # "YYYY-MM-DD" nebo "YYYY-MM"
         self._last_closed_total: float | None = None  # poslední uzavřené období (pro info do atributu)
+        self._applied: IntervalRecord | None = None   # poslední započtený záznam
 
     # --- pomocné ---
     def _now(self) -> datetime:
         return datetime.now(timezone.utc)
 
-    def _current_key(self) -> str:
-        now = self._now()
+    def _key_for(self, when: datetime) -> str:
         if self._period == "day":
-            return now.strftime("%Y-%m-%d")
-        return now.strftime("%Y-%m")
-
-    def _get_latest_hour_cost(self) -> float:
-        """Vezmi aktuální hodinovou cenu z cenového senzoru (vždy pro okno, které právě skončilo)."""
-        # přepočítej, ať je čerstvá
-        self._cost_sensor._recompute()  # vědomě voláme interní přepočet
-        val = self._cost_sensor.native_value
-        try:
-            return float(val or 0.0)
-        except Exception:
-            return 0.0
+            return when.strftime("%Y-%m-%d")
+        return when.strftime("%Y-%m")
+
+    def _current_key(self) -> str:
+        return self._key_for(self._now())
+
+    def _roll_period(self, key: str) -> None:
+        # Na hranici období ulož uzavřený součet a vynuluj
+        if self._period_key and key != self._period_key:
+            self._last_closed_total = self._value
+            self._value = 0.0
+        self._period_key = key
 
     # --- HA lifecycle ---
     async def async_added_to_hass(self) -> None:
@@ -810,31 +984,43 @@ class _BaseAccumCostSensor(SensorEntity, RestoreEntity):
             lct = last.attributes.get("last_closed_total")
             self._last_closed_total = float(lct) if isinstance(lct, (int, float)) else None
 
-        # každou hodinu (na celé) přičti hodinovou cenu
-        self._unsubs.append(async_track_time_change(self.hass, self._on_hour_tick, minute=0, second=10))
-
         # na startu inicializuj period key
         if not self._period_key:
             self._period_key = self._current_key()
-        self.async_write_ha_state()
+
+        # každý uzavřený interval přičti jeho cenu (uzel grafu za záznamem intervalu);
+        # záznam uzavřený před přidáním entity se nezapočítá
+        graph = self._settlement.graph
+        self._applied = graph.value("record")
+        self._unsubs.append(graph.add_node(
+            self._node, self._accumulate, deps=("record",), sink=self._on_value, stats=self._stats,
+        ))
+        graph.propagate()
 
     async def async_will_remove_from_hass(self) -> None:
         for u in self._unsubs:
             u()
         self._unsubs.clear()
 
-    @callback
-    def _on_hour_tick(self, _now) -> None:
-        cur_key = self._current_key()
-        # Na hranici období ulož uzavřený součet a vynuluj
-        if self._period_key and cur_key != self._period_key:
-            # uzavíráme minulé období
-            self._last_closed_total = self._value
-            self._value = 0.0
-            self._period_key = cur_key
+    def _accumulate(self) -> tuple[float, str | None]:
+        record: IntervalRecord | None = self._settlement.graph.value("record")
+        if record is not None and record is not self._applied:
+            self._applied = record
+            # interval patří do období, kdy začal; po něm případně rovnou otevři nové
+            self._roll_period(self._key_for(record.start))
+            add = self._record_value(record)
+            if add:
+                self._value = round(self._value + add, 6)
+            self._roll_period(self._key_for(record.end))
+        # nulový interval (spot bez odběru) nemění stav – graf sink nevolá, zápis se vynechá
+        return self._value, self._period_key
+
+    def _record_value(self, record: IntervalRecord) -> float:
+        return getattr(record, self._record_field)
 
-        # Přičti cenu za předchozí hodinu
-        self._value = round(self._value + self._get_latest_hour_cost(), 6)
+    @callback
+    def _on_value(self, _value: tuple[float, str | None]) -> None:
+        self._stats.writes += 1
         self.async_write_ha_state()
 
     # --- hodnoty/atributy ---
@@ -854,31 +1040,284 @@ class _BaseAccumCostSensor(SensorEntity, RestoreEntity):
 class DailySpotCostSensor(_BaseAccumCostSensor):
     _attr_translation_key = "spot_cost_daily"
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cost_sensor: "SpotHourlyCostSensor") -> None:
-        super().__init__(hass, entry, cost_sensor, period="day")
+    _record_field = "spot_cost"
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement) -> None:
+        super().__init__(hass, entry, settlement, period="day")
         self._attr_unique_id = f"{DOMAIN}_spot_cost_den_{entry.entry_id}"
 
 class DailyFixCostSensor(_BaseAccumCostSensor):
     _attr_translation_key = "fix_cost_daily"
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cost_sensor: "FixHourlyCostSensor") -> None:
-        super().__init__(hass, entry, cost_sensor, period="day")
+    _record_field = "fix_cost"
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement) -> None:
+        super().__init__(hass, entry, settlement, period="day")
         self._attr_unique_id = f"{DOMAIN}_fix_cost_den_{entry.entry_id}"
 
 class MonthlySpotCostSensor(_BaseAccumCostSensor):
     _attr_translation_key = "spot_cost_monthly"
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cost_sensor: "SpotHourlyCostSensor") -> None:
-        super().__init__(hass, entry, cost_sensor, period="month")
+    _record_field = "spot_cost"
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement) -> None:
+        super().__init__(hass, entry, settlement, period="month")
         self._attr_unique_id = f"{DOMAIN}_spot_cost_mesic_{entry.entry_id}"
 
 class MonthlyFixCostSensor(_BaseAccumCostSensor):
     _attr_translation_key = "fix_cost_monthly"
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cost_sensor: "FixHourlyCostSensor") -> None:
-        super().__init__(hass, entry, cost_sensor, period="month")
+    _record_field = "fix_cost"
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement) -> None:
+        super().__init__(hass, entry, settlement, period="month")
         self._attr_unique_id = f"{DOMAIN}_fix_cost_mesic_{entry.entry_id}"
 
+# ---------------------------
+# Další nabídky profilu (cena počítaná jen při uzavření intervalu)
+# ---------------------------
+
+class OfferIntervalCostSensor(SensorEntity):
+    """Cena posledního uzavřeného intervalu podle jedné z dalších nabídek.
+
+    Hodnotu bere ze záznamu intervalu, kde ji spočítalo uzavření pro všechny
+    nabídky najednou – na události spotřeby se neprobouzí.
+    """
+
+    _attr_translation_key = "offer_cost_interval"
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_native_unit_of_measurement = "CZK"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_should_poll = False
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement, index: int, offer: Offer) -> None:
+        self.hass = hass
+        self._entry = entry
+        self._settlement = settlement
+        self._index = index
+        self._offer = offer
+        self._attr_unique_id = f"{DOMAIN}_offer_{offer.slug}_cost_1h_{entry.entry_id}"
+        self._attr_translation_placeholders = {"offer": offer.name}
+        self._stats = settlement.stats.sensor(f"offer_cost_{offer.slug}")
+        self._unsubs: list[callable] = []
+
+    async def async_added_to_hass(self) -> None:
+        self._unsubs.append(self._settlement.async_add_listener(self._on_settled))
+
+    async def async_will_remove_from_hass(self) -> None:
+        for u in self._unsubs:
+            u()
+        self._unsubs.clear()
+
+    @callback
+    def _on_settled(self, record: IntervalRecord) -> None:
+        costs = record.offer_costs
+        self._attr_native_value = costs[self._index] if self._index < len(costs) else None
+        self._stats.writes += 1
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {"offer": self._offer.name, "product": self._offer.product}
+
+
+class _OfferAccumCostSensor(_BaseAccumCostSensor):
+    """Denní/měsíční součet ceny jedné z dalších nabídek."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement, period: str, index: int, offer: Offer) -> None:
+        super().__init__(hass, entry, settlement, period, node=f"{self._attr_translation_key}_{offer.slug}")
+        self._index = index
+        self._offer = offer
+        suffix = "den" if period == "day" else "mesic"
+        self._attr_unique_id = f"{DOMAIN}_offer_{offer.slug}_cost_{suffix}_{entry.entry_id}"
+        self._attr_translation_placeholders = {"offer": offer.name}
+
+    def _record_value(self, record: IntervalRecord) -> float:
+        costs = record.offer_costs
+        return costs[self._index] if self._index < len(costs) else 0.0
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {**super().extra_state_attributes, "offer": self._offer.name, "product": self._offer.product}
+
+
+class DailyOfferCostSensor(_OfferAccumCostSensor):
+    _attr_translation_key = "offer_cost_daily"
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement, index: int, offer: Offer) -> None:
+        super().__init__(hass, entry, settlement, "day", index, offer)
+
+class MonthlyOfferCostSensor(_OfferAccumCostSensor):
+    _attr_translation_key = "offer_cost_monthly"
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, settlement: IntervalSettlement, index: int, offer: Offer) -> None:
+        super().__init__(hass, entry, settlement, "month", index, offer)
+
+# ---------------------------
+# Plánovač spotřebičů – nejlevnější okno
+# ---------------------------
+
+class CheapestWindowSensor(SensorEntity):
+    """Začátek nejlevnějšího okna pro spotřebič v horizontu známých cen.
+
+    Plán všech spotřebičů počítá jeden uzel grafu („plan“) při nových cenách,
+    změně tarifu, HDO a na každé čtvrthodině; senzor je uzel za ním a zapisuje
+    jen při změně svého plánu.
+    """
+
+    _attr_translation_key = "cheapest_window"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_should_poll = False
+    _unrecorded_attributes = frozenset({"slots"})
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cfg: dict, appliance: Appliance) -> None:
+        self.hass = hass
+        self._entry = entry
+        self._graph: DataflowGraph = cfg["graph"]
+        self._slug = appliance.slug
+        self._node = f"plan_{appliance.slug}"
+        self._attr_unique_id = f"{DOMAIN}_plan_{appliance.slug}_{entry.entry_id}"
+        self._attr_translation_placeholders = {"appliance": appliance.name}
+        self._stats = cfg["stats"].sensor(self._node)
+        self._plan: dict | None = None
+        self._unsubs: list[callable] = []
+
+    async def async_added_to_hass(self) -> None:
+        self._unsubs.append(self._graph.add_node(
+            self._node, self._compute, deps=("plan",), sink=self._on_value, stats=self._stats,
+        ))
+        self._graph.propagate()
+
+    async def async_will_remove_from_hass(self) -> None:
+        for u in reversed(self._unsubs):
+            u()
+        self._unsubs.clear()
+
+    def _compute(self) -> dict | None:
+        return self._graph.value("plan").get(self._slug)
+
+    @callback
+    def _on_value(self, plan: dict | None) -> None:
+        self._plan = plan
+        self._stats.writes += 1
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> datetime | None:
+        return datetime.fromisoformat(self._plan["start"]) if self._plan else None
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return dict(self._plan) if self._plan else {}
+
+# ---------------------------
+# Diagnostické senzory výkonu (ve výchozím stavu vypnuté)
+# ---------------------------
+
+class _PerfSensor(SensorEntity):
+    """Základ diagnostických senzorů; čte počítadla profilu jen po uzavření intervalu.
+
+    Vypnutá entita se do HA vůbec nepřidá, takže nepřidává žádnou práci.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = False
+    _unrecorded_attributes = frozenset({"sensors", "events", "windows", "settle"})
+
+    _key: str
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, cfg: dict, settlement: IntervalSettlement) -> None:
+        self.hass = hass
+        self._entry = entry
+        self._cfg = cfg
+        self._stats: EntryStats = cfg["stats"]
+        self._settlement = settlement
+        self._attr_unique_id = f"{DOMAIN}_{self._key}_{entry.entry_id}"
+        self._unsubs: list[callable] = []
+
+    async def async_added_to_hass(self) -> None:
+        self._unsubs.append(self._settlement.async_add_listener(self._on_settled))
+
+    async def async_will_remove_from_hass(self) -> None:
+        for u in self._unsubs:
+            u()
+        self._unsubs.clear()
+
+    @callback
+    def _on_settled(self, _record: IntervalRecord) -> None:
+        self.async_write_ha_state()
+
+
+class PerfRecomputeTimeSensor(_PerfSensor):
+    _attr_translation_key = "perf_recompute_time"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _key = "perf_recompute_time"
+
+    @property
+    def native_value(self) -> float:
+        return round(self._stats.recompute_ns / 1e6, 3)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {"sensors": {name: s.as_dict() for name, s in self._stats.sensors.items()}}
+
+
+class PerfEventsSensor(_PerfSensor):
+    _attr_translation_key = "perf_events"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _key = "perf_events"
+
+    @property
+    def native_value(self) -> int:
+        return sum(self._stats.events.values())
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {
+            "events": dict(self._stats.events),
+            "writes_total": sum(s.writes for s in self._stats.sensors.values()),
+        }
+
+
+class PerfWindowBytesSensor(_PerfSensor):
+    _attr_translation_key = "perf_window_bytes"
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _key = "perf_window_bytes"
+
+    def _report(self) -> dict[str, dict[str, int]]:
+        cons = self._cfg.get("consumption")
+        return cons.memory_report() if cons is not None else {}
+
+    @property
+    def native_value(self) -> int:
+        return sum(r["bytes"] for r in self._report().values())
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {"windows": self._report()}
+
+
+class PerfSettleTimeSensor(_PerfSensor):
+    _attr_translation_key = "perf_settle_time"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _key = "perf_settle_time"
+
+    @property
+    def native_value(self) -> float:
+        return round(self._stats.settle.last_ns / 1e6, 3)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {"settle": self._stats.settle.as_dict()}
+
+
 # ---------------------------
 # Registrace entit (MODULOVÁ!)
 # ---------------------------
@@ -890,26 +1329,53 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_e
     # 1) HDO – zdrojový přepínač
     source_entity_id = cfg.get("source_entity_id")
     if source_entity_id:
-        entities.append(HDOTariffSensor(hass, source_entity_id))
+        entities.append(HDOTariffSensor(hass, source_entity_id, cfg["hub"]))
 
-    # 2) Spotřeba poslední hodiny
+    # 2) Spotřeba posledního intervalu + uzavírání intervalů (jediný časovač profilu)
     cons = HourlyConsumptionSensor(hass, entry, cfg)
     entities.append(cons)
-
-    # 3) Cena (spot) poslední hodiny + denní/měsíční součty
-    cost_spot = SpotHourlyCostSensor(hass, entry, cfg, cons)
+    prices = SpotPriceSource(hass, cfg.get("spot_price_sensor") or DEFAULT_SPOT_PRICE_SENSOR, cfg["hub"])
+    settlement = IntervalSettlement(hass, entry, cfg, cons, prices)
+    cfg["consumption"] = cons
+    cfg["prices"] = prices
+    cfg["settlement"] = settlement
+
+    # 3) Cena (spot) posledního intervalu + denní/měsíční součty
+    cost_spot = SpotHourlyCostSensor(hass, entry, cfg, cons, settlement, prices)
     entities.append(cost_spot)
-    entities.append(DailySpotCostSensor(hass, entry, cost_spot))
-    entities.append(MonthlySpotCostSensor(hass, entry, cost_spot))
+    entities.append(DailySpotCostSensor(hass, entry, settlement))
+    entities.append(MonthlySpotCostSensor(hass, entry, settlement))
 
-    # 4) Cena (fix) poslední hodiny + denní/měsíční součty  ← NOVÉ
-    cost_fix = FixHourlyCostSensor(hass, entry, cfg, cons)
+    # 4) Cena (fix) posledního intervalu + denní/měsíční součty
+    cost_fix = FixHourlyCostSensor(hass, entry, cfg, cons, settlement)
     entities.append(cost_fix)
-    entities.append(DailyFixCostSensor(hass, entry, cost_fix))
-    entities.append(MonthlyFixCostSensor(hass, entry, cost_fix))
+    entities.append(DailyFixCostSensor(hass, entry, settlement))
+    entities.append(MonthlyFixCostSensor(hass, entry, settlement))
 
     # 5) denní spotřeba VT/NT <<<
-    entities.append(DailyEnergyVTSensor(hass, entry, cons, source_entity_id))
-    entities.append(DailyEnergyNTSensor(hass, entry, cons, source_entity_id))
+    entities.append(DailyEnergyVTSensor(hass, entry, cons, source_entity_id, settlement))
+    entities.append(DailyEnergyNTSensor(hass, entry, cons, source_entity_id, settlement))
+
+    # 6) další nabídky – sdílí spotřebu, HDO i uzavření intervalu; každá má svou trojici senzorů
+    for index, offer in enumerate(cfg["offers"].offers):
+        entities.append(OfferIntervalCostSensor(hass, entry, settlement, index, offer))
+        entities.append(DailyOfferCostSensor(hass, entry, settlement, index, offer))
+        entities.append(MonthlyOfferCostSensor(hass, entry, settlement, index, offer))
+
+    # 7) plánovač spotřebičů – jeden uzel plánu, senzor na spotřebič
+    for appliance in cfg["appliances"]:
+        entities.append(CheapestWindowSensor(hass, entry, cfg, appliance))
+
+    # 8) diagnostika výkonu (v registru entit ve výchozím stavu vypnutá)
+    for perf_cls in (PerfRecomputeTimeSensor, PerfEventsSensor, PerfWindowBytesSensor, PerfSettleTimeSensor):
+        entities.append(perf_cls(hass, entry, cfg, settlement))
+
+    # vstupy grafu přepočtů (spotřeba, tarif, HDO, cena, záznam intervalu)
+    entry.async_on_unload(async_setup_graph(hass, entry, cfg, cons, prices, settlement))
 
     async_add_entities(entities, True)
+
+    prices.async_start()
+    settlement.async_start()
+    entry.async_on_unload(settlement.async_stop)
+    entry.async_on_unload(prices.async_stop)
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import voluptuous as vol                                                                            # type: ignore
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse       # type: ignore
+from homeassistant.exceptions import HomeAssistantError                                             # type: ignore
+from homeassistant.helpers import config_validation as cv                                           # type: ignore
+from homeassistant.helpers.storage import STORAGE_DIR                                               # type: ignore
+
+from .backtest import async_backtest, async_load_series, async_map_chunks, hour_range
+from .battery import MAX_SIZES, EvUsage, Series, Storage, fill_prices, sweep_storage, tariff_series
+from .const import (
+    DOMAIN, DATA_PRICE_STORE, PRICE_STORE_PREFIX,
+    SERVICE_IMPORT_SPOT_PRICES, SERVICE_BACKTEST, SERVICE_SWEEP_OFFERS, SERVICE_PLAN_WINDOWS, SERVICE_SIMULATE_STORAGE,
+)
+from .ote import OteFormatError, parse_prices
+from .planner import build_horizon, parse_appliance, parse_appliances, plan_all
+from .price_store import PriceStore
+from .sweep import LoadProfile, expand_candidates, sweep
+
+LOGGER = logging.getLogger(__name__)
+
+_IMPORT_SCHEMA = vol.Schema({
+    vol.Required("path"): cv.string,
+    vol.Optional("eur_czk"): vol.All(vol.Coerce(float), vol.Range(min=0, min_included=False)),
+})
+
+_BACKTEST_SCHEMA = vol.Schema({
+    vol.Required("config_entry_id"): cv.string,
+    vol.Required("start"): cv.date,
+    vol.Optional("end"): cv.date,
+})
+
+_SWEEP_SCHEMA = _BACKTEST_SCHEMA.extend({
+    vol.Optional("offers"): vol.All(cv.ensure_list, [dict]),
+    vol.Optional("grid"): dict,
+    vol.Optional("top", default=50): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+})
+
+_PLAN_SCHEMA = vol.Schema({
+    vol.Required("config_entry_id"): cv.string,
+    vol.Optional("appliances"): vol.All(cv.ensure_list, [dict]),
+    vol.Optional("duration"): vol.All(vol.Coerce(float), vol.Range(min=0, min_included=False)),
+    vol.Optional("energy"): vol.All(vol.Coerce(float), vol.Range(min=0, min_included=False)),
+    vol.Optional("contiguous", default=True): cv.boolean,
+    vol.Optional("within"): vol.All(vol.Coerce(float), vol.Range(min=0, min_included=False)),
+})
+
+_POSITIVE = vol.All(vol.Coerce(float), vol.Range(min=0, min_included=False))
+
+_STORAGE_SCHEMA = _BACKTEST_SCHEMA.extend({
+    vol.Required("capacity"): vol.All(cv.ensure_list, [_POSITIVE], vol.Length(min=1, max=MAX_SIZES)),
+    vol.Optional("charge_power", default=5.0): _POSITIVE,
+    vol.Optional("discharge_power"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional("efficiency", default=0.9): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=1)),
+    vol.Optional("interval", default=15): vol.All(vol.Coerce(int), vol.In([15, 60])),
+    vol.Optional("ev_daily_energy"): _POSITIVE,
+    vol.Optional("ev_arrival", default=17): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+    vol.Optional("ev_departure", default=7): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+})
+
+_LOCK = f"{DATA_PRICE_STORE}_lock"
+
+
+async def async_get_price_store(hass: HomeAssistant) -> PriceStore:
+    """Úložiště historických cen domény (načte se jednou, v executoru)."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    lock: asyncio.Lock = domain_data.setdefault(_LOCK, asyncio.Lock())
+    async with lock:
+        store = domain_data.get(DATA_PRICE_STORE)
+        if store is None:
+            store = PriceStore(hass.config.path(STORAGE_DIR), PRICE_STORE_PREFIX)
+            await hass.async_add_executor_job(store.load)
+            domain_data[DATA_PRICE_STORE] = store
+    return store
+
+
+def _import_file(store: PriceStore, path: str, eur_czk: float | None) -> dict:
+    with open(path, "rb") as fh:
+        parsed = parse_prices(fh.read(), eur_czk)
+    res = store.merge(parsed.step, parsed.points)
+    first = min(ts for ts, _ in parsed.points)
+    last = max(ts for ts, _ in parsed.points)
+    return {
+        "step_min": parsed.step // 60,
+        "column": parsed.column,
+        "rows": parsed.rows,
+        "bad_rows": parsed.bad_rows,
+        **res.as_dict(),
+        "first": datetime.fromtimestamp(first, timezone.utc).isoformat(),
+        "last": datetime.fromtimestamp(last, timezone.utc).isoformat(),
+    }
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Služby domény (jednou, nezávisle na profilech)."""
+
+    async def _import_spot_prices(call: ServiceCall) -> ServiceResponse:
+        path = call.data["path"]
+        if not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Cesta {path} není povolená (allowlist_external_dirs)")
+        store = await async_get_price_store(hass)
+        # import je serializovaný zámkem úložiště; parsování i zápis mimo event loop
+        async with hass.data[DOMAIN][_LOCK]:
+            try:
+                result = await hass.async_add_executor_job(_import_file, store, path, call.data.get("eur_czk"))
+            except FileNotFoundError as err:
+                raise HomeAssistantError(f"Soubor {path} neexistuje") from err
+            except OteFormatError as err:
+                raise HomeAssistantError(f"{path}: {err}") from err
+        LOGGER.info("Import spotových cen %s: %s", path, result)
+        return result
+
+    def _entry_cfg(call: ServiceCall) -> dict:
+        cfg = hass.data.get(DOMAIN, {}).get(call.data["config_entry_id"])
+        if not isinstance(cfg, dict):
+            raise HomeAssistantError("Profil neexistuje nebo není načtený")
+        return cfg
+
+    def _history_source(call: ServiceCall) -> tuple[dict, list[str], datetime, datetime]:
+        """(cfg profilu, entity spotřeby, začátek, konec) pro služby nad historií."""
+        cfg = _entry_cfg(call)
+        if "recorder" not in hass.config.components:
+            raise HomeAssistantError("Výpočet nad historií potřebuje recorder")
+        consumption = [cfg["cons_total"]] if cfg.get("cons_total") else [
+            cfg[k] for k in ("cons_l1", "cons_l2", "cons_l3") if cfg.get(k)
+        ]
+        if not consumption:
+            raise HomeAssistantError("Profil nemá nastavený zdroj spotřeby")
+
+        tz = ZoneInfo(hass.config.time_zone)
+        first: date = call.data["start"]
+        last: date = call.data.get("end") or datetime.now(tz).date()
+        start = datetime.combine(first, time(0), tz)
+        end = datetime.combine(last + timedelta(days=1), time(0), tz)
+        return cfg, consumption, start, end
+
+    async def _backtest(call: ServiceCall) -> ServiceResponse:
+        cfg, consumption, start, end = _history_source(call)
+        try:
+            return await async_backtest(
+                hass, cfg["tariff"], await async_get_price_store(hass), consumption,
+                cfg.get("source_entity_id") or "", start, end,
+            )
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
+
+    async def _sweep_offers(call: ServiceCall) -> ServiceResponse:
+        cfg, consumption, start, end = _history_source(call)
+        entry = hass.config_entries.async_get_entry(call.data["config_entry_id"])
+        try:
+            candidates = expand_candidates(call.data.get("offers"), call.data.get("grid"))
+            t0, t1 = hour_range(start, end)
+            # historie se zredukuje na pár součtů po dávkách, nabídky se pak oceňují maticově
+            profile = LoadProfile()
+            for part in await async_map_chunks(
+                hass, await async_get_price_store(hass), consumption, cfg.get("source_entity_id") or "",
+                t0, t1, LoadProfile.from_arrays,
+            ):
+                profile += part
+            result = await hass.async_add_executor_job(
+                sweep, profile, dict(entry.options), dict(entry.data), candidates, call.data["top"],
+            )
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
+        return {
+            "start": datetime.fromtimestamp(t0, timezone.utc).isoformat(),
+            "end": datetime.fromtimestamp(t1, timezone.utc).isoformat(),
+            **result,
+        }
+
+    async def _plan_windows(call: ServiceCall) -> ServiceResponse:
+        cfg = _entry_cfg(call)
+        prices = cfg.get("prices")
+        if prices is None:
+            raise HomeAssistantError("Profil ještě nemá načtené senzory")
+        try:
+            if "duration" in call.data:
+                # jednorázový dotaz bez uložení do nastavení
+                appliances = (parse_appliance({
+                    k: call.data[k] for k in ("duration", "energy", "contiguous", "within") if k in call.data
+                } | {"name": "plan"}),)
+            elif "appliances" in call.data:
+                appliances = parse_appliances(call.data["appliances"])
+            else:
+                appliances = cfg["appliances"]
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
+        if not appliances:
+            raise HomeAssistantError("Zadej duration nebo appliances (nebo nastav spotřebiče profilu)")
+
+        # stejný horizont jako senzory plánovače (jednotková cena spot)
+        curve = prices.curve
+        horizon = build_horizon(
+            cfg["tariff"], curve.base, curve.step, curve.prices, datetime.now(timezone.utc).timestamp(),
+        )
+        plans = plan_all(horizon, appliances)
+        edges = (horizon.starts[0], horizon.starts[-1] + horizon.step) if len(horizon) else (None, None)
+        return {
+            "horizon": {
+                "start": datetime.fromtimestamp(edges[0], timezone.utc).isoformat() if len(horizon) else None,
+                "end": datetime.fromtimestamp(edges[1], timezone.utc).isoformat() if len(horizon) else None,
+                "intervals": len(horizon),
+                "step_min": int(horizon.step // 60),
+            },
+            "plans": {a.name: plans[a.slug] for a in appliances},
+        }
+
+    async def _simulate_storage(call: ServiceCall) -> ServiceResponse:
+        cfg, consumption, start, end = _history_source(call)
+        data = call.data
+        ev = None
+        if "ev_daily_energy" in data:
+            if data["ev_arrival"] == data["ev_departure"]:
+                raise HomeAssistantError("Příjezd a odjezd elektromobilu nesmí být stejná hodina")
+            ev = EvUsage(data["ev_daily_energy"], data["ev_arrival"], data["ev_departure"])
+        charge = data["charge_power"]
+        # elektromobil do domu nevybíjí; baterie bez zadání vybíjí stejným výkonem, jakým nabíjí
+        discharge = 0.0 if ev is not None else data.get("discharge_power", charge)
+        storages = [Storage(c, charge, discharge, data["efficiency"]) for c in data["capacity"]]
+        step = data["interval"] * 60
+        tz = ZoneInfo(hass.config.time_zone)
+        try:
+            t0, t1 = hour_range(start, end)
+            starts, kwh, spot, nt = await async_load_series(
+                hass, await async_get_price_store(hass), consumption, cfg.get("source_entity_id") or "",
+                t0, t1, step,
+            )
+            spot, missing_prices = fill_prices(spot)
+            missing_load = int(np.isnan(kwh).sum())
+            unit, fees = tariff_series(cfg["tariff"], spot, nt, starts, step)
+            series = Series(starts, np.nan_to_num(kwh, nan=0.0), unit, fees, step)
+            # DP nad celou řadou je CPU práce – mimo event loop
+            results = await hass.async_add_executor_job(sweep_storage, series, storages, ev, tz)
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
+        return {
+            "start": datetime.fromtimestamp(t0, timezone.utc).isoformat(),
+            "end": datetime.fromtimestamp(t1, timezone.utc).isoformat(),
+            "step_min": data["interval"],
+            "intervals": len(starts),
+            "missing_prices": missing_prices,
+            "missing_consumption": missing_load,
+            "mode": "ev" if ev is not None else "battery",
+            "results": results,
+        }
+
+    if not hass.services.has_service(DOMAIN, SERVICE_IMPORT_SPOT_PRICES):
+        hass.services.async_register(
+            DOMAIN, SERVICE_IMPORT_SPOT_PRICES, _import_spot_prices,
+            schema=_IMPORT_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+        )
+    if not hass.services.has_service(DOMAIN, SERVICE_BACKTEST):
+        hass.services.async_register(
+            DOMAIN, SERVICE_BACKTEST, _backtest,
+            schema=_BACKTEST_SCHEMA, supports_response=SupportsResponse.ONLY,
+        )
+    if not hass.services.has_service(DOMAIN, SERVICE_SWEEP_OFFERS):
+        hass.services.async_register(
+            DOMAIN, SERVICE_SWEEP_OFFERS, _sweep_offers,
+            schema=_SWEEP_SCHEMA, supports_response=SupportsResponse.ONLY,
+        )
+    if not hass.services.has_service(DOMAIN, SERVICE_PLAN_WINDOWS):
+        hass.services.async_register(
+            DOMAIN, SERVICE_PLAN_WINDOWS, _plan_windows,
+            schema=_PLAN_SCHEMA, supports_response=SupportsResponse.ONLY,
+        )
+    if not hass.services.has_service(DOMAIN, SERVICE_SIMULATE_STORAGE):
+        hass.services.async_register(
+            DOMAIN, SERVICE_SIMULATE_STORAGE, _simulate_storage,
+            schema=_STORAGE_SCHEMA, supports_response=SupportsResponse.ONLY,
+        )
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from time import perf_counter_ns
+from typing import Any, Callable
+
+
+# ---------------------------
+# Výkonová počítadla profilu (bez závislosti na HA)
+# ---------------------------
+#
+# Zápis je jen přičtení do slotu objektu a dvě čtení perf_counter_ns na
+# přepočet; agregace a převod na dict se dělá až při čtení (diagnostika,
+# diagnostické senzory).
+
+class TimingStats:
+    """Počet volání + kumulativní, maximální a poslední doba (ns)."""
+
+    __slots__ = ("count", "total_ns", "max_ns", "last_ns")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_ns = 0
+
+    def add(self, elapsed_ns: int) -> None:
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.last_ns = elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "max_ms": round(self.max_ns / 1e6, 3),
+            "last_ms": round(self.last_ns / 1e6, 3),
+            "mean_us": round(self.total_ns / self.count / 1e3, 2) if self.count else 0.0,
+        }
+
+
+class SensorStats(TimingStats):
+    """Přepočty a zápisy stavu jednoho senzoru."""
+
+    __slots__ = ("writes",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+
+    def counting(self, write: Callable[[], None]) -> Callable[[], None]:
+        """Obal zápisu stavu, který ho započítá (pro slučovač zápisů)."""
+        def _write() -> None:
+            self.writes += 1
+            write()
+        return _write
+
+    def as_dict(self) -> dict[str, Any]:
+        data = TimingStats.as_dict(self)
+        data["recomputes"] = data.pop("count")
+        data["writes"] = self.writes
+        return data
+
+
+class EntryStats:
+    """Počítadla jednoho profilu (config entry)."""
+
+    __slots__ = ("sensors", "events", "settle", "started_ns")
+
+    def __init__(self) -> None:
+        self.sensors: dict[str, SensorStats] = {}
+        self.events: dict[str, int] = {}        # přijaté změny stavu per zdrojová entita
+        self.settle = TimingStats()             # uzavření intervalu vč. všech posluchačů
+        self.started_ns = perf_counter_ns()
+
+    def sensor(self, name: str) -> SensorStats:
+        stats = self.sensors.get(name)
+        if stats is None:
+            stats = self.sensors[name] = SensorStats()
+        return stats
+
+    def event(self, entity_id: str) -> None:
+        events = self.events
+        events[entity_id] = events.get(entity_id, 0) + 1
+
+    @property
+    def recompute_ns(self) -> int:
+        return sum(s.total_ns for s in self.sensors.values())
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "uptime_s": round((perf_counter_ns() - self.started_ns) / 1e9, 1),
+            "recompute_total_ms": round(self.recompute_ns / 1e6, 3),
+            "writes_total": sum(s.writes for s in self.sensors.values()),
+            "events_total": sum(self.events.values()),
+            "sensors": {name: s.as_dict() for name, s in sorted(self.sensors.items())},
+            "events": dict(sorted(self.events.items())),
+            "settle": self.settle.as_dict(),
+        }
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import itertools
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from typing import Any
+
+import numpy as np
+
+from .pricing import month_days
+from .tariff import DEFAULT_MAP, Tariff
+
+# ---------------------------
+# Porovnání nabídek nad stejnou historií (bez závislosti na HA)
+# ---------------------------
+#
+# Náklady obou produktů jsou v parametrech nabídky lineární:
+#   fix  = kWh_VT · fix_unit_vt + kWh_NT · fix_unit_nt + paušál_fix · M
+#   spot = Σ kWh · spot + kWh · spot_adder_vt + paušál_spot · M
+# kde M = Σ hodin / (dní měsíce · 24) je počet „měsíců“ v datech
+# (stejné rozpočítání paušálu jako živě). Historie se tedy jednou zredukuje
+# na pár součtů a libovolně mnoho nabídek je jedno násobení matic.
+
+# nejvýš tolik kombinací z mřížky (ochrana před překlepem v rozsahu)
+MAX_CANDIDATES = 100_000
+
+
+@dataclass(slots=True)
+class LoadProfile:
+    """Postačující součty historie pro ocenění libovolné nabídky."""
+
+    kwh: float = 0.0
+    kwh_vt: float = 0.0
+    kwh_nt: float = 0.0
+    spot_energy: float = 0.0            # Σ kWh · spotová cena [Kč]
+    months: float = 0.0                 # Σ hodin / hodin v měsíci
+    hours: int = 0
+
+    @classmethod
+    def from_arrays(cls, starts: Any, kwh: Any, prices: Any, nt: Any, minutes: int = 60) -> LoadProfile:
+        """Z polí intervalů; intervaly bez spotřeby nebo ceny se vynechají."""
+        kwh = np.asarray(kwh, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        ok = ~np.isnan(kwh) & ~np.isnan(prices)
+        k, p, n = kwh[ok], prices[ok], np.asarray(nt, dtype=np.float64)[ok]
+        days = month_days(np.asarray(starts)[ok])
+        k_nt = float((k * n).sum())
+        total = float(k.sum())
+        return cls(
+            kwh=total, kwh_vt=total - k_nt, kwh_nt=k_nt,
+            spot_energy=float((k * p).sum()),
+            months=float(((minutes / 60.0) / (days * 24.0)).sum()),
+            hours=int(ok.sum()),
+        )
+
+    def __iadd__(self, other: LoadProfile) -> LoadProfile:
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+        return self
+
+
+def expand_candidates(offers: list[Mapping] | None, grid: Mapping[str, list] | None) -> list[dict[str, Any]]:
+    """Seznam nabídek + kartézský součin mřížky → [{"name": …, parametry…}]."""
+    out: list[dict[str, Any]] = []
+    for i, offer in enumerate(offers or ()):
+        params = dict(offer)
+        name = str(params.pop("name", f"nabidka_{i + 1}"))
+        out.append({"name": name, **params})
+    if grid:
+        keys = list(grid)
+        values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+        count = 1
+        for v in values:
+            count *= len(v)
+        if count > MAX_CANDIDATES:
+            raise ValueError(f"mřížka má {count} kombinací (max {MAX_CANDIDATES})")
+        for combo in itertools.product(*values):
+            params = dict(zip(keys, combo))
+            name = ", ".join(f"{k}={v}" for k, v in params.items())
+            out.append({"name": name, **params})
+    for cand in out:
+        unknown = [k for k in cand if k != "name" and k not in DEFAULT_MAP]
+        if unknown:
+            raise ValueError(f"{cand['name']}: neznámé parametry {unknown}")
+    return out
+
+
+def _product(params: Mapping) -> tuple[str, ...]:
+    keys = [k for k in params if k != "name"]
+    fix = any(k.startswith("fix_") for k in keys)
+    spot = any(k.startswith("spot_") for k in keys)
+    # společné parametry (distribuce, POZE) nebo smíšená nabídka → oba produkty
+    if fix and not spot:
+        return ("fix",)
+    if spot and not fix:
+        return ("spot",)
+    return ("fix", "spot")
+
+
+def sweep(
+    profile: LoadProfile, options: Mapping, data: Mapping, candidates: list[dict[str, Any]], top: int = 50,
+) -> dict[str, Any]:
+    """Ocenění všech nabídek (a současného nastavení) nad `profile`, seřazené od nejlevnější.
+
+    `break_even` u spotu = marže [Kč/kWh], při které se nabídka vyrovná nejlepšímu
+    fixu; u fixu = posun ceny VT i NT [Kč/kWh], při kterém se vyrovná nejlepšímu spotu.
+    """
+    rows: list[tuple[str, str, dict]] = [("aktuální", p, {}) for p in ("fix", "spot")]
+    for cand in candidates:
+        params = {k: v for k, v in cand.items() if k != "name"}
+        rows += [(cand["name"], p, params) for p in _product(params)]
+
+    tariffs = [Tariff.from_mappings({**options, **params}, data) for _, _, params in rows]
+    is_fix = np.array([p == "fix" for _, p, _ in rows])
+    # koeficienty × součty historie – jeden maticový součin pro všechny nabídky
+    coef = np.array([
+        (t.fix_unit_vt, t.fix_unit_nt, 0.0, 0.0, t.fix_monthly) if fix else
+        (0.0, 0.0, t.spot_adder_vt, 1.0, t.spot_monthly)
+        for t, fix in zip(tariffs, is_fix)
+    ], dtype=np.float64)
+    basis = np.array([profile.kwh_vt, profile.kwh_nt, profile.kwh, profile.spot_energy, profile.months])
+    cost = coef @ basis
+    fees = coef[:, 4] * profile.months
+
+    best_fix = float(cost[is_fix].min())
+    best_spot = float(cost[~is_fix].min())
+    current = {p: float(c) for (name, p, _), c in zip(rows[:2], cost[:2])}
+    kwh = profile.kwh or float("nan")
+
+    order = np.argsort(cost, kind="stable")
+    ranked = []
+    for rank, i in enumerate(order[:max(1, top)], start=1):
+        name, product, params = rows[i]
+        t = tariffs[i]
+        if product == "spot":
+            break_even = t.spot_marze + (best_fix - cost[i]) / kwh
+        else:
+            break_even = (best_spot - cost[i]) / kwh
+        ranked.append({
+            "rank": rank,
+            "name": name,
+            "product": product,
+            "params": params,
+            "cost": round(float(cost[i]), 2),
+            "fees": round(float(fees[i]), 2),
+            "unit_price": round(float(cost[i]) / kwh, 4) if profile.kwh else None,
+            "vs_current": round(float(cost[i]) - current[product], 2),
+            "break_even": round(float(break_even), 4) if profile.kwh else None,
+        })
+    return {
+        "profile": {
+            "kwh": round(profile.kwh, 3), "kwh_vt": round(profile.kwh_vt, 3), "kwh_nt": round(profile.kwh_nt, 3),
+            "avg_spot": round(profile.spot_energy / kwh, 4) if profile.kwh else None,
+            "months": round(profile.months, 3), "hours": profile.hours,
+        },
+        "evaluated": len(rows),
+        "current": {p: round(c, 2) for p, c in current.items()},
+        "best_fix": round(best_fix, 2),
+        "best_spot": round(best_spot, 2),
+        "ranked": ranked,
+    }
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from calendar import monthrange
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from .const import (
+    # --- FIX ---
+    CONF_FIX_OBCHODNI_CENA_VT, CONF_FIX_OBCHODNI_CENA_NT,
+    CONF_FIX_STALA_PLATBA, CONF_FIX_ZA_JISTIC, CONF_FIX_PROVOZ_INFRASTRUKTURY,
+    DEFAULT_FIX_OBCHODNI_CENA_VT, DEFAULT_FIX_OBCHODNI_CENA_NT,
+    DEFAULT_FIX_STALA_PLATBA, DEFAULT_FIX_ZA_JISTIC, DEFAULT_FIX_PROVOZ_INFRASTRUKTURY,
+    # --- SPOT ---
+    CONF_SPOT_MARZE, CONF_SPOT_STALA_PLATBA, CONF_SPOT_ZA_JISTIC, CONF_SPOT_PROVOZ_INFRASTRUKTURY,
+    DEFAULT_SPOT_MARZE, DEFAULT_SPOT_STALA_PLATBA, DEFAULT_SPOT_ZA_JISTIC, DEFAULT_SPOT_PROVOZ_INFRASTRUKTURY,
+    # --- POZE / DISTRIBUCE ---
+    CONF_POZE, DEFAULT_POZE,
+    CONF_DISTRIBUCE_VT, CONF_DISTRIBUCE_NT, CONF_DISTRIBUCE_DAN, CONF_DISTRIBUCE_SLUZBY,
+    DEFAULT_DISTRIBUCE_VT, DEFAULT_DISTRIBUCE_NT, DEFAULT_DISTRIBUCE_DAN, DEFAULT_DISTRIBUCE_SLUZBY,
+    # --- NABÍDKY ---
+    CONF_OFFERS, OFFER_PRODUCTS, MAX_OFFERS,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAP: dict[str, float] = {
+    # FIX
+    CONF_FIX_OBCHODNI_CENA_VT: DEFAULT_FIX_OBCHODNI_CENA_VT,
+    CONF_FIX_OBCHODNI_CENA_NT: DEFAULT_FIX_OBCHODNI_CENA_NT,
+    CONF_FIX_STALA_PLATBA: DEFAULT_FIX_STALA_PLATBA,
+    CONF_FIX_ZA_JISTIC: DEFAULT_FIX_ZA_JISTIC,
+    CONF_FIX_PROVOZ_INFRASTRUKTURY: DEFAULT_FIX_PROVOZ_INFRASTRUKTURY,
+    # SPOT
+    CONF_SPOT_MARZE: DEFAULT_SPOT_MARZE,
+    CONF_SPOT_STALA_PLATBA: DEFAULT_SPOT_STALA_PLATBA,
+    CONF_SPOT_ZA_JISTIC: DEFAULT_SPOT_ZA_JISTIC,
+    CONF_SPOT_PROVOZ_INFRASTRUKTURY: DEFAULT_SPOT_PROVOZ_INFRASTRUKTURY,
+    # POZE / DISTRIBUCE
+    CONF_POZE: DEFAULT_POZE,
+    CONF_DISTRIBUCE_VT: DEFAULT_DISTRIBUCE_VT,
+    CONF_DISTRIBUCE_NT: DEFAULT_DISTRIBUCE_NT,
+    CONF_DISTRIBUCE_DAN: DEFAULT_DISTRIBUCE_DAN,
+    CONF_DISTRIBUCE_SLUZBY: DEFAULT_DISTRIBUCE_SLUZBY,
+}
+
+# délky měsíců, pro které se předpočítává paušál na hodinu
+_MONTH_DAYS = (28, 29, 30, 31)
+
+
+def _read_float(options: Mapping, data: Mapping, key: str) -> float:
+    """options → data → DEFAULT_MAP; nečitelnou hodnotu nahradí defaultem."""
+    default = DEFAULT_MAP.get(key, 0.0)
+    for source in (options, data):
+        if key in source:
+            try:
+                return float(source[key])
+            except (TypeError, ValueError):
+                LOGGER.warning("Neplatná hodnota %s=%r, používám %s", key, source[key], default)
+                return default
+    return default
+
+
+@dataclass(frozen=True, slots=True)
+class Tariff:
+    """Neměnný snímek cen profilu – sestaví se jednou při (re)konfiguraci.
+
+    Kromě zadaných cen drží předpočítané odvozené konstanty, takže přepočet
+    v senzoru je jen pár čtení atributů a jedno násobení se sčítáním.
+    """
+
+    # FIX [Kč/kWh, Kč/měs]
+    fix_vt: float
+    fix_nt: float
+    fix_stala_platba: float
+    fix_za_jistic: float
+    fix_provoz_infrastruktury: float
+    # SPOT [Kč/kWh, Kč/měs]
+    spot_marze: float
+    spot_stala_platba: float
+    spot_za_jistic: float
+    spot_provoz_infrastruktury: float
+    # POZE / DISTRIBUCE [Kč/kWh]
+    poze: float
+    distribuce_vt: float
+    distribuce_nt: float
+    distribuce_dan: float
+    distribuce_sluzby: float
+
+    # --- odvozené ---
+    distrib_common: float = field(init=False)       # daň + systémové služby
+    spot_adder_vt: float = field(init=False)        # jednotková cena spot bez spotové ceny (VT)
+    spot_adder_nt: float = field(init=False)        # … (NT)
+    fix_unit_vt: float = field(init=False)          # jednotková cena fix (VT)
+    fix_unit_nt: float = field(init=False)          # … (NT)
+    fix_monthly: float = field(init=False)          # paušály fix [Kč/měs]
+    spot_monthly: float = field(init=False)         # paušály spot [Kč/měs]
+    fix_fee_per_hour: tuple[float, ...] = field(init=False)    # index = dny v měsíci − 28
+    spot_fee_per_hour: tuple[float, ...] = field(init=False)
+
+    def __post_init__(self) -> None:
+        common = self.distribuce_dan + self.distribuce_sluzby
+        fix_monthly = self.fix_stala_platba + self.fix_za_jistic + self.fix_provoz_infrastruktury
+        spot_monthly = self.spot_stala_platba + self.spot_za_jistic + self.spot_provoz_infrastruktury
+        derived = {
+            "distrib_common": common,
+            "spot_adder_vt": self.spot_marze + self.distribuce_vt + common + self.poze,
+            "spot_adder_nt": self.spot_marze + self.distribuce_nt + common + self.poze,
+            "fix_unit_vt": self.fix_vt + self.distribuce_vt + common + self.poze,
+            "fix_unit_nt": self.fix_nt + self.distribuce_nt + common + self.poze,
+            "fix_monthly": fix_monthly,
+            "spot_monthly": spot_monthly,
+            "fix_fee_per_hour": tuple(fix_monthly / (d * 24) for d in _MONTH_DAYS),
+            "spot_fee_per_hour": tuple(spot_monthly / (d * 24) for d in _MONTH_DAYS),
+        }
+        for name, value in derived.items():
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_entry(cls, entry) -> "Tariff":
+        """Sestav snímek z config entry (options → data → DEFAULT_MAP)."""
+        return cls.from_mappings(entry.options, entry.data)
+
+    @classmethod
+    def from_mappings(cls, options: Mapping, data: Mapping | None = None) -> "Tariff":
+        data = data or {}
+
+        def g(key: str) -> float:
+            return _read_float(options, data, key)
+
+        return cls(
+            fix_vt=g(CONF_FIX_OBCHODNI_CENA_VT),
+            fix_nt=g(CONF_FIX_OBCHODNI_CENA_NT),
+            fix_stala_platba=g(CONF_FIX_STALA_PLATBA),
+            fix_za_jistic=g(CONF_FIX_ZA_JISTIC),
+            fix_provoz_infrastruktury=g(CONF_FIX_PROVOZ_INFRASTRUKTURY),
+            spot_marze=g(CONF_SPOT_MARZE),
+            spot_stala_platba=g(CONF_SPOT_STALA_PLATBA),
+            spot_za_jistic=g(CONF_SPOT_ZA_JISTIC),
+            spot_provoz_infrastruktury=g(CONF_SPOT_PROVOZ_INFRASTRUKTURY),
+            poze=g(CONF_POZE),
+            distribuce_vt=g(CONF_DISTRIBUCE_VT),
+            distribuce_nt=g(CONF_DISTRIBUCE_NT),
+            distribuce_dan=g(CONF_DISTRIBUCE_DAN),
+            distribuce_sluzby=g(CONF_DISTRIBUCE_SLUZBY),
+        )
+
+    def fix_interval_fee(self, now: datetime, minutes: int) -> float:
+        """Paušál fix rozpočítaný na jeden zúčtovací interval (`minutes`) měsíce `now`."""
+        return self.fix_fee_per_hour[monthrange(now.year, now.month)[1] - 28] * (minutes / 60.0)
+
+
+# ---------------------------
+# Další nabídky profilu
+# ---------------------------
+
+@dataclass(frozen=True, slots=True)
+class Offer:
+    """Pojmenovaná nabídka – tarif profilu s přepsanými parametry, oceňovaná jedním produktem."""
+
+    name: str
+    slug: str                       # část unique_id senzorů nabídky
+    product: str                    # "fix" / "spot"
+    tariff: Tariff
+
+
+def offer_slug(name: str) -> str:
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", ascii_name.lower()).strip("_")
+
+
+def parse_offers(raw, options: Mapping, data: Mapping | None = None) -> tuple[Offer, ...]:
+    """Nabídky z options (`[{name, product, parametry…}]`); chybějící parametry = profil.
+
+    Neplatný seznam → ValueError s popisem (zobrazí se ve formuláři možností).
+    """
+    if not raw:
+        return ()
+    if not isinstance(raw, (list, tuple)):
+        raise ValueError("nabídky musí být seznam")
+    if len(raw) > MAX_OFFERS:
+        raise ValueError(f"nejvýš {MAX_OFFERS} nabídek")
+    base = {**(data or {}), **options}
+    base.pop(CONF_OFFERS, None)
+    out: list[Offer] = []
+    slugs: set[str] = set()
+    for i, item in enumerate(raw, start=1):
+        if not isinstance(item, Mapping):
+            raise ValueError(f"nabídka {i}: očekávám slovník")
+        params = dict(item)
+        name = str(params.pop("name", "") or "").strip()
+        product = params.pop("product", None)
+        slug = offer_slug(name)
+        if not slug:
+            raise ValueError(f"nabídka {i}: chybí název")
+        if slug in slugs:
+            raise ValueError(f"{name}: název už je použitý")
+        if product not in OFFER_PRODUCTS:
+            raise ValueError(f"{name}: product musí být jedno z {list(OFFER_PRODUCTS)}")
+        unknown = [k for k in params if k not in DEFAULT_MAP]
+        if unknown:
+            raise ValueError(f"{name}: neznámé parametry {unknown}")
+        for key, value in params.items():
+            try:
+                params[key] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name}: {key}={value!r} není číslo") from None
+        slugs.add(slug)
+        out.append(Offer(name, slug, product, Tariff.from_mappings({**base, **params})))
+    return tuple(out)
+
+
+def offers_from_entry(entry) -> tuple[Offer, ...]:
+    """Nabídky profilu; neplatné nastavení se zaloguje a nabídky se vynechají."""
+    try:
+        return parse_offers(entry.options.get(CONF_OFFERS), entry.options, entry.data)
+    except ValueError as err:
+        LOGGER.warning("Neplatné nabídky profilu %s: %s", entry.title, err)
+        return ()
@@ -0,0 +1,487 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from bisect import bisect_left
+
+
+# ---------------------------
+# Kompaktní kruhový buffer vzorků (bez závislosti na HA)
+# ---------------------------
+
+_MIN_CAPACITY = 64
+
+
+class SampleRing:
+    """Kruhový buffer dvojic (epoch s, hodnota) nad dvěma poli array('d').
+
+    Jeden vzorek = 16 B bez per-vzorkových Python objektů. Kapacita je mocnina
+    dvojky, roste zdvojením a po vyprázdnění se zase zmenšuje, takže se paměť
+    po krátké špičce neudrží.
+    """
+
+    __slots__ = ("_ts", "_val", "_head", "_len", "_mask")
+
+    def __init__(self, capacity: int = _MIN_CAPACITY) -> None:
+        cap = _MIN_CAPACITY
+        while cap < capacity:
+            cap <<= 1
+        self._ts = array("d", bytes(8 * cap))
+        self._val = array("d", bytes(8 * cap))
+        self._head = 0
+        self._len = 0
+        self._mask = cap - 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def capacity(self) -> int:
+        return self._mask + 1
+
+    @property
+    def nbytes(self) -> int:
+        """Obsazená paměť polí (včetně rezervy) v bajtech."""
+        return (self._ts.buffer_info()[1] + self._val.buffer_info()[1]) * self._ts.itemsize
+
+    def append(self, ts: float, value: float) -> None:
+        if self._len > self._mask:
+            self._resize((self._mask + 1) << 1)
+        i = (self._head + self._len) & self._mask
+        self._ts[i] = ts
+        self._val[i] = value
+        self._len += 1
+
+    def popleft(self) -> None:
+        self._head = (self._head + 1) & self._mask
+        self._len -= 1
+        cap = self._mask + 1
+        if cap > _MIN_CAPACITY and self._len < (cap >> 2):
+            self._resize(cap >> 1)
+
+    def set_first(self, ts: float, value: float) -> None:
+        """Přepiš nejstarší vzorek (bez změny délky)."""
+        self._ts[self._head] = ts
+        self._val[self._head] = value
+
+    def set_last(self, ts: float, value: float) -> None:
+        """Přepiš nejnovější vzorek (bez změny délky)."""
+        i = (self._head + self._len - 1) & self._mask
+        self._ts[i] = ts
+        self._val[i] = value
+
+    def decimate(self) -> None:
+        """Ponech každý druhý vzorek (první i poslední zůstávají)."""
+        if self._len < 3:
+            return
+        ts, val = self._linear()
+        last_ts, last_val = ts[-1], val[-1]
+        ts, val = ts[::2], val[::2]
+        if ts[-1] != last_ts:
+            ts.append(last_ts)
+            val.append(last_val)
+        n = len(ts)
+        cap = _MIN_CAPACITY
+        while cap < n:
+            cap <<= 1
+        pad = array("d", bytes(8 * (cap - n)))
+        ts.extend(pad)
+        val.extend(pad)
+        self._ts, self._val = ts, val
+        self._head = 0
+        self._len = n
+        self._mask = cap - 1
+
+    def clear(self) -> None:
+        self._head = 0
+        self._len = 0
+        if self._mask + 1 > _MIN_CAPACITY:
+            self._resize(_MIN_CAPACITY)
+
+    def ts_at(self, i: int) -> float:
+        """Čas i-tého vzorku od nejstaršího (i < 0 počítá od konce)."""
+        if i < 0:
+            i += self._len
+        return self._ts[(self._head + i) & self._mask]
+
+    def value_at(self, i: int) -> float:
+        if i < 0:
+            i += self._len
+        return self._val[(self._head + i) & self._mask]
+
+    def _linear(self) -> tuple[array, array]:
+        """Kopie obsahu (od nejstaršího) jako dvě souvislá pole."""
+        head, n = self._head, self._len
+        first = min(n, self._mask + 1 - head)
+        ts = self._ts[head:head + first]
+        val = self._val[head:head + first]
+        if n > first:
+            ts.extend(self._ts[:n - first])
+            val.extend(self._val[:n - first])
+        return ts, val
+
+    def to_bytes(self) -> tuple[bytes, bytes]:
+        """Obsah bufferu (od nejstaršího) jako surové bajty polí časů a hodnot."""
+        ts, val = self._linear()
+        return ts.tobytes(), val.tobytes()
+
+    @classmethod
+    def from_bytes(
+        cls, ts_raw: bytes, val_raw: bytes, byteorder: str = sys.byteorder, cutoff: float | None = None,
+    ) -> "SampleRing":
+        """Hromadné naplnění z bajtů (viz to_bytes) bez per-vzorkových objektů.
+
+        Vzorky starší než `cutoff` se zahodí rovnou (binárním hledáním).
+        """
+        ts = array("d")
+        val = array("d")
+        ts.frombytes(ts_raw)
+        val.frombytes(val_raw)
+        if byteorder != sys.byteorder:
+            ts.byteswap()
+            val.byteswap()
+        n = min(len(ts), len(val))
+        del ts[n:], val[n:]
+        if cutoff is not None:
+            k = bisect_left(ts, cutoff)
+            del ts[:k], val[:k]
+            n -= k
+        ring = cls(n)
+        pad = array("d", bytes(8 * (ring._mask + 1 - n)))
+        ts.extend(pad)
+        val.extend(pad)
+        ring._ts, ring._val = ts, val
+        ring._len = n
+        return ring
+
+    def _resize(self, cap: int) -> None:
+        ts, val = self._linear()
+        pad = array("d", bytes(8 * (cap - self._len)))
+        ts.extend(pad)
+        val.extend(pad)
+        self._ts, self._val = ts, val
+        self._head = 0
+        self._mask = cap - 1
+
+
+# ---------------------------
+# Klouzavá okna vzorků
+# ---------------------------
+
+_INF = float("inf")
+_NAN = float("nan")
+
+
+def _segment_kwh(ts0: float, kw0: float, ts1: float, kw1: float) -> float:
+    return (kw0 + kw1) * 0.5 * (ts1 - ts0) / 3600.0
+
+
+class PowerWindow:
+    """Okno výkonových vzorků (kW) s průběžným lichoběžníkovým integrálem (kWh).
+
+    Každý nový vzorek přičte jeden segment, každý vyřazený vzorek jeden segment
+    odečte – cena za událost je konstantní bez ohledu na délku okna.
+
+    S `deviation` > 0 (kW) okno vzorky online komprimuje metodou „swinging
+    door“: poslední vzorek je jen držený a posouvá se, dokud přímka od
+    posledního uloženého vzorku prochází všemi mezilehlými vzorky s odchylkou
+    nejvýš `deviation`. Chyba integrálu segmentu je tak ≤ deviation × délka
+    segmentu. `max_samples` je tvrdý strop – při jeho dosažení se okno
+    prořídí na polovinu.
+    """
+
+    __slots__ = ("_ring", "_area", "_dev", "_max", "_held", "_upper", "_lower")
+
+    def __init__(self, deviation: float = 0.0, max_samples: int = 0) -> None:
+        self._ring = SampleRing()                             # (epoch s, kW)
+        self._area: float = 0.0                               # kWh
+        self._dev = max(0.0, deviation)                       # kW, 0 = bez komprese
+        self._max = max(0, max_samples)                       # 0 = bez stropu
+        self._held = False                                    # poslední vzorek ještě není uložený
+        self._upper = _INF                                    # dveře: max./min. sklon od kotvy
+        self._lower = -_INF
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    @property
+    def nbytes(self) -> int:
+        return self._ring.nbytes
+
+    def configure(self, deviation: float, max_samples: int) -> None:
+        """Změna parametrů komprese; stávající vzorky zůstávají."""
+        self._dev = max(0.0, deviation)
+        self._max = max(0, max_samples)
+        self._held = False
+        if self._max and len(self._ring) > self._max:
+            self._decimate()
+
+    def add(self, ts: float, kw: float) -> None:
+        ring = self._ring
+        n = len(ring)
+        if not n:
+            ring.append(ts, kw)
+            return
+        last_ts, last_kw = ring.ts_at(-1), ring.value_at(-1)
+
+        if self._dev and self._held:
+            # kotva = poslední uložený vzorek, držený vzorek je za ní
+            a_ts, a_kw = ring.ts_at(-2), ring.value_at(-2)
+            dt = ts - a_ts
+            if dt > 0:
+                slope = (kw - a_kw) / dt
+                if self._lower <= slope <= self._upper:
+                    # přímka kotva → nový vzorek pokryje i držený: jen ho posuň
+                    self._area += _segment_kwh(a_ts, a_kw, ts, kw) - _segment_kwh(a_ts, a_kw, last_ts, last_kw)
+                    ring.set_last(ts, kw)
+                    self._upper = min(self._upper, (kw + self._dev - a_kw) / dt)
+                    self._lower = max(self._lower, (kw - self._dev - a_kw) / dt)
+                    return
+
+        # držený vzorek se stává kotvou (uloží se), nový je držený
+        if self._max and n >= self._max:
+            self._decimate()
+            last_ts, last_kw = ring.ts_at(-1), ring.value_at(-1)
+        self._area += _segment_kwh(last_ts, last_kw, ts, kw)
+        ring.append(ts, kw)
+        if self._dev:
+            dt = ts - last_ts
+            self._held = dt > 0
+            self._upper = (kw + self._dev - last_kw) / dt if dt > 0 else _INF
+            self._lower = (kw - self._dev - last_kw) / dt if dt > 0 else -_INF
+
+    def _decimate(self) -> None:
+        self._ring.decimate()
+        self._held = False
+        self._area = self._integrate()
+
+    def _integrate(self) -> float:
+        ring = self._ring
+        area = 0.0
+        for i in range(1, len(ring)):
+            area += (ring.value_at(i - 1) + ring.value_at(i)) * (ring.ts_at(i) - ring.ts_at(i - 1))
+        return area * 0.5 / 3600.0
+
+    def trim(self, cutoff: float) -> None:
+        """Vyřaď vzorky starší než cutoff (epoch s)."""
+        ring = self._ring
+        if self._dev or self._max:
+            self._clip(cutoff)
+        while len(ring) and ring.ts_at(0) < cutoff:
+            if len(ring) >= 2:
+                self._area -= (ring.value_at(0) + ring.value_at(1)) * 0.5 * (ring.ts_at(1) - ring.ts_at(0)) / 3600.0
+            ring.popleft()
+        if len(ring) < 2:
+            # nic k integraci – zahoď i případnou nasčítanou zaokrouhlovací chybu
+            self._area = 0.0
+            self._held = False
+
+    def _clip(self, cutoff: float) -> None:
+        """Ořez s lineární interpolací prvního segmentu přes cutoff.
+
+        Komprimované okno má dlouhé segmenty; vyřazení celého segmentu by
+        z integrálu ubralo mnohem víc než jen část před cutoff.
+        """
+        ring = self._ring
+        while len(ring) >= 2 and ring.ts_at(1) <= cutoff:
+            self._area -= _segment_kwh(ring.ts_at(0), ring.value_at(0), ring.ts_at(1), ring.value_at(1))
+            ring.popleft()
+        if len(ring) >= 2 and ring.ts_at(0) < cutoff:
+            t0, v0, t1, v1 = ring.ts_at(0), ring.value_at(0), ring.ts_at(1), ring.value_at(1)
+            vc = v0 + (v1 - v0) * (cutoff - t0) / (t1 - t0)
+            self._area -= _segment_kwh(t0, v0, t1, v1) - _segment_kwh(cutoff, vc, t1, v1)
+            ring.set_first(cutoff, vc)
+            if len(ring) == 2:
+                # posunula se kotva dveří – další vzorek se uloží
+                self._held = False
+
+    @property
+    def kwh(self) -> float:
+        return max(0.0, self._area) if len(self._ring) >= 2 else 0.0
+
+    def dump(self) -> tuple[bytes, bytes]:
+        return self._ring.to_bytes()
+
+    @classmethod
+    def load(
+        cls, ts_raw: bytes, val_raw: bytes, byteorder: str = sys.byteorder, cutoff: float | None = None,
+    ) -> "PowerWindow":
+        """Obnova ze snímku; integrál se přepočítá jedním průchodem."""
+        win = cls()
+        ring = win._ring = SampleRing.from_bytes(ts_raw, val_raw, byteorder, cutoff)
+        ts, val = ring._ts, ring._val
+        area = 0.0
+        for i in range(1, len(ring)):
+            area += (val[i - 1] + val[i]) * (ts[i] - ts[i - 1])
+        win._area = area * 0.5 / 3600.0
+        return win
+
+
+class HoldWindow:
+    """Okno výkonu s držením poslední hodnoty (zero-order hold) v pevných krocích.
+
+    Poslední známý výkon platí až do dalšího vzorku – i přes začátek okna a
+    až do „teď“, takže energie nezmizí, když senzor delší dobu mlčí, a
+    výsledek nezávisí na tom, jak často zařízení hlásí. Energie se sčítá do
+    pevného kruhu košů po `step` sekundách (délka okna / krok + 1 koš), paměť
+    je konstantní a jedna událost projde jen koše, které od minulé uplynuly.
+    """
+
+    __slots__ = ("_span", "_step", "_bins", "_n", "_idx", "_sum", "_ts", "_kw")
+
+    def __init__(self, span: float, step: float) -> None:
+        n = int(round(span / step))
+        if n < 1 or abs(n * step - span) > 1e-6:
+            raise ValueError("délka okna musí být násobkem kroku")
+        self._span = float(span)
+        self._step = float(step)
+        self._n = n + 1                                       # + koš částečně před začátkem okna
+        self._bins = array("d", bytes(8 * self._n))           # kWh per krok
+        self._idx = -1                                        # absolutní index aktuálního koše
+        self._sum = 0.0                                       # součet všech košů
+        self._ts = 0.0                                        # energie je sečtená do tohoto času
+        self._kw = _NAN                                       # držená hodnota (NaN = zatím žádná)
+
+    def __len__(self) -> int:
+        """Počet virtuálních vzorků (košů); 0, dokud nepřišla první hodnota."""
+        return 0 if self._kw != self._kw else self._n
+
+    @property
+    def nbytes(self) -> int:
+        return self._bins.buffer_info()[1] * self._bins.itemsize
+
+    def add(self, ts: float, kw: float) -> None:
+        self.advance(ts)
+        self._kw = kw
+
+    def advance(self, ts: float) -> None:
+        """Dosčítej drženou hodnotu do času `ts` (epoch s)."""
+        if self._idx < 0:
+            self._idx = int(ts // self._step)
+            self._ts = ts
+            return
+        if ts <= self._ts:
+            return
+        bins, n, step = self._bins, self._n, self._step
+        kw = 0.0 if self._kw != self._kw else self._kw
+        target = int(ts // step)
+
+        if target - self._idx >= n:
+            # mezera delší než celé okno – všechny koše plné, bez průchodu po krocích
+            full = kw * step / 3600.0
+            for i in range(n):
+                bins[i] = full
+            part = kw * (ts - target * step) / 3600.0
+            bins[target % n] = part
+            self._sum = full * (n - 1) + part
+        else:
+            t = self._ts
+            idx = self._idx
+            while idx < target:
+                e = kw * ((idx + 1) * step - t) / 3600.0
+                bins[idx % n] += e
+                self._sum += e
+                idx += 1
+                t = idx * step
+                j = idx % n
+                self._sum -= bins[j]
+                bins[j] = 0.0
+                if j == 0:
+                    # jednou za oběh přepočti součet – bez kumulace zaokrouhlení
+                    self._sum = sum(bins)
+            e = kw * (ts - t) / 3600.0
+            bins[target % n] += e
+            self._sum += e
+        self._idx = target
+        self._ts = ts
+
+    def trim(self, cutoff: float) -> None:
+        """Posuň konec okna na `cutoff` + délka okna (vyřazení je implicitní)."""
+        self.advance(cutoff + self._span)
+
+    @property
+    def kwh(self) -> float:
+        """Energie okna (ts − délka, ts]; nejstarší koš se započte poměrnou částí."""
+        if self._idx < 0:
+            return 0.0
+        oldest = self._bins[(self._idx + 1) % self._n]
+        # nejstarší koš už z okna vypadl v délce, o kterou je aktuální koš naplněný
+        gone = (self._ts - self._idx * self._step) / self._step
+        return max(0.0, self._sum - oldest * gone)
+
+    def dump(self) -> tuple[bytes, bytes]:
+        """(stav, koše) – stav = [index koše, čas, držená hodnota, délka, krok]."""
+        state = array("d", (self._idx, self._ts, self._kw, self._span, self._step))
+        head = (self._idx + 1) % self._n
+        bins = self._bins[head:] + self._bins[:head]          # od nejstaršího
+        return state.tobytes(), bins.tobytes()
+
+    @classmethod
+    def load(
+        cls, state_raw: bytes, bins_raw: bytes, byteorder: str = sys.byteorder, cutoff: float | None = None,
+        span: float | None = None, step: float | None = None,
+    ) -> "HoldWindow":
+        """Obnova ze snímku; při jiné délce okna či kroku se obnoví jen držená hodnota."""
+        state = array("d")
+        state.frombytes(state_raw)
+        bins = array("d")
+        bins.frombytes(bins_raw)
+        if byteorder != sys.byteorder:
+            state.byteswap()
+            bins.byteswap()
+        idx, ts, kw, saved_span, saved_step = state
+        win = cls(span or saved_span, step or saved_step)
+        if win._span == saved_span and win._step == saved_step and len(bins) == win._n:
+            head = (int(idx) + 1) % win._n
+            win._bins = bins[win._n - head:] + bins[:win._n - head]
+            win._idx = int(idx)
+            win._ts = ts
+            win._sum = sum(bins)
+        else:
+            win.advance(ts)
+        win._kw = kw
+        if cutoff is not None:
+            win.trim(cutoff)
+        return win
+
+
+class EnergyWindow:
+    """Okno vzorků akumulačního senzoru energie (kWh); spotřeba = poslední − první."""
+
+    __slots__ = ("_ring",)
+
+    def __init__(self) -> None:
+        self._ring = SampleRing()                             # (epoch s, kWh)
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    @property
+    def nbytes(self) -> int:
+        return self._ring.nbytes
+
+    def add(self, ts: float, kwh: float) -> None:
+        self._ring.append(ts, kwh)
+
+    def trim(self, cutoff: float) -> None:
+        ring = self._ring
+        while len(ring) and ring.ts_at(0) < cutoff:
+            ring.popleft()
+
+    @property
+    def kwh(self) -> float:
+        ring = self._ring
+        if len(ring) < 2:
+            return 0.0
+        return max(0.0, ring.value_at(-1) - ring.value_at(0))
+
+    def dump(self) -> tuple[bytes, bytes]:
+        return self._ring.to_bytes()
+
+    @classmethod
+    def load(
+        cls, ts_raw: bytes, val_raw: bytes, byteorder: str = sys.byteorder, cutoff: float | None = None,
+    ) -> "EnergyWindow":
+        win = cls()
+        win._ring = SampleRing.from_bytes(ts_raw, val_raw, byteorder, cutoff)
+        return win
@@ -0,0 +1,18 @@
+"""Moduly integrace bez závislosti na HA se testují bez `__init__` balíku (ten importuje Home Assistant)."""
+
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1] / "custom_components"
+
+for _name, _path in (
+    ("custom_components", _ROOT),
+    ("custom_components.porovnani_cen_fix_a_spot", _ROOT / "porovnani_cen_fix_a_spot"),
+):
+    if _name not in sys.modules:
+        _module = types.ModuleType(_name)
+        _module.__path__ = [str(_path)]
+        sys.modules[_name] = _module
@@ -0,0 +1,88 @@
+"""Úložiště: dynamické programování proti úplnému výčtu nad několika kroky."""
+
+from __future__ import annotations
+
+import itertools
+import math
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from custom_components.porovnani_cen_fix_a_spot.battery import EvUsage, Storage, dispatch, ev_schedule, fill_prices
+
+TZ = ZoneInfo("Europe/Prague")
+
+
+def _brute(price, load, dt_h, storage, home=None, drain=None) -> float:
+    """Nejnižší náklady přes všechny posloupnosti změn stavu (stejná diskretizace jako dispatch)."""
+    k = storage.levels
+    res = storage.capacity / k
+    eta = math.sqrt(storage.efficiency)
+    up = int(math.floor(storage.charge_kw * dt_h * eta / res + 1e-9))
+    down = int(math.floor(storage.discharge_kw * dt_h / (eta * res) + 1e-9))
+    need = [0] * len(price) if drain is None else [math.ceil(x / res - 1e-9) for x in drain]
+    best = math.inf
+    for moves in itertools.product(range(-down, up + 1), repeat=len(price)):
+        s, cost = 0, 0.0
+        for t, j in enumerate(moves):
+            if home is not None and not home[t] and j:
+                break
+            s += j
+            if not 0 <= s <= k:
+                break
+            cost += price[t] * max(0.0, load[t] + (j * res / eta if j > 0 else j * res * eta))
+            s -= need[t]
+            if s < 0:
+                break
+        else:
+            best = min(best, cost)
+    return best
+
+
+def test_known_case() -> None:
+    result = dispatch(np.array([1.0, 5, 1, 5, 1, 9]), np.ones(6), 1.0, Storage(2, 2, 2, 1.0, levels=4))
+    assert result["cost"] == pytest.approx(6.0)
+    assert result["charged_kwh"] == pytest.approx(result["discharged_kwh"])
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("storage", [Storage(2, 1, 1, 0.9, levels=4), Storage(3, 2, 1, 0.81, levels=3)])
+def test_dispatch_matches_brute_force(seed: int, storage: Storage) -> None:
+    rng = np.random.default_rng(seed)
+    price = rng.random(5) * 6 - 1
+    load = rng.random(5) * 1.5
+    result = dispatch(price, load, 1.0, storage)
+    assert result["cost"] == pytest.approx(_brute(price, load, 1.0, storage))
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_dispatch_ev_matches_brute_force(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    price = rng.random(6) * 4
+    load = rng.random(6)
+    home = np.array([True, True, True, False, False, True])
+    drain = np.array([0.0, 0.0, 1.0, 0.0, 0.0, 0.0])
+    storage = Storage(2, 1, 0, 0.9, levels=4)
+    result = dispatch(price, load, 1.0, storage, home, drain)
+    assert result["cost"] == pytest.approx(_brute(price, load, 1.0, storage, home, drain))
+
+
+def test_ev_schedule_uses_local_hours() -> None:
+    # den přechodu na letní čas: 23 místních hodin
+    start = datetime(2025, 3, 30, tzinfo=TZ).timestamp()
+    starts = start + np.arange(23) * 3600.0
+    home, drain = ev_schedule(starts, 3600.0, TZ, EvUsage(8.0, arrival=17, departure=7))
+    hours = [datetime.fromtimestamp(t, TZ).hour for t in starts]
+    assert [h for h, at in zip(hours, home) if at] == [0, 1, 3, 4, 5, 6, 17, 18, 19, 20, 21, 22, 23]
+    assert hours[int(np.flatnonzero(drain)[0])] == 6
+    assert drain.sum() == pytest.approx(8.0)
+
+
+def test_fill_prices() -> None:
+    filled, count = fill_prices(np.array([np.nan, 2.0, np.nan, np.nan, 3.0, np.nan]))
+    assert filled.tolist() == [2.0, 2.0, 2.0, 2.0, 3.0, 3.0]
+    assert count == 4
+    with pytest.raises(ValueError):
+        fill_prices(np.array([np.nan, np.nan]))
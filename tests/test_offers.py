@@ -0,0 +1,60 @@
+"""Další nabídky profilu: jeden vektorový průchod = stejné náklady jako jednotlivé tarify."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from custom_components.porovnani_cen_fix_a_spot.pricing import OfferBook, batch_costs
+from custom_components.porovnani_cen_fix_a_spot.tariff import offer_slug, parse_offers
+
+PROFILE = {"spot_marze": 0.3, "spot_stala_platba": 99.0, "fix_stala_platba": 150.0}
+RAW = [
+    {"name": "Dodavatel B", "product": "spot", "spot_marze": 0.25, "spot_za_jistic": 120},
+    {"name": "Dodavatel C", "product": "fix", "fix_obchodni_cena_vt": 3.1, "fix_obchodni_cena_nt": 2.8},
+    {"name": "Dodavatel Ž", "product": "spot"},
+]
+
+
+@pytest.mark.parametrize("spot", [2.4, -0.3])
+@pytest.mark.parametrize("minutes", [15, 60])
+def test_offer_costs_match_batch_fee_inclusive(spot: float, minutes: int) -> None:
+    offers = parse_offers(RAW, PROFILE)
+    start = datetime(2025, 2, 10, 8, 15, tzinfo=timezone.utc)
+    costs = OfferBook(offers).interval_costs(1.7, 0.4, spot, start, minutes)
+    assert len(costs) == len(offers)
+    for offer, cost in zip(offers, costs):
+        ref = batch_costs(offer.tariff, [1.7], [spot], [0.4], [start.timestamp()], minutes)
+        expected = ref.fix_cost[0] if offer.product == "fix" else ref.spot_cost[0] + ref.spot_fee[0]
+        assert cost == pytest.approx(expected, abs=1e-6)
+
+
+def test_spot_fee_override_changes_offer_cost() -> None:
+    start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    cheap, dear = parse_offers(
+        [{"name": "a", "product": "spot"}, {"name": "b", "product": "spot", "spot_stala_platba": 999}], PROFILE,
+    )
+    a, b = OfferBook((cheap, dear)).interval_costs(1.0, 0.0, 2.0, start, 60)
+    assert b - a == pytest.approx((999.0 - 99.0) / (31 * 24), abs=1e-6)
+
+
+def test_missing_spot_price_charges_only_fees() -> None:
+    offers = parse_offers(RAW, PROFILE)
+    start = datetime(2025, 4, 1, tzinfo=timezone.utc)
+    costs = OfferBook(offers).interval_costs(2.0, 0.0, None, start, 60)
+    spot_b = offers[0].tariff
+    assert costs[0] == pytest.approx(spot_b.spot_monthly / (30 * 24), abs=1e-6)
+    assert costs[1] == pytest.approx(
+        OfferBook(offers).interval_costs(2.0, 0.0, 5.0, start, 60)[1], abs=1e-9,
+    )
+
+
+def test_parse_offers_rejects_bad_input() -> None:
+    assert offer_slug("Dodavatel Ž") == "dodavatel_z"
+    with pytest.raises(ValueError):
+        parse_offers([{"name": "x", "product": "hybrid"}], PROFILE)
+    with pytest.raises(ValueError):
+        parse_offers([{"name": "x", "product": "fix", "neznamy": 1}], PROFILE)
+    with pytest.raises(ValueError):
+        parse_offers([{"name": "X", "product": "fix"}, {"name": "x", "product": "spot"}], PROFILE)
@@ -0,0 +1,82 @@
+"""Import exportů OTE a sloučení do uložené řady cen."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from custom_components.porovnani_cen_fix_a_spot.ote import TZ_PRAGUE, OteFormatError, parse_prices
+from custom_components.porovnani_cen_fix_a_spot.price_store import PriceSeries
+
+
+def _hourly(day: date, hours: int) -> str:
+    lines = ["Den;Hodina;Cena (Kč/MWh);Množství (MWh)"]
+    lines += [f"{day:%d.%m.%Y};{h};{2000 + h},50;{100 + h}" for h in range(1, hours + 1)]
+    lines.append(f"Celkem;;;{sum(range(101, 101 + hours))}")
+    return "\n".join(lines)
+
+
+def _midnight(day: date) -> float:
+    return datetime(day.year, day.month, day.day, tzinfo=TZ_PRAGUE).timestamp()
+
+
+@pytest.mark.parametrize(("day", "hours"), [(date(2025, 10, 26), 25), (date(2025, 3, 30), 23), (date(2025, 6, 1), 24)])
+def test_hourly_dst_days(day: date, hours: int) -> None:
+    parsed = parse_prices(_hourly(day, hours).encode("cp1250"))
+    assert parsed.step == 3600
+    assert (parsed.rows, parsed.bad_rows) == (hours + 1, 1)
+    stamps = [ts for ts, _ in parsed.points]
+    assert stamps[0] == _midnight(day)
+    assert np.diff(stamps).tolist() == [3600.0] * (hours - 1)
+    # další den začíná přesně za posledním intervalem
+    assert stamps[-1] + 3600.0 == _midnight(date.fromordinal(day.toordinal() + 1))
+    assert parsed.points[0][1] == pytest.approx(2.0015)
+
+
+def test_quarter_hour_periods_on_long_day() -> None:
+    lines = ["Den;Perioda;Cena (EUR/MWh)"] + [f"2025-10-26;{p};{p}" for p in range(1, 101)]
+    with pytest.raises(OteFormatError):
+        parse_prices("\n".join(lines))
+    parsed = parse_prices("\n".join(lines), eur_czk=25.0)
+    assert parsed.step == 900
+    assert len(parsed.points) == 100
+    assert parsed.points[-1][0] - parsed.points[0][0] == 99 * 900.0
+    assert parsed.points[3][1] == pytest.approx(4 * 25.0 / 1000)
+
+
+def test_merge_counts_and_extends_both_sides() -> None:
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    series = PriceSeries(3600)
+    res = series.merge([(base + 3600 * i, float(i)) for i in range(3)])
+    assert res.as_dict() == {"added": 3, "updated": 0, "unchanged": 0, "skipped": 0}
+
+    res = series.merge([
+        (base - 2 * 3600, 9.0),          # před řadou (mezera NaN)
+        (base, 0.0),                     # beze změny
+        (base + 3600, 1.5),              # přepis
+        (base + 5 * 3600, 5.0),          # za řadou
+        (base + 1800, 3.0),              # mimo mřížku
+        (base + 3 * 3600, float("nan")),
+    ])
+    assert res.as_dict() == {"added": 2, "updated": 1, "unchanged": 1, "skipped": 2}
+    assert series.base == base - 2 * 3600
+    assert len(series) == 8
+    assert series.known() == 5
+    assert series.price_at(base - 3600) is None
+    assert series.price_at(base + 3600 + 10) == 1.5
+    assert np.isnan(series.slice(base + 3 * 3600, base + 7 * 3600)).tolist() == [True, True, False, True]
+
+    restored = PriceSeries.from_bytes(series.to_bytes())
+    assert (restored.step, restored.base) == (series.step, series.base)
+    assert restored.prices.tobytes() == series.prices.tobytes()
+    with pytest.raises(ValueError):
+        PriceSeries.from_bytes(series.to_bytes()[:-8])
+
+
+def test_parse_ote_file_merges_into_series() -> None:
+    parsed = parse_prices(_hourly(date(2025, 10, 26), 25))
+    series = PriceSeries(parsed.step)
+    assert series.merge(parsed.points).added == 25
+    assert series.merge(parsed.points).unchanged == 25
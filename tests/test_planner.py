@@ -0,0 +1,81 @@
+"""Plánovač spotřebičů proti hrubé síle nad malým horizontem."""
+
+from __future__ import annotations
+
+import itertools
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from custom_components.porovnani_cen_fix_a_spot.planner import Appliance, build_horizon, parse_appliance, plan
+from custom_components.porovnani_cen_fix_a_spot.tariff import Tariff
+
+TARIFF = Tariff.from_mappings({})
+BASE = datetime(2025, 6, 1, tzinfo=timezone.utc).timestamp()
+STEP = 900.0
+
+
+def _prices(n: int = 14, seed: int = 1) -> np.ndarray:
+    prices = np.random.default_rng(seed).random(n) * 4 - 0.5
+    prices[[5, 11]] = np.nan
+    return prices
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("d", [1, 2, 3, 4])
+def test_contiguous_matches_brute_force(seed: int, d: int) -> None:
+    prices = _prices(seed=seed)
+    horizon = build_horizon(TARIFF, BASE, STEP, prices, BASE + 100.0)
+    unit = prices + TARIFF.spot_adder_vt
+    windows = [(unit[i:i + d].sum(), i) for i in range(len(unit) - d + 1) if not np.isnan(unit[i:i + d]).any()]
+    best, i = min(windows)
+    result = plan(horizon, Appliance("x", "x", duration=d * 15, energy=2.0))
+    assert result["avg_unit_price"] == pytest.approx(best / d, abs=1e-4)
+    assert result["end"] == _iso(BASE + (i + d) * STEP)
+    assert result["cost"] == pytest.approx(best * 2.0 / d, abs=1e-4)
+    assert result["cost_now"] == pytest.approx(unit[:d].sum() * 2.0 / d, abs=1e-4)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("d", [1, 3, 6])
+def test_split_matches_brute_force(seed: int, d: int) -> None:
+    prices = _prices(seed=seed)
+    horizon = build_horizon(TARIFF, BASE, STEP, prices, BASE)
+    unit = prices + TARIFF.spot_adder_vt
+    known = np.flatnonzero(~np.isnan(unit))
+    best = min(unit[list(c)].sum() for c in itertools.combinations(known, d))
+    result = plan(horizon, Appliance("x", "x", duration=d * 15, contiguous=False))
+    assert result["avg_unit_price"] == pytest.approx(best / d, abs=1e-4)
+    assert len(result["slots"]) == d
+    assert result["slots"] == sorted(result["slots"])
+
+
+def test_within_limits_horizon() -> None:
+    prices = np.array([3.0, 3.0, 3.0, 3.0, 0.1, 0.1, 0.1, 0.1])
+    horizon = build_horizon(TARIFF, BASE, STEP, prices, BASE)
+    assert plan(horizon, Appliance("x", "x", duration=30))["start"] == _iso(BASE + 4 * STEP)
+    # musí doběhnout do hodiny → levné intervaly za hodinou nejsou k dispozici
+    limited = plan(horizon, Appliance("x", "x", duration=30, within=1.0))
+    assert limited["end"] <= _iso(BASE + 3600.0)
+    assert plan(horizon, Appliance("x", "x", duration=90, within=1.0)) is None
+
+
+def test_missing_prices_give_none() -> None:
+    prices = np.array([1.0, np.nan, 1.0, np.nan, 1.0])
+    horizon = build_horizon(TARIFF, BASE, STEP, prices, BASE)
+    assert plan(horizon, Appliance("x", "x", duration=30)) is None
+    assert plan(horizon, Appliance("x", "x", duration=45, contiguous=False))["intervals"] == 3
+    assert plan(horizon, Appliance("x", "x", duration=60, contiguous=False)) is None
+
+
+def test_parse_appliance_rejects_bad_input() -> None:
+    app = parse_appliance({"name": "Pračka", "duration": 90, "energy": 1.2})
+    assert (app.slug, app.duration, app.energy, app.contiguous) == ("pracka", 90.0, 1.2, True)
+    for bad in ({"name": "x"}, {"name": "x", "duration": -5}, {"name": "x", "duration": 30, "power": 2}):
+        with pytest.raises(ValueError):
+            parse_appliance(bad)
@@ -0,0 +1,63 @@
+"""Křivka spotových cen z atributů zdrojového senzoru."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.core import State  # noqa: E402
+
+from custom_components.porovnani_cen_fix_a_spot.price_cache import PriceCurve  # noqa: E402
+
+START = datetime(2025, 10, 25, 22, tzinfo=timezone.utc)
+
+
+def _state(prices: list[float | None], value: str = "1.0") -> State:
+    attrs = {
+        (START + timedelta(hours=i)).isoformat(): p
+        for i, p in enumerate(prices) if p is not None
+    }
+    return State("sensor.spot", value, attrs)
+
+
+def test_rebuild_from_iso_attributes() -> None:
+    curve = PriceCurve()
+    assert curve.update(_state([2.0, 3.0, None, 5.0]))
+    assert curve.version == 1
+    assert (curve.base, curve.step, len(curve)) == (START.timestamp(), 3600.0, 4)
+    t = START.timestamp()
+    assert curve.price_at(t) == 2.0
+    assert curve.price_at(t + 3599.0) == 2.0
+    assert curve.price_at(t + 3600.0) == 3.0
+    assert curve.price_at(t + 2 * 3600.0) is None
+    assert curve.price_at(t - 1.0) is None
+    assert curve.price_at(t + 4 * 3600.0) is None
+
+
+def test_mean_price_is_time_weighted() -> None:
+    curve = PriceCurve()
+    curve.update(_state([2.0, 4.0, None, 5.0]))
+    t = START.timestamp()
+    assert curve.mean_price(t, t + 900.0) == pytest.approx(2.0)
+    # čtvrt hodiny za 2 Kč a hodina za 4 Kč
+    assert curve.mean_price(t + 2700.0, t + 7200.0) == pytest.approx((2.0 * 900 + 4.0 * 3600) / 4500)
+    # přes chybějící interval nebo mimo křivku → None (žádná záloha na aktuální cenu)
+    assert curve.mean_price(t + 3600.0, t + 3 * 3600.0) is None
+    assert curve.mean_price(t - 900.0, t + 900.0) is None
+    assert curve.mean_price(t + 4 * 3600.0, t + 5 * 3600.0) is None
+
+
+def test_version_bumps_only_on_attribute_change() -> None:
+    curve = PriceCurve()
+    state = _state([1.0, 2.0])
+    curve.update(state)
+    assert curve.update(State("sensor.spot", "2.0", state.attributes))
+    assert curve.version == 1
+    assert curve.current == 2.0
+    assert not curve.update(State("sensor.spot", "2.0", state.attributes))
+    curve.update(_state([1.0, 2.5]))
+    assert curve.version == 2
+    assert curve.price_at(START.timestamp() + 3600.0) == 2.5
@@ -0,0 +1,59 @@
+"""Cenové vzorce: živé uzavření intervalu a dávkový výpočet musí dávat totéž."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from custom_components.porovnani_cen_fix_a_spot.pricing import batch_costs, interval_costs, spot_unit_prices
+from custom_components.porovnani_cen_fix_a_spot.tariff import Tariff
+
+TARIFF = Tariff.from_mappings({"fix_stala_platba": 150.0, "spot_stala_platba": 99.0})
+
+
+def _intervals(start: datetime, count: int, minutes: int):
+    rng = np.random.default_rng(7)
+    starts = [start + timedelta(minutes=minutes * i) for i in range(count)]
+    return starts, rng.random(count) * 2, rng.random(count), rng.random(count) * 5 - 0.5
+
+
+@pytest.mark.parametrize("minutes", [15, 60])
+def test_interval_costs_match_batch(minutes: int) -> None:
+    # přes hranici února a března – paušál podle délky měsíce začátku intervalu
+    starts, kwh, nt, spot = _intervals(datetime(2025, 2, 27, tzinfo=timezone.utc), 300, minutes)
+    batch = batch_costs(TARIFF, kwh, spot, nt, [s.timestamp() for s in starts], minutes)
+    for i, start in enumerate(starts):
+        live = interval_costs(TARIFF, float(kwh[i]), float(nt[i]), float(spot[i]), start, minutes)
+        assert live.kwh_vt == pytest.approx(batch.kwh_vt[i])
+        assert live.kwh_nt == pytest.approx(batch.kwh_nt[i])
+        assert live.spot_unit == pytest.approx(batch.spot_unit[i])
+        assert live.spot_cost == pytest.approx(batch.spot_cost[i])
+        assert live.fix_fee == pytest.approx(batch.fix_fee[i])
+        assert live.fix_cost == pytest.approx(batch.fix_cost[i])
+
+
+def test_spot_unit_is_spot_plus_adder() -> None:
+    spot = np.array([1.0, 2.5, np.nan])
+    unit = spot_unit_prices(TARIFF, spot)
+    assert unit[:2] == pytest.approx(spot[:2] + TARIFF.spot_adder_vt)
+    assert np.isnan(unit[2])
+    costs = batch_costs(TARIFF, [2.0], [2.5], [0.7], [datetime(2025, 5, 1, tzinfo=timezone.utc).timestamp()], 60)
+    assert costs.spot_cost[0] == pytest.approx(2.0 * (2.5 + TARIFF.spot_adder_vt))
+
+
+@pytest.mark.parametrize("month", [2, 4, 7])
+def test_fees_over_whole_month_equal_monthly_fee(month: int) -> None:
+    start = datetime(2025, month, 1, tzinfo=timezone.utc)
+    end = datetime(2025, month + 1, 1, tzinfo=timezone.utc)
+    n = int((end - start).total_seconds() // 900)
+    starts = start.timestamp() + np.arange(n) * 900.0
+    costs = batch_costs(TARIFF, np.zeros(n), np.zeros(n), np.zeros(n), starts, 15)
+    assert costs.fix_fee.sum() == pytest.approx(TARIFF.fix_monthly)
+    assert costs.spot_fee.sum() == pytest.approx(TARIFF.spot_monthly)
+
+
+def test_batch_missing_spot_counts_as_zero() -> None:
+    costs = batch_costs(TARIFF, [1.0], [np.nan], [0.0], [0.0], 60)
+    assert costs.spot_cost[0] == pytest.approx(TARIFF.spot_adder_vt)
@@ -0,0 +1,73 @@
+"""Porovnání nabídek: redukce historie na součty a bod zvratu."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from custom_components.porovnani_cen_fix_a_spot.pricing import batch_costs
+from custom_components.porovnani_cen_fix_a_spot.sweep import LoadProfile, expand_candidates, sweep
+from custom_components.porovnani_cen_fix_a_spot.tariff import Tariff
+
+OPTIONS = {"spot_marze": 0.3, "spot_stala_platba": 99.0, "fix_stala_platba": 150.0}
+
+
+def _history(hours: int = 24 * 59):
+    rng = np.random.default_rng(3)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    starts = start + np.arange(hours) * 3600.0
+    return starts, rng.random(hours) * 1.5, rng.random(hours) * 4, (rng.random(hours) > 0.6).astype(float)
+
+
+def _profile() -> LoadProfile:
+    starts, kwh, prices, nt = _history()
+    profile = LoadProfile()
+    # po dávkách jako v backtestu
+    for part in np.array_split(np.arange(len(starts)), 3):
+        profile += LoadProfile.from_arrays(starts[part], kwh[part], prices[part], nt[part])
+    return profile
+
+
+def test_costs_match_batch_costs() -> None:
+    starts, kwh, prices, nt = _history()
+    result = sweep(_profile(), OPTIONS, {}, [])
+    ref = batch_costs(Tariff.from_mappings(OPTIONS), kwh, prices, nt, starts, 60).totals()
+    assert result["current"]["fix"] == pytest.approx(ref["fix_cost"], abs=0.01)
+    assert result["current"]["spot"] == pytest.approx(ref["spot_cost"] + ref["spot_fee"], abs=0.01)
+
+
+def test_break_even_equalises_with_best_other_product() -> None:
+    profile = _profile()
+    candidates = expand_candidates(
+        [{"name": "fix A", "fix_obchodni_cena_vt": 3.2, "fix_obchodni_cena_nt": 2.9}],
+        {"spot_marze": [0.2, 0.4]},
+    )
+    result = sweep(profile, OPTIONS, {}, candidates, top=100)
+    ranked = result["ranked"]
+    # bod zvratu je zaokrouhlen na 4 desetinná místa
+    tol = 5e-5 * result["profile"]["kwh"] + 0.01
+    assert [r["cost"] for r in ranked] == sorted(r["cost"] for r in ranked)
+
+    spot = next(r for r in ranked if r["product"] == "spot" and r["name"] == "spot_marze=0.2")
+    # spot s marží rovnou bodu zvratu stojí stejně jako nejlepší fix
+    even = sweep(profile, OPTIONS, {}, [{"name": "even", "spot_marze": spot["break_even"]}], top=100)
+    row = next(r for r in even["ranked"] if r["name"] == "even")
+    assert row["cost"] == pytest.approx(result["best_fix"], abs=tol)
+
+    fix = next(r for r in ranked if r["name"] == "fix A")
+    shift = fix["break_even"]
+    moved = sweep(profile, OPTIONS, {}, [{
+        "name": "moved",
+        "fix_obchodni_cena_vt": 3.2 + shift, "fix_obchodni_cena_nt": 2.9 + shift,
+    }], top=100)
+    row = next(r for r in moved["ranked"] if r["name"] == "moved")
+    assert row["cost"] == pytest.approx(result["best_spot"], abs=tol)
+
+
+def test_expand_candidates_validates() -> None:
+    grid = expand_candidates(None, {"spot_marze": [0.1, 0.2], "spot_stala_platba": [0, 99, 150]})
+    assert len(grid) == 6
+    with pytest.raises(ValueError):
+        expand_candidates([{"name": "x", "neznamy": 1}], None)
@@ -0,0 +1,37 @@
+"""Testy oken výkonu (window.py je bez závislosti na HA – načte se přímo ze souboru)."""
+
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+_PATH = Path(__file__).resolve().parents[1] / "custom_components" / "porovnani_cen_fix_a_spot" / "window.py"
+_SPEC = importlib.util.spec_from_file_location("porovnani_window", _PATH)
+window = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(window)
+
+
+@pytest.mark.parametrize("step", [60.0, 300.0, 900.0])
+@pytest.mark.parametrize("phase", [0.0, 0.05, 0.25, 0.5, 0.75, 0.999])
+def test_hold_window_constant_load_is_exact(step: float, phase: float) -> None:
+    """Konstantní výkon P dá v libovolné fázi kroku přesně P × délka okna."""
+    span = 3600.0
+    kw = 1.0
+    win = window.HoldWindow(span, step)
+    t0 = 1_700_000_000.0 // step * step
+    win.add(t0, kw)
+    # okno je plné po délce okna; pak několik kroků s posunem uvnitř kroku
+    for k in range(3):
+        ts = t0 + span + k * step + phase * step
+        win.advance(ts)
+        assert win.kwh == pytest.approx(kw * span / 3600.0, rel=1e-12)
+
+
+def test_hold_window_partial_fill() -> None:
+    """Před naplněním okna je energie P × uplynulý čas."""
+    win = window.HoldWindow(3600.0, 60.0)
+    win.add(1_000_020.0, 2.0)
+    win.advance(1_000_020.0 + 1830.0)
+    assert win.kwh == pytest.approx(2.0 * 1830.0 / 3600.0, rel=1e-12)